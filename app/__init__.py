@@ -2,21 +2,64 @@
 Routes principales de l'application VATProof avec intégration Celery
 Gère les endpoints pour l'interface utilisateur et l'API de vérification VIES
 """
-from flask import Blueprint, render_template, request, jsonify, current_app, send_file
+from flask import Blueprint, render_template, request, jsonify, current_app, send_file, g, Response
 from datetime import datetime
+from prometheus_client import CONTENT_TYPE_LATEST
+from sqlalchemy import text, insert
 import uuid
+import time
 import os
+import threading
 
 from app import db
 from app.models.user import User, VerificationJob, VerificationBatch, SystemLog
 from app.services.file_service import FileService
 from app.services.vat_service import VATService
+from app.services.vat_correction import add_suggestions
 from app.services.zip_service import ZipService
 from app.routes.auth import get_current_user, login_required
-from app.tasks.vies_verification import verify_single_vat, process_vat_batch
+from app.tasks.vies_verification import (
+    verify_single_vat, process_vat_batch, dispatch_fair_share, get_fair_scheduler,
+    verify_express, get_invalid_filter, get_pacer
+)
+from app.tasks.upload_processing import parse_uploaded_file, get_upload_service, get_verification_cache
+from app.services import metrics
+from app.services.health_service import HealthMonitor
+from app.services.batch_staging import BatchStagingService
+from app.services.chunked_upload import ChunkedUploadService
 
 main_bp = Blueprint('main', __name__)
 
+@main_bp.before_app_request
+def _start_request_timer():
+    """Horodatage du début de requête pour la latence par route"""
+    g.request_start = time.monotonic()
+
+@main_bp.after_app_request
+def _observe_request_latency(response):
+    """Publie la latence de la requête (libellé = règle de route, pas l'URL)"""
+    start = g.pop('request_start', None)
+    if start is not None and current_app.config.get('METRICS_ENABLED', True):
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.HTTP_REQUEST_SECONDS.labels(request.method, route, response.status_code).observe(
+            time.monotonic() - start
+        )
+    return response
+
+@main_bp.route('/metrics')
+def prometheus_metrics():
+    """Exposition des métriques Prometheus (web et workers si dossier multi-processus partagé)"""
+    if not current_app.config.get('METRICS_ENABLED', True):
+        return jsonify({'error': 'Métriques désactivées'}), 404
+    
+    collector = metrics.RuntimeCollector(
+        redis_url=current_app.config.get('CELERY_BROKER_URL'),
+        queues=current_app.config.get('CELERY_MONITORED_QUEUES', ['celery']),
+        engine=db.engine,
+        pacer=get_pacer()
+    )
+    return Response(metrics.render_metrics(collector), mimetype=CONTENT_TYPE_LATEST)
+
 @main_bp.route('/')
 def home():
     """Page d'accueil avec interface d'upload"""
@@ -32,37 +75,78 @@ def about():
 
 @main_bp.route('/api/status')
 def api_status():
-    """Endpoint API pour vérifier le statut de l'application"""
-    try:
-        # Test de la connexion à la base de données
-        db.session.execute('SELECT 1')
-        db_status = 'ok'
-    except Exception as e:
-        current_app.logger.error(f"Erreur base de données: {e}")
-        db_status = 'error'
-    
-    # Test de Redis/Celery
-    try:
-        from app.tasks.vies_verification import celery
-        redis_status = 'ok' if celery.control.ping() else 'error'
-    except Exception:
-        redis_status = 'error'
+    """Endpoint API pour vérifier le statut de l'application (instantané mis en cache)"""
+    snapshot = _get_health_monitor().get_snapshot()
+    components = snapshot['components']
     
     return jsonify({
-        'status': 'ok',
+        'status': snapshot['status'],
         'timestamp': datetime.utcnow().isoformat(),
         'services': {
-            'database': db_status,
-            'redis': redis_status,
-            'celery': redis_status
+            'database': components['database']['status'],
+            'redis': components['redis']['status'],
+            'celery': components['celery']['status']
         },
+        'components': components,
         'version': '1.0.0-mvp'
     })
 
+_batch_staging = None
+
+def _get_batch_staging():
+    """Stockage des lignes validées entre l'import et le lancement"""
+    global _batch_staging
+    
+    if _batch_staging is None:
+        _batch_staging = BatchStagingService(
+            current_app.config['REDIS_URL'],
+            ttl=current_app.config['BATCH_STAGING_TTL']
+        )
+    
+    return _batch_staging
+
+_health_monitor = None
+_health_monitor_lock = threading.Lock()
+
+def _get_health_monitor():
+    """Superviseur du processus, démarré à la première demande (après le fork gunicorn)"""
+    global _health_monitor
+    
+    if _health_monitor is None:
+        with _health_monitor_lock:
+            if _health_monitor is None:
+                app = current_app._get_current_object()
+                
+                def probe_database():
+                    with app.app_context():
+                        db.session.execute(text('SELECT 1'))
+                        db.session.remove()
+                    return 'ok', None
+                
+                def probe_celery():
+                    from app.tasks.vies_verification import celery
+                    replies = celery.control.ping(timeout=app.config['HEALTH_CELERY_PING_TIMEOUT'])
+                    return ('ok', f'{len(replies)} worker(s)') if replies else ('error', 'Aucun worker')
+                
+                monitor = HealthMonitor(
+                    app.config['REDIS_URL'],
+                    interval=app.config['HEALTH_REFRESH_INTERVAL'],
+                    probes={'database': probe_database, 'celery': probe_celery}
+                )
+                monitor.start()
+                _health_monitor = monitor
+    
+    return _health_monitor
+
 @main_bp.route('/api/upload', methods=['POST'])
 @login_required
 def api_upload():
-    """Endpoint pour l'upload de fichiers CSV/Excel contenant les numéros de TVA"""
+    """
+    Endpoint pour l'upload de fichiers CSV/Excel contenant les numéros de TVA
+    
+    L'analyse est confiée à une tâche de fond : la réponse (202) donne
+    l'URL de suivi, où compteurs et aperçu apparaissent au fil de l'analyse.
+    """
     user = get_current_user()
     
     try:
@@ -79,79 +163,149 @@ def api_upload():
         if not validation['is_valid']:
             return jsonify({'error': validation['error']}), 400
         
-        # Parsing du fichier
-        current_app.logger.info(f"Début parsing fichier: {file.filename} par {user.email}")
+        # Enregistrement puis analyse en tâche de fond
+        upload_id = get_upload_service().store_file(str(user.id), file.filename, validation['extension'], file)
+        _start_upload_parsing(upload_id)
         
-        parsed_result = FileService.parse_file(file)
+        current_app.logger.info(f"Analyse fichier lancée: {file.filename} par {user.email}")
         
-        if not parsed_result['success']:
-            return jsonify({
-                'error': parsed_result['error'],
-                'filename': file.filename
-            }), 400
-        
-        # Extraction des numéros de TVA
-        vat_numbers = FileService.extract_vat_numbers(parsed_result)
-        
-        if not vat_numbers:
-            return jsonify({
-                'error': 'Aucun numéro de TVA trouvé dans le fichier',
-                'filename': file.filename,
-                'headers': parsed_result.get('headers', [])
-            }), 400
-        
-        # Validation des numéros de TVA
-        validation_results = VATService.validate_vat_list(vat_numbers)
-        
-        # Vérification du quota utilisateur
-        valid_count = validation_results['summary']['valid_count']
-        if not user.can_verify(valid_count):
-            return jsonify({
-                'error': f'Quota insuffisant. Vous pouvez vérifier {user.monthly_quota - user.quota_used} numéros ce mois-ci.',
-                'quota_needed': valid_count,
-                'quota_available': user.monthly_quota - user.quota_used
-            }), 403
-        
-        # Création du batch en base
-        batch = VerificationBatch(
-            user_id=user.id,
-            original_filename=file.filename,
-            file_type=validation['extension'],
-            total_jobs=valid_count
-        )
-        db.session.add(batch)
-        db.session.flush()  # Pour obtenir l'ID
-        
-        # Préparation de la réponse
-        response_data = {
+        return jsonify({
             'success': True,
-            'batch_id': str(batch.id),
+            'upload_id': upload_id,
             'filename': file.filename,
-            'message': f'Fichier analysé avec succès',
-            'stats': validation_results['summary'],
-            'preview': _format_preview_data(validation_results),
-            'countries': validation_results['summary']['countries'],
-            'status': 'parsed'
-        }
-        
-        # Sauvegarde du batch
-        db.session.commit()
-        
-        # Log du succès
-        SystemLog.log_info('file_upload', 
-                          f"Fichier {file.filename} parsé: {len(vat_numbers)} numéros, {valid_count} valides",
-                          user_id=user.id)
-        
-        return jsonify(response_data)
+            'status': ChunkedUploadService.STATUS_PARSING,
+            'status_url': f'/api/uploads/{upload_id}'
+        }), 202
         
     except Exception as e:
-        db.session.rollback()
         SystemLog.log_error('file_upload', f'Erreur lors de l\'upload: {str(e)}', user_id=user.id)
         return jsonify({
             'error': 'Erreur interne lors du traitement du fichier',
             'details': str(e) if current_app.debug else None
         }), 500
 
+def _start_upload_parsing(upload_id):
+    """Lance l'analyse sur la file dédiée (sans attente derrière les vérifications VIES)"""
+    parse_uploaded_file.apply_async(args=[upload_id], queue=current_app.config['UPLOAD_QUEUE'])
+
+@main_bp.route('/api/uploads', methods=['POST'])
+@login_required
+def api_chunked_upload_init():
+    """Ouvre un upload par morceaux (fichiers au-delà de MAX_CONTENT_LENGTH)"""
+    user = get_current_user()
+    data = request.get_json() or {}
+    
+    filename = (data.get('filename') or '').strip()
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension not in FileService.ALLOWED_EXTENSIONS:
+        return jsonify({'error': f"Format non supporté (formats acceptés: {', '.join(FileService.ALLOWED_EXTENSIONS)})"}), 400
+    
+    try:
+        session = get_upload_service().init(str(user.id), filename, extension, int(data.get('size') or 0))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'success': True, **session}), 201
+
+def _get_upload_session(upload_id, user):
+    """Session d'upload appartenant à l'utilisateur, ou None"""
+    session = get_upload_service().get(upload_id)
+    if session is None or session['user_id'] != str(user.id):
+        return None
+    return session
+
+@main_bp.route('/api/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+@login_required
+def api_chunked_upload_chunk(upload_id, index):
+    """Reçoit un morceau (corps brut) ; renvoyer un morceau déjà reçu est sans effet"""
+    user = get_current_user()
+    
+    session = _get_upload_session(upload_id, user)
+    if session is None:
+        return jsonify({'error': 'Upload non trouvé ou expiré'}), 404
+    
+    try:
+        received = get_upload_service().write_chunk(upload_id, session, index, request.get_data())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'success': True, 'received_chunks': received, 'total_chunks': session['total_chunks']})
+
+@main_bp.route('/api/uploads/<upload_id>')
+@login_required
+def api_chunked_upload_status(upload_id):
+    """État d'un upload : morceaux manquants (reprise) puis progression de l'analyse"""
+    user = get_current_user()
+    
+    session = _get_upload_session(upload_id, user)
+    if session is None:
+        return jsonify({'error': 'Upload non trouvé ou expiré'}), 404
+    
+    response_data = {
+        'upload_id': upload_id,
+        'filename': session['filename'],
+        'status': session['status'],
+        'total_size': session['total_size'],
+        'total_chunks': session['total_chunks']
+    }
+    
+    if session['status'] == ChunkedUploadService.STATUS_UPLOADING:
+        response_data['missing_chunks'] = get_upload_service().missing_chunks(upload_id, session)
+    else:
+        response_data['progress'] = {
+            'bytes_read': session.get('bytes_read', 0),
+            'rows_read': session.get('rows_read', 0)
+        }
+        response_data['stats'] = {
+            'total_count': session.get('rows_read', 0),
+            'valid_count': session.get('valid_count', 0),
+            'invalid_count': session.get('invalid_count', 0),
+            'duplicate_count': session.get('duplicate_count', 0),
+            'countries': session.get('countries', {})
+        }
+        response_data['countries'] = response_data['stats']['countries']
+        response_data['preview'] = _format_preview_data(session.get('preview') or {'valid': [], 'invalid': []})
+        response_data['batch_id'] = session.get('batch_id')
+        response_data['error'] = session.get('error')
+        
+        # Le quota est vérifié au lancement ; signalé dès l'analyse terminée
+        if session['status'] == ChunkedUploadService.STATUS_PARSED:
+            response_data['quota_available'] = user.monthly_quota - user.quota_used
+            response_data['quota_sufficient'] = user.can_verify(response_data['stats']['valid_count'])
+    
+    return jsonify(response_data)
+
+@main_bp.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+@login_required
+def api_chunked_upload_complete(upload_id):
+    """Clôt l'upload et lance l'analyse du fichier en tâche de fond"""
+    user = get_current_user()
+    uploads = get_upload_service()
+    
+    session = _get_upload_session(upload_id, user)
+    if session is None:
+        return jsonify({'error': 'Upload non trouvé ou expiré'}), 404
+    
+    if session['status'] == ChunkedUploadService.STATUS_UPLOADING:
+        missing = uploads.missing_chunks(upload_id, session)
+        if missing:
+            return jsonify({
+                'error': f'{len(missing)} morceau(x) manquant(s)',
+                'missing_chunks': missing
+            }), 409
+        
+        if uploads.complete(upload_id, session):
+            _start_upload_parsing(upload_id)
+            current_app.logger.info(f"Analyse de {session['filename']} lancée ({session['total_size']} octets) par {user.email}")
+        session['status'] = ChunkedUploadService.STATUS_PARSING
+    
+    return jsonify({
+        'success': True,
+        'upload_id': upload_id,
+        'status': session['status'],
+        'status_url': f'/api/uploads/{upload_id}'
+    }), 202
+
 @main_bp.route('/api/verify-paste', methods=['POST'])
 @login_required
 def api_verify_paste():
@@ -171,6 +325,7 @@ def api_verify_paste():
         current_app.logger.info(f"Début parsing contenu collé par {user.email}")
         
         # Extraction des numéros de TVA du texte
+        parse_start = time.monotonic()
         vat_numbers = FileService.parse_text_content(content)
         
         if not vat_numbers:
@@ -180,7 +335,11 @@ def api_verify_paste():
             }), 400
         
         # Validation des numéros de TVA
-        validation_results = VATService.validate_vat_list(vat_numbers)
+        validation_results = VATService.validate_vat_list(vat_numbers, invalid_filter=get_invalid_filter())
+        if current_app.config.get('VAT_CORRECTION_SUGGESTIONS', True):
+            add_suggestions(validation_results['invalid'], cache=get_verification_cache())
+        metrics.UPLOAD_PARSE_SECONDS.labels('paste').observe(time.monotonic() - parse_start)
+        metrics.UPLOAD_ROWS.labels('paste').inc(len(vat_numbers))
         
         # Vérification du quota utilisateur
         valid_count = validation_results['summary']['valid_count']
@@ -201,6 +360,8 @@ def api_verify_paste():
         db.session.add(batch)
         db.session.flush()
         
+        _get_batch_staging().stage(str(batch.id), VATService.prepare_for_vies_verification(validation_results))
+        
         # Préparation de la réponse
         response_data = {
             'success': True,
@@ -245,12 +406,16 @@ def api_start_verification(batch_id):
         if batch.status != 'created':
             return jsonify({'error': 'Batch déjà en cours de traitement'}), 400
         
-        # Re-parsing des données pour créer les jobs
-        data = request.get_json()
-        vat_data = data.get('vat_data', [])
+        # Lignes validées à l'import (le client n'envoie que l'ID du batch)
+        data = request.get_json(silent=True) or {}
+        staging = _get_batch_staging()
+        vat_data = staging.load(batch_id)
+        
+        if vat_data is None:
+            return jsonify({'error': 'Données du batch expirées, veuillez réimporter le fichier'}), 410
         
         if not vat_data:
-            return jsonify({'error': 'Aucune donnée de TVA fournie'}), 400
+            return jsonify({'error': 'Aucune donnée de TVA à vérifier'}), 400
         
         # Vérification finale du quota
         if not user.can_verify(len(vat_data)):
@@ -259,58 +424,45 @@ def api_start_verification(batch_id):
         # Utilisation du quota
         user.use_quota(len(vat_data))
         
-        # Création des jobs individuels
-        job_ids = []
-        for vat_item in vat_data:
-            job = VerificationJob(
-                user_id=user.id,
-                batch_id=batch.id,
-                country_code=vat_item['country_code'],
-                vat_number=vat_item['vat_number'],
-                original_input=vat_item.get('original_input'),
-                line_number=vat_item.get('line_number'),
-                company_name=vat_item.get('company_name')
-            )
-            db.session.add(job)
-            db.session.flush()
-            job_ids.append(str(job.id))
-        
-        # Mise à jour du batch
+        # Création des jobs en une seule instruction INSERT multi-lignes
+        now = datetime.utcnow()
+        db.session.execute(insert(VerificationJob), [
+            dict(vat_item, id=uuid.uuid4(), user_id=user.id, batch_id=batch.id, status='pending', created_at=now)
+            for vat_item in vat_data
+        ])
+        
+        # Mise à jour du batch (total de référence des compteurs de progression)
+        batch.total_jobs = len(vat_data)
         batch.start_processing()
         db.session.commit()
+        staging.discard(batch_id)
         
-        # Lancement des tâches Celery
-        for job_id in job_ids:
-            job = VerificationJob.query.get(job_id)
-            
-            # Lancement de la tâche Celery
-            task = verify_single_vat.delay(
-                country_code=job.country_code,
-                vat_number=job.vat_number,
-                job_data={
-                    'job_id': job_id,
-                    'batch_id': str(batch.id),
-                    'user_id': str(user.id),
-                    'line_number': job.line_number,
-                    'company_name': job.company_name
-                }
-            )
-            
-            # Mise à jour du job avec l'ID de la tâche
-            job.start_processing(task.id)
+        jobs = VerificationJob.query.filter_by(batch_id=batch.id).all()
+        skipped = 0
+        if current_app.config.get('INVALID_FILTER_SKIP_DISPATCH'):
+            jobs, skipped = _skip_known_invalid_jobs(jobs)
+        express_results = _dispatch_verification_jobs(user, jobs, wait=bool(data.get('wait'))) if jobs else None
         
         # Log du lancement
         SystemLog.log_info('vies_verification', 
-                          f"Batch {batch_id} lancé: {len(job_ids)} jobs",
+                          f"Batch {batch_id} lancé: {len(jobs)} jobs, {skipped} récemment confirmés invalides",
                           user_id=user.id)
         
-        return jsonify({
+        response = {
             'success': True,
             'batch_id': batch_id,
-            'jobs_launched': len(job_ids),
-            'status': 'processing',
-            'message': f'{len(job_ids)} vérifications lancées'
-        })
+            'jobs_launched': len(jobs),
+            'jobs_skipped': skipped,
+            'status': 'processing' if jobs else 'completed',
+            'message': f'{len(jobs)} vérifications lancées'
+        }
+        
+        if express_results is not None:
+            response['results'] = express_results
+            if all(r.get('status') != 'pending' for r in express_results):
+                response['status'] = 'completed'
+        
+        return jsonify(response)
         
     except Exception as e:
         db.session.rollback()
@@ -322,6 +474,170 @@ def api_start_verification(batch_id):
             'details': str(e) if current_app.debug else None
         }), 500
 
+def _skip_known_invalid_jobs(jobs):
+    """
+    Termine sans appel VIES les jobs dont le numéro a été récemment confirmé
+    invalide (cache négatif, faux positifs possibles au taux configuré)
+    
+    Args:
+        jobs (list): VerificationJob à vérifier
+        
+    Returns:
+        tuple: (jobs restant à vérifier, nombre de jobs terminés)
+    """
+    invalid_filter = get_invalid_filter()
+    if not invalid_filter:
+        return jobs, 0
+    
+    flags = invalid_filter.contains_many(f"{job.country_code}{job.vat_number}" for job in jobs)
+    remaining = []
+    
+    for job, known_invalid in zip(jobs, flags):
+        if known_invalid:
+            job.complete_known_invalid()
+        else:
+            remaining.append(job)
+    
+    db.session.commit()
+    return remaining, len(jobs) - len(remaining)
+
+def _start_jobs(jobs):
+    """
+    Enregistre l'envoi des jobs (identifiants de tâche générés d'avance)
+    avant celui des messages Celery
+    
+    Returns:
+        list: Identifiant de tâche de chaque job
+    """
+    task_ids = [str(uuid.uuid4()) for _ in jobs]
+    for job, task_id in zip(jobs, task_ids):
+        job.start_processing(task_id, commit=False)
+    db.session.commit()
+    return task_ids
+
+def _dispatch_verification_jobs(user, jobs, wait=False):
+    """
+    Envoie des jobs en vérification : voie express pour les petits lots,
+    files équitables sinon (ou lancement direct si l'ordonnanceur est désactivé)
+    
+    Args:
+        user (User): Propriétaire des jobs
+        jobs (list): VerificationJob à vérifier
+        wait (bool): Attendre les verdicts express
+        
+    Returns:
+        list: Verdicts express si attendus, sinon None
+    """
+    payloads = [job.to_task_kwargs() for job in jobs]
+    scheduler = get_fair_scheduler()
+    
+    if len(payloads) <= current_app.config['EXPRESS_MAX_NUMBERS']:
+        # Voie express : file prioritaire servie par des workers réservés
+        task_ids = _start_jobs(jobs)
+        tasks = [
+            verify_express.apply_async(kwargs=payload, task_id=task_id, queue=current_app.config['EXPRESS_QUEUE'])
+            for payload, task_id in zip(payloads, task_ids)
+        ]
+        
+        # Attente synchrone optionnelle du verdict
+        if wait and current_app.config['EXPRESS_SYNC_TIMEOUT'] > 0:
+            return _wait_express_results(tasks, current_app.config['EXPRESS_SYNC_TIMEOUT'])
+    elif scheduler:
+        # Files équitables par client : la distribution vers Celery se fait au fil de l'eau
+        queued = scheduler.enqueue(str(user.id), user.subscription_type, payloads)
+        for job, task_id in zip(jobs, queued['task_ids']):
+            job.celery_task_id = task_id
+            job.dispatched_at = None  # Daté par dispatch_fair_share à l'envoi vers Celery
+        db.session.commit()
+        dispatch_fair_share.delay()
+    else:
+        # Lancement direct des tâches Celery
+        for payload, task_id in zip(payloads, _start_jobs(jobs)):
+            verify_single_vat.apply_async(kwargs=payload, task_id=task_id)
+    
+    return None
+
+@main_bp.route('/api/batches/<batch_id>/resume', methods=['POST'])
+@login_required
+def api_resume_batch(batch_id):
+    """Relance les jobs non terminés d'un batch (sans nouvelle consommation de quota)"""
+    user = get_current_user()
+    
+    try:
+        batch = VerificationBatch.query.filter_by(id=batch_id, user_id=user.id).first()
+        if not batch:
+            return jsonify({'error': 'Batch non trouvé'}), 404
+        
+        if batch.status in ('created', 'completed'):
+            return jsonify({'error': 'Aucune vérification à reprendre pour ce batch'}), 400
+        
+        # Jobs non terminés dont aucun worker ne détient le bail et dont le
+        # message Celery n'est plus attendu (sinon il serait envoyé deux fois)
+        now = datetime.utcnow()
+        dispatch_timeout = current_app.config['JOB_DISPATCH_TIMEOUT']
+        unfinished = VerificationJob.query.filter(
+            VerificationJob.batch_id == batch.id,
+            VerificationJob.status.notin_(('completed', 'failed'))
+        ).all()
+        jobs = [
+            job for job in unfinished
+            if not job.has_live_lease(now) and not job.was_recently_dispatched(dispatch_timeout, now)
+        ]
+        
+        if jobs:
+            _dispatch_verification_jobs(user, jobs)
+        
+        SystemLog.log_info('vies_verification',
+                          f"Batch {batch_id} repris: {len(jobs)} jobs relancés",
+                          user_id=user.id)
+        
+        return jsonify({
+            'success': True,
+            'batch_id': batch_id,
+            'jobs_resumed': len(jobs),
+            'jobs_in_progress': len(unfinished) - len(jobs),
+            'status': batch.status
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        SystemLog.log_error('vies_verification',
+                           f'Erreur reprise batch {batch_id}: {str(e)}',
+                           user_id=user.id)
+        return jsonify({
+            'error': 'Erreur lors de la reprise des vérifications',
+            'details': str(e) if current_app.debug else None
+        }), 500
+
+def _wait_express_results(tasks, timeout):
+    """
+    Attend les verdicts express dans la limite du délai global
+    
+    Args:
+        tasks (list): AsyncResult des vérifications express
+        timeout (float): Délai total en secondes
+        
+    Returns:
+        list: Verdict par tâche ('pending' si non reçu à temps)
+    """
+    deadline = time.monotonic() + timeout
+    results = []
+    
+    for task in tasks:
+        remaining = deadline - time.monotonic()
+        try:
+            if remaining <= 0:
+                raise TimeoutError()
+            envelope = task.get(timeout=remaining, propagate=False)
+            if not isinstance(envelope, dict):
+                # Exception de la tâche (propagate=False)
+                envelope = {'task_id': task.id, 'success': False, 'error': str(envelope)}
+            results.append(dict(envelope, status='completed' if envelope.get('success') else 'failed'))
+        except Exception:
+            results.append({'task_id': task.id, 'status': 'pending'})
+    
+    return results
+
 @main_bp.route('/api/batches/<batch_id>/status')
 @login_required
 def api_batch_status(batch_id):
@@ -334,24 +650,23 @@ def api_batch_status(batch_id):
         if not batch:
             return jsonify({'error': 'Batch non trouvé'}), 404
         
-        # Mise à jour de la progression
-        batch.update_progress()
-        
-        # Récupération des jobs
-        jobs = VerificationJob.query.filter_by(batch_id=batch.id).all()
-        
-        # Statistiques détaillées
+        # Progression lue sur les compteurs du batch (maintenus à la fin de chaque job)
+        completed = batch.completed_jobs - batch.failed_jobs
         stats = {
-            'total': len(jobs),
-            'pending': len([j for j in jobs if j.status == 'pending']),
-            'processing': len([j for j in jobs if j.status == 'processing']),
-            'completed': len([j for j in jobs if j.status == 'completed']),
-            'failed': len([j for j in jobs if j.status == 'failed']),
-            'valid_results': len([j for j in jobs if j.status == 'completed' and j.is_valid]),
-            'invalid_results': len([j for j in jobs if j.status == 'completed' and not j.is_valid])
+            'total': batch.total_jobs,
+            'pending': 0 if batch.status != 'created' else batch.total_jobs,
+            'processing': batch.total_jobs - batch.completed_jobs if batch.status != 'created' else 0,
+            'completed': completed,
+            'failed': batch.failed_jobs,
+            'valid_results': batch.successful_jobs,
+            'invalid_results': completed - batch.successful_jobs
         }
         
         # Détail des jobs (limité pour les gros batches)
+        jobs = VerificationJob.query.filter_by(batch_id=batch.id).order_by(
+            VerificationJob.line_number
+        ).limit(51).all()
+        
         jobs_detail = []
         for job in jobs[:50]:  # Limiter à 50 pour les performances
             jobs_detail.append({
@@ -376,6 +691,14 @@ def api_batch_status(batch_id):
             'has_more_jobs': len(jobs) > 50
         }
         
+        # Attente dans les files équitables (jobs pas encore envoyés aux workers)
+        scheduler = get_fair_scheduler()
+        if scheduler and batch.status == 'processing':
+            try:
+                response['queue'] = scheduler.get_tenant_stats(str(user.id))
+            except Exception as e:
+                current_app.logger.warning(f"Statistiques d'attente indisponibles: {e}")
+        
         return jsonify(response)
         
     except Exception as e:
@@ -385,6 +708,23 @@ def api_batch_status(batch_id):
             'details': str(e) if current_app.debug else None
         }), 500
 
+@main_bp.route('/api/jobs/<job_id>/vies-response')
+@login_required
+def api_job_vies_response(job_id):
+    """Restitue à la demande la page VIES brute d'une vérification"""
+    user = get_current_user()
+    
+    job = VerificationJob.query.filter_by(id=job_id, user_id=user.id).first()
+    if not job:
+        return jsonify({'error': 'Job non trouvé'}), 404
+    
+    content = job.get_vies_response()
+    if content is None:
+        return jsonify({'error': 'Réponse VIES non disponible'}), 404
+    
+    # Servie en texte brut : la page tierce n'est jamais interprétée sur notre origine
+    return Response(content, mimetype='text/plain')
+
 @main_bp.route('/api/batches/<batch_id>/download')
 @login_required
 def api_download_batch_zip(batch_id):
@@ -430,7 +770,8 @@ def api_download_batch_zip(batch_id):
                     'company_name': job.company_name
                 })
             
-            zip_result = zip_service.create_batch_zip(batch_id, jobs_data)
+            with metrics.ZIP_BUILD_SECONDS.time():
+                zip_result = zip_service.create_batch_zip(batch_id, jobs_data)
             
             if not zip_result['success']:
                 return jsonify({'error': zip_result['error']}), 500
@@ -540,6 +881,8 @@ def _format_preview_data(validation_results):
             'is_valid': result['is_valid'],
             'is_duplicate': result.get('is_duplicate', False),
             'error': result.get('error'),
+            'recently_invalid': result.get('recently_invalid', False),
+            'suggestions': result.get('suggestions') or [],
             'status_class': _get_status_class(result)
         }
         preview.append(preview_item)
@@ -550,6 +893,8 @@ def _get_status_class(validation_result):
     """Détermine la classe CSS pour le statut d'un numéro de TVA"""
     if validation_result.get('is_duplicate'):
         return 'warning'  # Badge orange pour les doublons
+    elif validation_result.get('recently_invalid'):
+        return 'warning'  # Badge orange : déclaré invalide par VIES récemment
     elif validation_result['is_valid']:
         return 'success'  # Badge vert pour les valides
     else:
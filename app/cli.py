@@ -0,0 +1,445 @@
+"""
+Outil en ligne de commande VATProof
+Traite un fichier (CSV, XLSX, JSONL...) hors ligne : validation de format,
+lecture du cache local des verdicts et vérification VIES par un pool de
+navigateurs dans le processus (ni Redis ni Celery), avec écriture des
+résultats au fil de l'eau en CSV ou JSONL
+
+Usage:
+    python vatproof.py clients.csv -o resultats.csv
+    python vatproof.py export_erp.xlsx -o resultats.jsonl --workers 4 --cache verdicts.db
+    python vatproof.py clients.jsonl -o resultats.csv --no-verify
+"""
+import os
+import sys
+import csv
+import json
+import time
+import shutil
+import logging
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Iterator, Optional, Tuple
+
+from config import Config
+from app.services.file_service import FileService
+from app.services.vat_service import VATListValidator
+from app.services.pacing_service import LocalPacer
+from app.services.result_cache import VerificationCache
+from app.services.vat_correction import add_suggestions
+
+logger = logging.getLogger(__name__)
+
+# Lignes validées par bloc (validation par colonne)
+CHUNK_ROWS = 20000
+
+# Vérifications en attente par thread du pool (la lecture du fichier attend au-delà)
+PENDING_PER_WORKER = 4
+
+# Statuts d'une ligne du fichier de résultats
+STATUS_INVALID_FORMAT = 'invalid_format'
+STATUS_DUPLICATE = 'duplicate'
+STATUS_VALIDATED = 'validated'  # Format valide, vérification VIES désactivée
+STATUS_CACHED = 'cached'
+STATUS_VERIFIED = 'verified'
+STATUS_FAILED = 'failed'
+
+# Colonnes du fichier de résultats
+OUTPUT_FIELDS = (
+    'line_number', 'original', 'country_code', 'vat_number', 'format_valid', 'status',
+    'vies_valid', 'company_name', 'company_address', 'request_identifier',
+    'verification_date', 'pdf_path', 'duplicate_of_line', 'error', 'suggestions'
+)
+
+# Champs repris du résultat VIES
+_VIES_FIELDS = ('company_name', 'company_address', 'request_identifier', 'verification_date', 'pdf_path')
+
+
+class CSVResultWriter:
+    """Résultats en CSV (une ligne par numéro, écrite dès qu'elle est connue)"""
+
+    def __init__(self, path: str):
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=OUTPUT_FIELDS, delimiter=';')
+        self._writer.writeheader()
+
+    def write(self, row: Dict):
+        self._writer.writerow(row)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class JSONLResultWriter:
+    """Résultats en JSON Lines (un objet par numéro)"""
+
+    def __init__(self, path: str):
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, row: Dict):
+        self._file.write(json.dumps(row, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class LocalVerifier:
+    """
+    Vérification VIES dans le processus : un navigateur par thread du pool,
+    cadencement adaptatif en mémoire (LocalPacer)
+    """
+
+    def __init__(self, profile: str = Config.VIES_BROWSER_PROFILE, vies_url: Optional[str] = None,
+                 pdf_dir: Optional[str] = None, retries: int = 1):
+        """
+        Args:
+            profile (str): Profil navigateur ('lean' ou 'standard')
+            vies_url (str): URL du formulaire VIES (ex: simulateur local)
+            pdf_dir (str): Dossier où déplacer les justificatifs PDF
+            retries (int): Nouvelles tentatives après un échec
+        """
+        self.profile = profile
+        self.vies_url = vies_url
+        self.pdf_dir = pdf_dir
+        self.retries = retries
+        self.pacer = LocalPacer(max_factor=Config.VIES_PACING_MAX_FACTOR)
+        self._local = threading.local()
+        self._instances = []
+        self._lock = threading.Lock()
+
+        if pdf_dir:
+            os.makedirs(pdf_dir, exist_ok=True)
+
+    def _automation(self):
+        """Navigateur du thread courant (créé au premier appel)"""
+        from app.tasks.vies_verification import VIESAutomation
+
+        automation = getattr(self._local, 'automation', None)
+        if automation is None:
+            automation = VIESAutomation(headless=True, profile=self.profile, pacer=self.pacer)
+            if self.vies_url:
+                automation.VIES_URL = self.vies_url
+            self._local.automation = automation
+            with self._lock:
+                self._instances.append(automation)
+
+        return automation
+
+    def _retire(self):
+        """Ferme le navigateur du thread (état incertain après une erreur)"""
+        automation = getattr(self._local, 'automation', None)
+        if automation is not None:
+            automation.cleanup()
+            self._local.automation = None
+            with self._lock:
+                self._instances.remove(automation)
+
+    def verify(self, country_code: str, vat_number: str) -> Dict:
+        """
+        Vérifie un numéro, avec nouvelles tentatives en cas d'échec
+
+        Returns:
+            Dict: Résultat de VIESAutomation.verify_vat_number (sans la page brute)
+        """
+        for attempt in range(self.retries + 1):
+            result = self._automation().verify_vat_number(country_code, vat_number)
+            result.pop('vies_response', None)
+
+            if result['success']:
+                break
+
+            self._retire()
+            logger.info(f"Échec {country_code}{vat_number} (tentative {attempt + 1}): {result.get('error')}")
+
+        if self.pdf_dir and result.get('pdf_path'):
+            target = os.path.join(self.pdf_dir, os.path.basename(result['pdf_path']))
+            shutil.move(result['pdf_path'], target)
+            result['pdf_path'] = target
+
+        return result
+
+    def close(self):
+        with self._lock:
+            for automation in self._instances:
+                automation.cleanup()
+            self._instances = []
+
+
+class ProgressReporter:
+    """Avancement périodique et statistiques de débit (sur stderr)"""
+
+    def __init__(self, interval: float = 5.0, stream=sys.stderr):
+        self.interval = interval
+        self.stream = stream
+        self.start = time.monotonic()
+        self._last_report = self.start
+
+    def tick(self, stats: Counter, pending: int, bytes_read: Optional[int] = None,
+             total_bytes: Optional[int] = None, force: bool = False):
+        """Affiche l'avancement si l'intervalle est écoulé"""
+        now = time.monotonic()
+        if not force and now - self._last_report < self.interval:
+            return
+        self._last_report = now
+
+        elapsed = max(now - self.start, 1e-9)
+        position = ''
+        if bytes_read and total_bytes:
+            position = f" ({bytes_read * 100 / total_bytes:.0f}%)"
+
+        print(f"[{elapsed:7.1f}s] lignes: {stats['rows']}{position} ({stats['rows'] / elapsed:,.0f}/s) | "
+              f"vérifiées: {stats[STATUS_VERIFIED]} ({stats[STATUS_VERIFIED] * 60 / elapsed:.1f}/min) | "
+              f"cache: {stats[STATUS_CACHED]} | échecs: {stats[STATUS_FAILED]} | en cours: {pending}",
+              file=self.stream, flush=True)
+
+    def summary(self, stats: Counter, latencies: list, validation_seconds: float):
+        """Bilan final : volumes par statut et débits"""
+        elapsed = max(time.monotonic() - self.start, 1e-9)
+        lookups = stats[STATUS_CACHED] + stats[STATUS_VERIFIED] + stats[STATUS_FAILED]
+
+        lines = [
+            f"Lignes traitées      : {stats['rows']} en {elapsed:.1f}s ({stats['rows'] / elapsed:,.0f} lignes/s)",
+            f"Validation de format : {validation_seconds:.2f}s "
+            f"({stats['rows'] / max(validation_seconds, 1e-9):,.0f} lignes/s)",
+            f"Format invalide      : {stats[STATUS_INVALID_FORMAT]}",
+            f"Doublons             : {stats[STATUS_DUPLICATE]}",
+        ]
+        if stats[STATUS_VALIDATED]:
+            lines.append(f"Validés (sans VIES)  : {stats[STATUS_VALIDATED]}")
+        if lookups:
+            lines.append(f"Cache                : {stats[STATUS_CACHED]} ({stats[STATUS_CACHED] * 100 / lookups:.0f}%)")
+            lines.append(f"Vérifiés VIES        : {stats[STATUS_VERIFIED]} "
+                         f"(valides: {stats['vies_valid']}, invalides: {stats['vies_invalid']}), "
+                         f"{stats[STATUS_VERIFIED] * 60 / elapsed:.1f}/min")
+            lines.append(f"Échecs               : {stats[STATUS_FAILED]}")
+        if latencies:
+            ordered = sorted(latencies)
+            p50 = ordered[len(ordered) // 2]
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            lines.append(f"Latence VIES         : p50 {p50:.2f}s, p95 {p95:.2f}s, max {ordered[-1]:.2f}s")
+
+        print('\n'.join(lines), file=self.stream, flush=True)
+
+
+class BulkRunner:
+    """
+    Pipeline hors ligne : blocs validés par colonne, verdicts du cache,
+    vérifications VIES sur un pool de threads borné, écriture au fil de l'eau
+
+    Les lignes sont écrites dès que leur statut est connu (l'ordre du
+    fichier de résultats n'est donc pas celui de l'entrée : voir line_number).
+    """
+
+    def __init__(self, writer, verifier: Optional[LocalVerifier] = None, cache: Optional[VerificationCache] = None,
+                 workers: int = 2, chunk_rows: int = CHUNK_ROWS, progress: Optional[ProgressReporter] = None):
+        self.writer = writer
+        self.verifier = verifier
+        self.cache = cache
+        self.workers = workers
+        self.chunk_rows = chunk_rows
+        self.progress = progress or ProgressReporter()
+        self.validator = VATListValidator(keep_results=False)
+        self.stats = Counter()
+        self.latencies = []
+        self.validation_seconds = 0.0
+        self._executor = None
+        self._pending = set()
+
+    def run(self, values: Iterator[Tuple[str, Optional[int]]], total_bytes: Optional[int] = None) -> Counter:
+        """
+        Traite toutes les valeurs d'un fichier
+
+        Args:
+            values: Valeurs brutes et octets lus (FileService.iter_file_values)
+            total_bytes (int): Taille du fichier (pourcentage d'avancement)
+
+        Returns:
+            Counter: Lignes par statut
+        """
+        if self.verifier:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='vies')
+
+        block = []
+        bytes_read = None
+
+        try:
+            for vat_input, position in values:
+                block.append(vat_input)
+                bytes_read = position if position is not None else bytes_read
+
+                if len(block) >= self.chunk_rows:
+                    self._process_block(block)
+                    block = []
+                    self.writer.flush()
+                    self.progress.tick(self.stats, len(self._pending), bytes_read, total_bytes)
+
+            if block:
+                self._process_block(block)
+
+            while self._pending:
+                self._drain(bytes_read, total_bytes)
+
+        finally:
+            if self._executor:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+            self.writer.flush()
+            self.progress.tick(self.stats, len(self._pending), bytes_read, total_bytes, force=True)
+
+        return self.stats
+
+    def _process_block(self, block: list):
+        """Valide un bloc puis écrit, sert depuis le cache ou soumet chaque ligne"""
+        start = time.perf_counter()
+        results = self.validator.extend(block)
+        add_suggestions([result for result in results if not result['is_valid']], cache=self.cache)
+        self.validation_seconds += time.perf_counter() - start
+        self.stats['rows'] += len(block)
+
+        for validation_result in results:
+            if not validation_result['is_valid']:
+                self._write(validation_result, STATUS_INVALID_FORMAT)
+            elif validation_result['is_duplicate']:
+                self._write(validation_result, STATUS_DUPLICATE)
+            elif self.verifier is None:
+                self._write(validation_result, STATUS_VALIDATED)
+            else:
+                self._lookup(validation_result)
+
+    def _lookup(self, validation_result: Dict):
+        """Verdict du cache, sinon vérification sur le pool (en attente bornée)"""
+        country_code, vat_number = validation_result['country_code'], validation_result['vat_number']
+
+        cached = self.cache.get(country_code, vat_number) if self.cache else None
+        if cached is not None:
+            self._write(validation_result, STATUS_CACHED, cached)
+            return
+
+        while len(self._pending) >= self.workers * PENDING_PER_WORKER:
+            self._drain()
+
+        self._pending.add(self._executor.submit(self._verify, validation_result))
+
+    def _verify(self, validation_result: Dict) -> Tuple[Dict, Dict, float]:
+        """Exécuté dans un thread du pool"""
+        start = time.monotonic()
+        try:
+            result = self.verifier.verify(validation_result['country_code'], validation_result['vat_number'])
+        except Exception as e:
+            result = {'success': False, 'is_valid': False, 'error': f'Erreur lors de la vérification: {e}'}
+        return validation_result, result, time.monotonic() - start
+
+    def _drain(self, bytes_read: Optional[int] = None, total_bytes: Optional[int] = None):
+        """Attend au moins une vérification et écrit les résultats terminés"""
+        done, self._pending = wait(self._pending, timeout=self.progress.interval, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            validation_result, result, latency = future.result()
+            self.latencies.append(latency)
+
+            if result.get('success'):
+                if self.cache:
+                    self.cache.put(validation_result['country_code'], validation_result['vat_number'], result)
+                self.stats['vies_valid' if result.get('is_valid') else 'vies_invalid'] += 1
+                self._write(validation_result, STATUS_VERIFIED, result)
+            else:
+                self._write(validation_result, STATUS_FAILED, result)
+
+        self.progress.tick(self.stats, len(self._pending), bytes_read, total_bytes)
+
+    def _write(self, validation_result: Dict, status: str, result: Optional[Dict] = None):
+        """Écrit la ligne de résultats d'un numéro"""
+        self.stats[status] += 1
+
+        row = {
+            'line_number': validation_result['line_number'],
+            'original': validation_result['original'],
+            'country_code': validation_result['country_code'],
+            'vat_number': validation_result['vat_number'],
+            'format_valid': validation_result['is_valid'],
+            'status': status,
+            'vies_valid': None,
+            'duplicate_of_line': validation_result.get('duplicate_of_line'),
+            'error': validation_result['error'],
+            'suggestions': ' '.join(validation_result.get('suggestions') or ()) or None,
+        }
+        row.update(dict.fromkeys(_VIES_FIELDS))
+
+        if result is not None:
+            row.update({field: result.get(field) for field in _VIES_FIELDS})
+            row['vies_valid'] = result.get('is_valid') if status != STATUS_FAILED else None
+            row['error'] = result.get('error')
+
+        self.writer.write(row)
+
+
+def _open_writer(path: str, output_format: Optional[str]):
+    """Writer du fichier de résultats (format déduit de l'extension par défaut)"""
+    output_format = output_format or ('jsonl' if path.lower().endswith(('.jsonl', '.ndjson')) else 'csv')
+    return JSONLResultWriter(path) if output_format == 'jsonl' else CSVResultWriter(path)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='vatproof',
+        description='Validation et vérification VIES hors ligne d\'un fichier de numéros de TVA'
+    )
+    parser.add_argument('input', help='Fichier à traiter (csv, txt, xlsx, xls, jsonl)')
+    parser.add_argument('-o', '--output', required=True, help='Fichier de résultats (.csv ou .jsonl)')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default=None,
+                        help='Format des résultats (défaut : selon l\'extension)')
+    parser.add_argument('--no-verify', action='store_true', help='Validation de format seulement, sans VIES')
+    parser.add_argument('--workers', type=int, default=2, help='Navigateurs VIES en parallèle')
+    parser.add_argument('--retries', type=int, default=1, help='Nouvelles tentatives après un échec VIES')
+    parser.add_argument('--cache', default=Config.VERIFICATION_CACHE_PATH,
+                        help='Cache SQLite des verdicts (créé au besoin)')
+    parser.add_argument('--cache-max-age', type=float, default=7,
+                        help='Âge maximal d\'un verdict réutilisé, en jours')
+    parser.add_argument('--profile', default=Config.VIES_BROWSER_PROFILE, help='Profil navigateur')
+    parser.add_argument('--vies-url', default=None, help='URL du formulaire VIES (ex: simulateur local)')
+    parser.add_argument('--pdf-dir', default=None, help='Dossier des justificatifs PDF')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='Lignes validées par bloc')
+    parser.add_argument('--progress-interval', type=float, default=5.0, help='Avancement toutes les N secondes')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Logs détaillés')
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    extension = os.path.splitext(args.input)[1].lower().lstrip('.')
+    if not os.path.isfile(args.input):
+        print(f"Fichier introuvable: {args.input}", file=sys.stderr)
+        return 2
+
+    cache = VerificationCache(args.cache, max_age=int(args.cache_max_age * 86400)) if args.cache else None
+    verifier = None if args.no_verify else LocalVerifier(
+        profile=args.profile, vies_url=args.vies_url, pdf_dir=args.pdf_dir, retries=args.retries
+    )
+    writer = _open_writer(args.output, args.format)
+    runner = BulkRunner(writer, verifier=verifier, cache=cache, workers=args.workers,
+                        chunk_rows=args.chunk_rows, progress=ProgressReporter(args.progress_interval))
+
+    try:
+        runner.run(FileService.iter_file_values(args.input, extension), total_bytes=os.path.getsize(args.input))
+    except KeyboardInterrupt:
+        print("Interrompu : résultats partiels conservés", file=sys.stderr)
+        return 130
+    finally:
+        writer.close()
+        if verifier:
+            verifier.close()
+        if cache:
+            cache.close()
+        runner.progress.summary(runner.stats, runner.latencies, runner.validation_seconds)
+
+    return 0
@@ -2,13 +2,20 @@
 Modèles de base de données pour VATProof
 Définit les tables et relations pour la gestion des utilisateurs et vérifications
 """
-from datetime import datetime
+from datetime import datetime, timedelta
+import json
 import uuid
+import logging
 from sqlalchemy.dialects.postgresql import UUID
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import update, case, or_, and_
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from app import db
+from app.services.metrics import SYSTEM_LOG_DROPPED
+
+logger = logging.getLogger(__name__)
 
 class User(db.Model):
     """Modèle utilisateur pour l'authentification et la gestion des quotas"""
@@ -112,6 +119,13 @@ class VerificationJob(db.Model):
     status = db.Column(db.String(50), nullable=False, default='pending')  # pending, processing, completed, failed
     celery_task_id = db.Column(db.String(100), nullable=True, index=True)
     
+    # Bail de traitement (renouvelé par le worker, repris par le reaper à expiration)
+    lease_owner = db.Column(db.String(150), nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    # Envoi du message Celery (None : pas encore envoyé, en file équitable ou en attente d'un pays)
+    dispatched_at = db.Column(db.DateTime, nullable=True)
+    
     # Résultats VIES
     is_valid = db.Column(db.Boolean, nullable=True)
     vies_company_name = db.Column(db.String(255), nullable=True)
@@ -124,7 +138,11 @@ class VerificationJob(db.Model):
     
     # Logs et erreurs
     error_message = db.Column(db.Text, nullable=True)
-    vies_response = db.Column(db.Text, nullable=True)  # Réponse brute VIES
+    vies_response_ref = db.Column(db.String(255), nullable=True)  # Réponse brute VIES (ResponseStore)
+    
+    # Performances de la vérification
+    duration_ms = db.Column(db.Integer, nullable=True)  # Durée totale VIES
+    phase_timings = db.Column(db.String(255), nullable=True)  # JSON compact {phase: ms}
     
     # Métadonnées
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -136,41 +154,348 @@ class VerificationJob(db.Model):
         db.Index('idx_user_status', 'user_id', 'status'),
         db.Index('idx_batch_status', 'batch_id', 'status'),
         db.Index('idx_vat_lookup', 'country_code', 'vat_number'),
+        db.Index('idx_country_duration', 'country_code', 'completed_at', 'duration_ms'),
+        db.Index('idx_status_lease', 'status', 'lease_expires_at'),
+        db.Index('idx_status_dispatch', 'status', 'dispatched_at'),
     )
     
-    def start_processing(self, celery_task_id=None):
-        """Marque le job comme en cours de traitement"""
+    def start_processing(self, celery_task_id=None, commit=True):
+        """
+        Marque le job comme envoyé en vérification, avant l'envoi du message
+        Celery (sinon le worker pourrait terminer le job avant cette écriture,
+        qui le remettrait en cours)
+        """
         self.status = 'processing'
         self.started_at = datetime.utcnow()
+        self.dispatched_at = self.started_at
         if celery_task_id:
             self.celery_task_id = celery_task_id
+        if commit:
+            db.session.commit()
+    
+    @classmethod
+    def claim(cls, job_id, owner, lease_seconds):
+        """
+        Prend possession d'un job avant l'appel VIES (UPDATE conditionnel atomique)
+        
+        Échoue si le job est déjà terminé ou tenu par un autre worker dont le
+        bail court encore : aucune vérification n'est faite deux fois.
+        
+        Args:
+            job_id: ID du job
+            owner (str): Identifiant du worker / de la tâche
+            lease_seconds (int): Durée du bail
+            
+        Returns:
+            bool: True si le job est acquis
+        """
+        now = datetime.utcnow()
+        table = cls.__table__
+        
+        stmt = (
+            update(table)
+            .where(and_(
+                table.c.id == job_id,
+                table.c.status.notin_(('completed', 'failed')),
+                or_(
+                    table.c.lease_expires_at.is_(None),
+                    table.c.lease_expires_at < now,
+                    table.c.lease_owner == owner
+                )
+            ))
+            .values(
+                status='processing',
+                lease_owner=owner,
+                lease_expires_at=now + timedelta(seconds=lease_seconds),
+                attempts=table.c.attempts + 1,
+                started_at=now
+            )
+        )
+        
+        claimed = db.session.execute(stmt).rowcount == 1
         db.session.commit()
+        return claimed
     
-    def complete_success(self, vies_data):
-        """Marque le job comme réussi avec les données VIES"""
-        self.status = 'completed'
-        self.completed_at = datetime.utcnow()
-        self.is_valid = vies_data.get('is_valid', False)
-        self.vies_company_name = vies_data.get('company_name')
-        self.vies_company_address = vies_data.get('company_address')
-        self.verification_date = datetime.utcnow()
-        self.pdf_path = vies_data.get('pdf_path')
-        self.vies_response = vies_data.get('vies_response')
+    @classmethod
+    def renew_lease_statement(cls, job_id, owner, lease_seconds):
+        """Instruction de renouvellement du bail (exécutée par le heartbeat du worker)"""
+        table = cls.__table__
+        return (
+            update(table)
+            .where(and_(table.c.id == job_id, table.c.lease_owner == owner, table.c.status == 'processing'))
+            .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds))
+        )
+    
+    @classmethod
+    def release(cls, job_id, owner):
+        """Rend un job non terminé (relance différée) sans attendre l'expiration du bail"""
+        table = cls.__table__
+        db.session.execute(
+            update(table)
+            .where(and_(table.c.id == job_id, table.c.lease_owner == owner, table.c.status == 'processing'))
+            .values(status='pending', lease_owner=None, lease_expires_at=None, dispatched_at=datetime.utcnow())
+        )
+        db.session.commit()
+    
+    @classmethod
+    def park(cls, job_id, owner=None):
+        """
+        Job mis en attente d'un pays indisponible : il n'est plus dans le broker,
+        le reaper ne doit pas le relancer (le disjoncteur le relancera)
+        """
+        table = cls.__table__
+        lease_held = table.c.lease_owner.is_(None)
+        if owner:
+            lease_held = or_(lease_held, table.c.lease_owner == owner)
+        
+        db.session.execute(
+            update(table)
+            .where(and_(table.c.id == job_id, table.c.status.notin_(('completed', 'failed')), lease_held))
+            .values(status='pending', lease_owner=None, lease_expires_at=None, dispatched_at=None)
+        )
+        db.session.commit()
+    
+    @classmethod
+    def mark_dispatched(cls, job_ids, now=None):
+        """Enregistre l'envoi des messages Celery de jobs non terminés"""
+        if not job_ids:
+            return
+        table = cls.__table__
+        db.session.execute(
+            update(table)
+            .where(and_(table.c.id.in_(job_ids), table.c.status.notin_(('completed', 'failed'))))
+            .values(dispatched_at=now or datetime.utcnow())
+        )
+        db.session.commit()
+    
+    @classmethod
+    def reclaim_orphan(cls, job_id, now, via_scheduler=False):
+        """
+        Libère un job dont le bail a expiré (worker perdu)
+        
+        Args:
+            via_scheduler (bool): Relance par les files équitables (pas encore envoyé)
+            
+        Returns:
+            bool: True si ce reaper a libéré le job (pas de double relance)
+        """
+        table = cls.__table__
+        stmt = (
+            update(table)
+            .where(and_(table.c.id == job_id, table.c.status == 'processing', table.c.lease_expires_at < now))
+            .values(status='pending', lease_owner=None, lease_expires_at=None,
+                    dispatched_at=None if via_scheduler else now)
+        )
+        return db.session.execute(stmt).rowcount == 1
+    
+    @classmethod
+    def find_orphans(cls, now, limit=500):
+        """Jobs en cours dont le bail a expiré"""
+        return cls.query.filter(
+            cls.status == 'processing',
+            cls.lease_expires_at < now
+        ).limit(limit).all()
+    
+    @classmethod
+    def reclaim_stale_dispatch(cls, job_id, dispatched_before, now, via_scheduler=False):
+        """
+        Reprend un job envoyé avant dispatched_before et jamais pris par un
+        worker, dont le message Celery n'est plus dans le broker
+        
+        Args:
+            via_scheduler (bool): Relance par les files équitables (pas encore envoyé)
+            
+        Returns:
+            bool: True si ce reaper a repris le job (pas de double relance)
+        """
+        table = cls.__table__
+        stmt = (
+            update(table)
+            .where(and_(
+                table.c.id == job_id,
+                table.c.status.notin_(('completed', 'failed')),
+                table.c.lease_expires_at.is_(None),
+                table.c.dispatched_at < dispatched_before
+            ))
+            .values(status='pending', dispatched_at=None if via_scheduler else now)
+        )
+        return db.session.execute(stmt).rowcount == 1
+    
+    @classmethod
+    def find_stale_dispatches(cls, dispatched_before, limit=500):
+        """Jobs envoyés avant dispatched_before qu'aucun worker n'a pris"""
+        return cls.query.filter(
+            cls.status.notin_(('completed', 'failed')),
+            cls.lease_expires_at.is_(None),
+            cls.dispatched_at < dispatched_before
+        ).limit(limit).all()
+    
+    @classmethod
+    def iter_recent_verdicts(cls, since, batch_size=10000):
+        """
+        Verdicts VIES obtenus depuis une date, du plus ancien au plus récent
+        (lecture par lots, sans charger les objets)
+        
+        Yields:
+            tuple: (country_code, vat_number, is_valid)
+        """
+        query = (
+            db.session.query(cls.country_code, cls.vat_number, cls.is_valid)
+            .filter(cls.status == 'completed', cls.verification_date >= since, cls.is_valid.isnot(None))
+            .order_by(cls.verification_date)
+            .yield_per(batch_size)
+        )
+        yield from query
+    
+    def to_task_kwargs(self):
+        """Arguments des tâches de vérification Celery pour ce job"""
+        return {
+            'country_code': self.country_code,
+            'vat_number': self.vat_number,
+            'job_data': {
+                'job_id': str(self.id),
+                'batch_id': str(self.batch_id) if self.batch_id else None,
+                'user_id': str(self.user_id),
+                'line_number': self.line_number,
+                'company_name': self.company_name
+            }
+        }
+    
+    def has_live_lease(self, now=None):
+        """Indique si un worker tient encore le job"""
+        return bool(self.lease_expires_at and self.lease_expires_at >= (now or datetime.utcnow()))
+    
+    def was_recently_dispatched(self, dispatch_timeout, now=None):
+        """Indique si le message Celery du job peut encore être en file"""
+        now = now or datetime.utcnow()
+        return bool(self.dispatched_at and self.dispatched_at >= now - timedelta(seconds=dispatch_timeout))
+    
+    def _finish(self, owner, **values):
+        """
+        Termine le job par un UPDATE conditionnel au bail : sans effet si le job
+        est déjà terminé ou si son bail a été repris par un autre worker (bail
+        perdu pendant la vérification). Le commit est laissé à l'appelant.
+        
+        Args:
+            owner (str): Détenteur du bail (None si aucun bail n'a été pris)
+            **values: Colonnes du résultat
+            
+        Returns:
+            bool: True si ce worker a terminé le job
+        """
+        table = self.__class__.__table__
+        lease_held = table.c.lease_owner.is_(None)
+        if owner:
+            lease_held = or_(lease_held, table.c.lease_owner == owner)
+        
+        stmt = (
+            update(table)
+            .where(and_(
+                table.c.id == self.id,
+                table.c.status.notin_(('completed', 'failed')),
+                lease_held
+            ))
+            .values(lease_owner=None, lease_expires_at=None, completed_at=datetime.utcnow(), **values)
+        )
+        return db.session.execute(stmt).rowcount == 1
+    
+    def complete_success(self, vies_data, owner=None):
+        """
+        Marque le job comme réussi avec les données VIES
+        
+        Returns:
+            bool: False si le job était déjà terminé ou repris par un autre worker
+        """
+        now = datetime.utcnow()
+        is_valid = bool(vies_data.get('is_valid', False))
+        pdf_path = vies_data.get('pdf_path')
+        values = dict(
+            status='completed',
+            is_valid=is_valid,
+            vies_company_name=vies_data.get('company_name'),
+            vies_company_address=vies_data.get('company_address'),
+            verification_date=now,
+            pdf_path=pdf_path,
+            vies_response_ref=vies_data.get('vies_response_ref'),
+            **self._timing_values(vies_data.get('timings'))
+        )
         
         # Génération du nom de fichier PDF
-        if self.pdf_path:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            self.pdf_filename = f"{self.country_code}{self.vat_number}_{timestamp}.pdf"
+        if pdf_path:
+            values['pdf_filename'] = f"{self.country_code}{self.vat_number}_{now.strftime('%Y%m%d_%H%M%S')}.pdf"
+        
+        finished = self._finish(owner, **values)
+        
+        # Compteurs du batch mis à jour dans la même transaction (une seule fois par job)
+        if finished and self.batch_id:
+            VerificationBatch.record_job_result(self.batch_id, successful=is_valid)
         
         db.session.commit()
+        return finished
     
-    def complete_failure(self, error_message):
-        """Marque le job comme échoué"""
-        self.status = 'failed'
+    def complete_failure(self, error_message, timings=None, owner=None):
+        """
+        Marque le job comme échoué
+        
+        Returns:
+            bool: False si le job était déjà terminé ou repris par un autre worker
+        """
+        finished = self._finish(
+            owner,
+            status='failed',
+            is_valid=False,
+            error_message=error_message,
+            **self._timing_values(timings)
+        )
+        
+        if finished and self.batch_id:
+            VerificationBatch.record_job_result(self.batch_id, failed=True)
+        
+        db.session.commit()
+        return finished
+    
+    def complete_known_invalid(self):
+        """
+        Termine sans appel VIES un job dont le numéro a été récemment confirmé
+        invalide (cache négatif) ; le commit est laissé à l'appelant
+        """
+        already_done = self.is_finished()
+        self.status = 'completed'
         self.completed_at = datetime.utcnow()
         self.is_valid = False
-        self.error_message = error_message
-        db.session.commit()
+        self.error_message = 'Numéro récemment confirmé invalide par VIES, vérification non relancée'
+        
+        if self.batch_id and not already_done:
+            VerificationBatch.record_job_result(self.batch_id, successful=False)
+    
+    def is_finished(self):
+        """Indique si le job a atteint un état final"""
+        return self.status in ('completed', 'failed')
+    
+    @staticmethod
+    def _timing_values(timings):
+        """Colonnes de la décomposition des durées de la vérification (ms)"""
+        if not timings:
+            return {}
+        return {
+            'duration_ms': timings.get('total'),
+            'phase_timings': json.dumps(
+                {phase: ms for phase, ms in timings.items() if phase != 'total'},
+                separators=(',', ':')
+            )
+        }
+    
+    def get_vies_response(self):
+        """Relit à la demande la réponse brute VIES (décompressée)"""
+        if not self.vies_response_ref:
+            return None
+        
+        from app.services.response_store import ResponseStore
+        return ResponseStore(current_app.config['VIES_RESPONSE_STORE_DIR']).load(self.vies_response_ref)
+    
+    def get_phase_timings(self):
+        """Retourne la décomposition des durées par phase (ms)"""
+        return json.loads(self.phase_timings) if self.phase_timings else {}
     
     def to_dict(self):
         """Conversion en dictionnaire pour les API"""
@@ -189,6 +514,9 @@ class VerificationJob(db.Model):
             'verification_date': self.verification_date.isoformat() if self.verification_date else None,
             'pdf_filename': self.pdf_filename,
             'error_message': self.error_message,
+            'duration_ms': self.duration_ms,
+            'phase_timings': self.get_phase_timings(),
+            'attempts': self.attempts,
             'created_at': self.created_at.isoformat(),
             'started_at': self.started_at.isoformat() if self.started_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None
@@ -241,8 +569,49 @@ class VerificationBatch(db.Model):
         self.started_at = datetime.utcnow()
         db.session.commit()
     
+    @classmethod
+    def record_job_result(cls, batch_id, successful=False, failed=False):
+        """
+        Incrémente atomiquement les compteurs du batch à la fin d'un job
+        
+        La fin du batch est détectée dans la même instruction UPDATE (les
+        expressions SET voient les valeurs d'avant la mise à jour), sans
+        relire les jobs ni verrouiller la ligne côté application.
+        
+        Args:
+            batch_id: ID du batch
+            successful (bool): Job terminé avec un numéro valide
+            failed (bool): Job en échec
+            
+        Returns:
+            bool: True si ce job termine le batch
+        """
+        table = cls.__table__
+        finishes_batch = table.c.completed_jobs + 1 >= table.c.total_jobs
+        
+        stmt = (
+            update(table)
+            .where(table.c.id == batch_id)
+            .values(
+                completed_jobs=table.c.completed_jobs + 1,
+                successful_jobs=table.c.successful_jobs + (1 if successful else 0),
+                failed_jobs=table.c.failed_jobs + (1 if failed else 0),
+                status=case((finishes_batch, 'completed'), else_='processing'),
+                completed_at=case((finishes_batch, datetime.utcnow()), else_=table.c.completed_at)
+            )
+            .returning(table.c.completed_jobs, table.c.total_jobs)
+        )
+        
+        row = db.session.execute(stmt).first()
+        return bool(row) and row.completed_jobs == row.total_jobs
+    
     def update_progress(self):
-        """Met à jour les statistiques de progression"""
+        """
+        Recalcule les statistiques à partir des jobs (réconciliation)
+        
+        Les compteurs sont maintenus par record_job_result ; ce recalcul
+        complet ne sert qu'à réparer un batch après incident.
+        """
         jobs = self.jobs.all()
         self.total_jobs = len(jobs)
         self.completed_jobs = len([j for j in jobs if j.status in ['completed', 'failed']])
@@ -339,7 +708,32 @@ class SystemLog(db.Model):
     
     @classmethod
     def _create_log(cls, level, category, message, details, user_id):
-        """Crée un log en base"""
+        """Crée un log en base (via le puits tamponné si activé)"""
+        config = current_app.config
+        if config.get('SYSTEM_LOG_BUFFERED', True):
+            # Jamais de rollback ici : la session de l'appelant n'est pas concernée
+            try:
+                from app.services.log_sink import get_log_sink
+                
+                sink = get_log_sink(
+                    db.engine, cls.__table__,
+                    max_queue_size=config.get('SYSTEM_LOG_QUEUE_SIZE', 10000),
+                    batch_size=config.get('SYSTEM_LOG_BATCH_SIZE', 200),
+                    flush_interval=config.get('SYSTEM_LOG_FLUSH_INTERVAL', 1.0)
+                )
+                sink.emit({
+                    'level': level,
+                    'category': category,
+                    'message': message,
+                    'details': details,
+                    'user_id': user_id,
+                    'created_at': datetime.utcnow()
+                })
+            except Exception as e:
+                SYSTEM_LOG_DROPPED.inc()
+                logger.warning(f"Log système {category} abandonné: {e}")
+            return
+        
         try:
             log = cls(
                 level=level,
@@ -350,9 +744,11 @@ class SystemLog(db.Model):
             )
             db.session.add(log)
             db.session.commit()
-        except Exception:
+        except Exception as e:
             # En cas d'erreur lors du logging, ne pas planter l'application
             db.session.rollback()
+            SYSTEM_LOG_DROPPED.inc()
+            logger.warning(f"Log système {category} abandonné: {e}")
     
     def __repr__(self):
         return f'<SystemLog {self.level} {self.category}>'
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+Stockage temporaire des numéros validés à l'import
+Les lignes prêtes pour VIES sont conservées dans Redis, par batch, jusqu'au
+lancement de la vérification
+"""
+import json
+import zlib
+from typing import Dict, List, Optional
+import redis
+
+# Colonnes conservées, dans l'ordre du format compact (une liste par ligne)
+STAGED_FIELDS = ('country_code', 'vat_number', 'original_input', 'line_number', 'company_name')
+
+
+class BatchStagingService:
+    """Lignes validées d'un batch, compressées dans Redis"""
+
+    def __init__(self, redis_url: str = 'redis://localhost:6379/1', ttl: int = 86400):
+        """
+        Initialise le stockage
+
+        Args:
+            redis_url (str): URL de connexion Redis
+            ttl (int): Durée de conservation en secondes
+        """
+        self.redis_client = redis.from_url(redis_url)
+        self.prefix = 'vatproof:staging:'
+        self.ttl = ttl
+
+    def stage(self, batch_id: str, rows: List[Dict]) -> int:
+        """
+        Enregistre les lignes validées d'un batch
+
+        Args:
+            batch_id (str): ID du batch
+            rows (List[Dict]): Lignes de VATService.prepare_for_vies_verification
+
+        Returns:
+            int: Taille stockée en octets
+        """
+        compact = [[row.get(field) for field in STAGED_FIELDS] for row in rows]
+        payload = zlib.compress(json.dumps(compact, separators=(',', ':')).encode('utf-8'))
+
+        self.redis_client.setex(f'{self.prefix}{batch_id}', self.ttl, payload)
+        return len(payload)
+
+    def load(self, batch_id: str) -> Optional[List[Dict]]:
+        """
+        Relit les lignes d'un batch
+
+        Args:
+            batch_id (str): ID du batch
+
+        Returns:
+            Optional[List[Dict]]: Lignes, ou None si absentes / expirées
+        """
+        payload = self.redis_client.get(f'{self.prefix}{batch_id}')
+        if payload is None:
+            return None
+
+        compact = json.loads(zlib.decompress(payload))
+        return [dict(zip(STAGED_FIELDS, row)) for row in compact]
+
+    def discard(self, batch_id: str):
+        """Supprime les lignes d'un batch (après création des jobs)"""
+        self.redis_client.delete(f'{self.prefix}{batch_id}')
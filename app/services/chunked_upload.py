@@ -0,0 +1,274 @@
+"""
+Upload de fichiers volumineux par morceaux
+Les morceaux sont écrits sur disque à leur arrivée ; l'état de la session
+(morceaux reçus, progression de l'analyse) est conservé dans Redis
+
+Le fichier est écrit par le serveur web puis relu et supprimé par les workers :
+upload_dir doit désigner le même stockage partagé des deux côtés
+"""
+import os
+import json
+import uuid
+import math
+import logging
+from typing import Dict, List, Optional
+import redis
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkedUploadService:
+    """
+    Sessions d'upload reprenables
+
+    Le fichier est préalloué puis chaque morceau est écrit à son offset :
+    renvoyer un morceau déjà reçu est sans effet, et un client interrompu
+    reprend en ne renvoyant que les morceaux manquants.
+    """
+
+    STATUS_UPLOADING = 'uploading'
+    STATUS_PARSING = 'parsing'
+    STATUS_PARSED = 'parsed'
+    STATUS_FAILED = 'failed'
+
+    def __init__(self, upload_dir: str = 'temp_uploads', redis_url: str = 'redis://localhost:6379/1',
+                 chunk_size: int = 8 * 1024 * 1024, max_size: int = 1024 * 1024 * 1024, ttl: int = 86400):
+        """
+        Initialise le service
+
+        Args:
+            upload_dir (str): Dossier des fichiers en cours d'upload
+            redis_url (str): URL de connexion Redis
+            chunk_size (int): Taille d'un morceau en octets
+            max_size (int): Taille maximale d'un fichier
+            ttl (int): Durée de vie d'une session en secondes
+        """
+        self.upload_dir = os.path.abspath(upload_dir)
+        self.redis_client = redis.from_url(redis_url)
+        self.chunk_size = chunk_size
+        self.max_size = max_size
+        self.ttl = ttl
+        self.prefix = 'vatproof:upload:'
+
+    def _key(self, upload_id: str) -> str:
+        return f'{self.prefix}{upload_id}'
+
+    def _chunks_key(self, upload_id: str) -> str:
+        return f'{self.prefix}{upload_id}:chunks'
+
+    def _path(self, upload_id: str) -> str:
+        return os.path.join(self.upload_dir, f'{upload_id}.part')
+
+    def init(self, user_id: str, filename: str, extension: str, total_size: int) -> Dict:
+        """
+        Ouvre une session d'upload
+
+        Args:
+            user_id (str): ID du propriétaire
+            filename (str): Nom d'origine du fichier
+            extension (str): Extension validée
+            total_size (int): Taille annoncée en octets
+
+        Returns:
+            Dict: ID de session, taille et nombre de morceaux attendus
+        """
+        if total_size <= 0:
+            raise ValueError('Taille de fichier invalide')
+        if total_size > self.max_size:
+            raise ValueError(f'Fichier trop volumineux (maximum {self.max_size // (1024 * 1024)} MB)')
+
+        upload_id = str(uuid.uuid4())
+        total_chunks = math.ceil(total_size / self.chunk_size)
+
+        pipe = self.redis_client.pipeline()
+        pipe.hset(self._key(upload_id), mapping={
+            'user_id': user_id,
+            'filename': filename,
+            'extension': extension,
+            'total_size': total_size,
+            'chunk_size': self.chunk_size,
+            'total_chunks': total_chunks,
+            'source': 'chunked',
+            'status': self.STATUS_UPLOADING
+        })
+        pipe.expire(self._key(upload_id), self.ttl)
+        pipe.execute()
+
+        # Préallocation : chaque morceau est écrit à son offset, dans n'importe quel ordre
+        # (session créée avant le fichier : purge_stale_files ne le supprime pas)
+        os.makedirs(self.upload_dir, exist_ok=True)
+        with open(self._path(upload_id), 'wb') as f:
+            f.truncate(total_size)
+
+        return {'upload_id': upload_id, 'chunk_size': self.chunk_size, 'total_chunks': total_chunks}
+
+    def store_file(self, user_id: str, filename: str, extension: str, file) -> str:
+        """
+        Enregistre un fichier reçu en une seule requête, prêt pour l'analyse
+
+        Args:
+            user_id (str): ID du propriétaire
+            filename (str): Nom d'origine du fichier
+            extension (str): Extension validée
+            file (FileStorage): Fichier de la requête multipart
+
+        Returns:
+            str: ID de session (suivi de l'analyse comme pour un upload par morceaux)
+        """
+        upload_id = str(uuid.uuid4())
+
+        pipe = self.redis_client.pipeline()
+        pipe.hset(self._key(upload_id), mapping={
+            'user_id': user_id,
+            'filename': filename,
+            'extension': extension,
+            'total_size': 0,
+            'chunk_size': 0,
+            'total_chunks': 0,
+            'source': 'file',
+            'completed': 1,
+            'status': self.STATUS_PARSING
+        })
+        pipe.expire(self._key(upload_id), self.ttl)
+        pipe.execute()
+
+        os.makedirs(self.upload_dir, exist_ok=True)
+        file.save(self._path(upload_id))
+        self.redis_client.hset(self._key(upload_id), 'total_size', os.path.getsize(self._path(upload_id)))
+
+        return upload_id
+
+    def get(self, upload_id: str) -> Optional[Dict]:
+        """
+        Relit une session
+
+        Args:
+            upload_id (str): ID de session
+
+        Returns:
+            Optional[Dict]: Métadonnées et progression, ou None si inconnue / expirée
+        """
+        raw = self.redis_client.hgetall(self._key(upload_id))
+        if not raw:
+            return None
+
+        session = {k.decode(): v.decode() for k, v in raw.items()}
+        for field in ('total_size', 'chunk_size', 'total_chunks', 'bytes_read', 'rows_read',
+                      'valid_count', 'invalid_count', 'duplicate_count'):
+            if field in session:
+                session[field] = int(session[field])
+        for field in ('preview', 'countries'):
+            if field in session:
+                session[field] = json.loads(session[field])
+
+        session['path'] = self._path(upload_id)
+        return session
+
+    def write_chunk(self, upload_id: str, session: Dict, index: int, data: bytes) -> int:
+        """
+        Écrit un morceau à sa place dans le fichier
+
+        Args:
+            upload_id (str): ID de session
+            session (Dict): Session retournée par get
+            index (int): Index du morceau (à partir de 0)
+            data (bytes): Contenu du morceau
+
+        Returns:
+            int: Nombre de morceaux reçus
+        """
+        if session['status'] != self.STATUS_UPLOADING:
+            raise ValueError('Upload déjà finalisé')
+        if not 0 <= index < session['total_chunks']:
+            raise ValueError(f'Index de morceau invalide: {index}')
+
+        # Tous les morceaux font chunk_size octets, sauf le dernier
+        offset = index * session['chunk_size']
+        expected = min(session['chunk_size'], session['total_size'] - offset)
+        if len(data) != expected:
+            raise ValueError(f'Taille du morceau {index} incorrecte ({len(data)} octets, {expected} attendus)')
+
+        with open(session['path'], 'r+b') as f:
+            f.seek(offset)
+            f.write(data)
+
+        pipe = self.redis_client.pipeline()
+        pipe.sadd(self._chunks_key(upload_id), index)
+        pipe.expire(self._chunks_key(upload_id), self.ttl)
+        pipe.expire(self._key(upload_id), self.ttl)
+        pipe.scard(self._chunks_key(upload_id))
+        return pipe.execute()[-1]
+
+    def missing_chunks(self, upload_id: str, session: Dict) -> List[int]:
+        """Index des morceaux non encore reçus (reprise après coupure)"""
+        received = {int(i) for i in self.redis_client.smembers(self._chunks_key(upload_id))}
+        return [i for i in range(session['total_chunks']) if i not in received]
+
+    def complete(self, upload_id: str, session: Dict) -> bool:
+        """
+        Clôt la réception si tous les morceaux sont arrivés
+
+        Args:
+            upload_id (str): ID de session
+            session (Dict): Session retournée par get
+
+        Returns:
+            bool: True si la session passe en analyse (un seul appel gagnant)
+        """
+        if self.missing_chunks(upload_id, session):
+            return False
+
+        # HSETNX sur un marqueur : deux appels concurrents ne lancent qu'une analyse
+        if not self.redis_client.hsetnx(self._key(upload_id), 'completed', 1):
+            return False
+
+        self.redis_client.hset(self._key(upload_id), 'status', self.STATUS_PARSING)
+        self.redis_client.delete(self._chunks_key(upload_id))
+        return True
+
+    def update_progress(self, upload_id: str, **fields):
+        """Publie la progression de l'analyse (compteurs, aperçu, statut, batch_id...)"""
+        for field in ('preview', 'countries'):
+            if fields.get(field) is not None:
+                fields[field] = json.dumps(fields[field], separators=(',', ':'))
+
+        pipe = self.redis_client.pipeline()
+        pipe.hset(self._key(upload_id), mapping={k: v for k, v in fields.items() if v is not None})
+        pipe.expire(self._key(upload_id), self.ttl)
+        pipe.execute()
+
+    def discard_file(self, session: Dict):
+        """Supprime le fichier reçu (la session reste consultable jusqu'à expiration)"""
+        try:
+            os.remove(session['path'])
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Suppression du fichier d'upload impossible: {e}")
+
+    def purge_stale_files(self) -> int:
+        """
+        Supprime les fichiers des sessions abandonnées
+
+        Returns:
+            int: Nombre de fichiers supprimés
+        """
+        if not os.path.isdir(self.upload_dir):
+            return 0
+
+        purged = 0
+        for name in os.listdir(self.upload_dir):
+            if not name.endswith('.part'):
+                continue
+
+            upload_id = name[:-len('.part')]
+            if self.redis_client.exists(self._key(upload_id)):
+                continue
+
+            try:
+                os.remove(os.path.join(self.upload_dir, name))
+                purged += 1
+            except OSError as e:
+                logger.warning(f"Suppression de {name} impossible: {e}")
+
+        return purged
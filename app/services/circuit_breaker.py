@@ -0,0 +1,264 @@
+"""
+Service de disjoncteurs par État membre pour les indisponibilités VIES
+État partagé entre workers dans Redis, jobs mis en attente pendant la panne
+"""
+import json
+import time
+import logging
+from typing import Dict, List
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Enregistrement atomique d'un échec
+# KEYS[1] = clé du pays, ARGV = [seuil, now]
+_RECORD_FAILURE_SCRIPT = """
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+local failures = redis.call('HINCRBY', KEYS[1], 'failures', 1)
+
+if state == 'half_open' or failures >= tonumber(ARGV[1]) then
+    redis.call('HSET', KEYS[1], 'state', 'open', 'opened_at', ARGV[2])
+    return 'open'
+end
+return state
+"""
+
+# Enregistrement atomique d'un succès : renvoie l'état précédent
+# KEYS[1] = clé du pays
+_RECORD_SUCCESS_SCRIPT = """
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+redis.call('HSET', KEYS[1], 'state', 'closed', 'failures', 0)
+return state
+"""
+
+# Libération en bloc des jobs en attente
+# KEYS[1] = file d'attente du pays
+_POP_ALL_SCRIPT = """
+local items = redis.call('ZRANGE', KEYS[1], 0, -1)
+redis.call('DEL', KEYS[1])
+return items
+"""
+
+# Retrait d'un seul job en attente (requête de sonde)
+_POP_ONE_SCRIPT = """
+local items = redis.call('ZRANGE', KEYS[1], 0, 0)
+if #items > 0 then
+    redis.call('ZREM', KEYS[1], items[1])
+end
+return items
+"""
+
+
+class CountryCircuitBreaker:
+    """
+    Disjoncteur par code pays (closed -> open -> half_open -> closed)
+
+    - closed : les vérifications passent normalement
+    - open : après N échecs consécutifs, les jobs du pays sont mis en attente
+    - half_open : après le délai de refroidissement, une seule requête de sonde passe ;
+      en cas de succès le disjoncteur se referme et les jobs en attente sont libérés
+    """
+
+    STATE_CLOSED = 'closed'
+    STATE_OPEN = 'open'
+    STATE_HALF_OPEN = 'half_open'
+
+    # Décisions renvoyées par allow_request
+    ALLOW = 'allow'
+    PROBE = 'probe'
+    PARK = 'park'
+
+    def __init__(self, redis_url: str = 'redis://localhost:6379/1',
+                 failure_threshold: int = 5, cooldown_seconds: int = 60,
+                 probe_timeout: int = 120):
+        """
+        Initialise le disjoncteur
+
+        Args:
+            redis_url (str): URL de connexion Redis
+            failure_threshold (int): Échecs consécutifs avant ouverture
+            cooldown_seconds (int): Délai avant la requête de sonde
+            probe_timeout (int): Durée de validité du verrou de sonde
+        """
+        self.redis_client = redis.from_url(redis_url)
+        self.state_prefix = "vatproof:circuit:"
+        self.parked_prefix = "vatproof:circuit:parked:"
+        self.probe_prefix = "vatproof:circuit:probe:"
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.probe_timeout = probe_timeout
+
+        self._record_failure = self.redis_client.register_script(_RECORD_FAILURE_SCRIPT)
+        self._record_success = self.redis_client.register_script(_RECORD_SUCCESS_SCRIPT)
+        self._pop_all = self.redis_client.register_script(_POP_ALL_SCRIPT)
+        self._pop_one = self.redis_client.register_script(_POP_ONE_SCRIPT)
+
+    def get_state(self, country_code: str) -> Dict:
+        """
+        Récupère l'état du disjoncteur d'un pays
+
+        Args:
+            country_code (str): Code pays
+
+        Returns:
+            Dict: {state, failures, opened_at, parked}
+        """
+        data = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in self.redis_client.hgetall(f"{self.state_prefix}{country_code}").items()
+        }
+
+        return {
+            'state': data.get('state', self.STATE_CLOSED),
+            'failures': int(data.get('failures', 0)),
+            'opened_at': int(data['opened_at']) if data.get('opened_at') else None,
+            'parked': self.redis_client.zcard(f"{self.parked_prefix}{country_code}")
+        }
+
+    def allow_request(self, country_code: str, is_probe: bool = False) -> str:
+        """
+        Décide si une vérification peut être lancée pour un pays
+
+        Args:
+            country_code (str): Code pays
+            is_probe (bool): La tâche a été désignée comme sonde
+
+        Returns:
+            str: 'allow', 'probe' ou 'park'
+        """
+        try:
+            state = self.get_state(country_code)
+        except redis.RedisError as e:
+            # Sans état partagé, on laisse passer plutôt que de bloquer tout le pays
+            logger.warning(f"Disjoncteur: Redis indisponible ({e}), requête autorisée")
+            return self.ALLOW
+
+        if state['state'] == self.STATE_CLOSED:
+            return self.ALLOW
+
+        if state['state'] == self.STATE_OPEN:
+            elapsed = time.time() - (state['opened_at'] or 0)
+            if elapsed < self.cooldown_seconds:
+                return self.PARK
+
+        # Refroidissement écoulé : une seule sonde à la fois
+        if is_probe or self.redis_client.set(
+            f"{self.probe_prefix}{country_code}", 1, nx=True, ex=self.probe_timeout
+        ):
+            self.redis_client.hset(f"{self.state_prefix}{country_code}", 'state', self.STATE_HALF_OPEN)
+            logger.info(f"Disjoncteur {country_code}: half-open, envoi d'une sonde")
+            return self.PROBE
+
+        return self.PARK
+
+    def release_probe(self, country_code: str):
+        """
+        Libère le verrou de sonde sans changer l'état (aucun job à sonder)
+
+        Args:
+            country_code (str): Code pays
+        """
+        self.redis_client.delete(f"{self.probe_prefix}{country_code}")
+
+    def record_success(self, country_code: str) -> bool:
+        """
+        Enregistre un succès et referme le disjoncteur
+
+        Args:
+            country_code (str): Code pays
+
+        Returns:
+            bool: True si le pays vient de se rétablir (disjoncteur était ouvert)
+        """
+        try:
+            previous = self._record_success(keys=[f"{self.state_prefix}{country_code}"])
+            previous = previous.decode() if isinstance(previous, bytes) else previous
+            self.redis_client.delete(f"{self.probe_prefix}{country_code}")
+        except redis.RedisError as e:
+            logger.warning(f"Disjoncteur: Redis indisponible ({e})")
+            return False
+
+        if previous != self.STATE_CLOSED:
+            logger.info(f"Disjoncteur {country_code}: rétabli, fermeture")
+            return True
+        return False
+
+    def record_failure(self, country_code: str) -> str:
+        """
+        Enregistre un échec lié à l'indisponibilité du service national
+
+        Args:
+            country_code (str): Code pays
+
+        Returns:
+            str: Nouvel état du disjoncteur
+        """
+        try:
+            state = self._record_failure(
+                keys=[f"{self.state_prefix}{country_code}"],
+                args=[self.failure_threshold, int(time.time())]
+            )
+            state = state.decode() if isinstance(state, bytes) else state
+            if state == self.STATE_OPEN:
+                self.redis_client.delete(f"{self.probe_prefix}{country_code}")
+                logger.warning(f"Disjoncteur {country_code}: ouvert")
+            return state
+        except redis.RedisError as e:
+            logger.warning(f"Disjoncteur: Redis indisponible ({e})")
+            return self.STATE_CLOSED
+
+    def park(self, country_code: str, payload: Dict):
+        """
+        Met un job en attente jusqu'au rétablissement du pays
+
+        Args:
+            country_code (str): Code pays
+            payload (Dict): Arguments de la tâche de vérification
+        """
+        self.redis_client.zadd(
+            f"{self.parked_prefix}{country_code}",
+            {json.dumps(payload, sort_keys=True): time.time()}
+        )
+
+    def release_parked(self, country_code: str) -> List[Dict]:
+        """
+        Libère en bloc tous les jobs en attente d'un pays
+
+        Args:
+            country_code (str): Code pays
+
+        Returns:
+            List[Dict]: Arguments des tâches à relancer (ordre d'arrivée)
+        """
+        items = self._pop_all(keys=[f"{self.parked_prefix}{country_code}"])
+        return [json.loads(item) for item in items]
+
+    def pop_probe_candidate(self, country_code: str) -> List[Dict]:
+        """
+        Retire le plus ancien job en attente pour servir de sonde
+
+        Args:
+            country_code (str): Code pays
+
+        Returns:
+            List[Dict]: Zéro ou un job
+        """
+        items = self._pop_one(keys=[f"{self.parked_prefix}{country_code}"])
+        return [json.loads(item) for item in items]
+
+    def get_open_countries(self) -> List[str]:
+        """
+        Liste les pays dont le disjoncteur n'est pas fermé
+
+        Returns:
+            List[str]: Codes pays
+        """
+        countries = []
+
+        for key in self.redis_client.scan_iter(f"{self.state_prefix}??"):
+            key = key.decode() if isinstance(key, bytes) else key
+            country_code = key[len(self.state_prefix):]
+            if self.get_state(country_code)['state'] != self.STATE_CLOSED:
+                countries.append(country_code)
+
+        return countries
@@ -0,0 +1,348 @@
+"""
+Ordonnanceur équitable des vérifications entre clients
+Files virtuelles par utilisateur dans Redis, distribuées vers Celery
+au prorata du poids de l'abonnement
+"""
+import json
+import time
+import uuid
+import logging
+from typing import Dict, List, Optional
+import redis
+
+from app.services.metrics import TENANT_QUEUE_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Distribution atomique de N jobs (équité pondérée, voie interactive prioritaire à égalité)
+# Chaque client a un temps virtuel, commun à ses deux voies : servir un job l'avance de 1/poids,
+# le client au temps virtuel le plus faible est servi en premier. Multiplier les petits lots
+# ne permet donc pas de dépasser sa part.
+# Les jobs retirés restent dans la liste "en vol" (ZSET, score = heure de retrait)
+# jusqu'à leur envoi à Celery : ceux d'un distributeur arrêté sont renvoyés.
+# KEYS[1] = clients actifs voie normale (ZSET), KEYS[2] = clients actifs voie interactive (ZSET),
+# KEYS[3] = poids (HASH), KEYS[4] = horloge, KEYS[5] = en vol,
+# KEYS[6..] = files normales puis files interactives des clients lus avant l'appel
+# (toutes les clés touchées sont déclarées)
+# ARGV = [max_jobs, max_interactive, maintenant, nombre de files normales, client de KEYS[6]...]
+_DISPATCH_SCRIPT = """
+local out = {}
+local max_jobs = tonumber(ARGV[1])
+local max_interactive = tonumber(ARGV[2])
+local bulk_count = tonumber(ARGV[4])
+local bulk = {}
+local interactive = {}
+for i = 6, #KEYS do
+    if i - 6 < bulk_count then
+        bulk[ARGV[i - 1]] = KEYS[i]
+    else
+        interactive[ARGV[i - 1]] = KEYS[i]
+    end
+end
+
+-- Client au temps virtuel le plus faible parmi ceux lus avant l'appel
+-- (un client arrivé entre-temps est ignoré, servi à la distribution suivante)
+local function head(tenants, queues)
+    local rank = 0
+    while true do
+        local entry = redis.call('ZRANGE', tenants, rank, rank, 'WITHSCORES')
+        if #entry == 0 then return nil end
+        if queues[entry[1]] then return entry[1], tonumber(entry[2]) end
+        rank = rank + 1
+    end
+end
+
+-- Sert un job du client ; son temps virtuel avance dans ses deux voies
+local function serve(tenant, vtime, tenants, other, queue)
+    local item = redis.call('LPOP', queue)
+
+    if item then
+        table.insert(out, item)
+        local weight = tonumber(redis.call('HGET', KEYS[3], tenant) or '1')
+        vtime = vtime + 1 / weight
+        redis.call('SET', KEYS[4], vtime)
+        redis.call('ZADD', other, 'XX', vtime, tenant)
+    end
+
+    if redis.call('LLEN', queue) == 0 then
+        redis.call('ZREM', tenants, tenant)
+    else
+        redis.call('ZADD', tenants, vtime, tenant)
+    end
+
+    return item
+end
+
+-- Client le plus en retard sur sa part, toutes voies confondues (la voie interactive
+-- l'emporte à égalité), dans la limite de max_interactive jobs interactifs
+local served_interactive = 0
+while #out < max_jobs do
+    local bulk_tenant, bulk_vtime = head(KEYS[1], bulk)
+    local tenant, vtime
+    if served_interactive < max_interactive then
+        tenant, vtime = head(KEYS[2], interactive)
+    end
+
+    if tenant and (not bulk_tenant or vtime <= bulk_vtime) then
+        if serve(tenant, vtime, KEYS[2], KEYS[1], interactive[tenant]) then
+            served_interactive = served_interactive + 1
+        end
+    elseif bulk_tenant then
+        serve(bulk_tenant, bulk_vtime, KEYS[1], KEYS[2], bulk[bulk_tenant])
+    else
+        break
+    end
+end
+
+-- Places restantes : la voie interactive reprend la main
+while #out < max_jobs do
+    local tenant, vtime = head(KEYS[2], interactive)
+    if not tenant then break end
+    serve(tenant, vtime, KEYS[2], KEYS[1], interactive[tenant])
+end
+
+for _, item in ipairs(out) do
+    redis.call('ZADD', KEYS[5], ARGV[3], item)
+end
+
+return out
+"""
+
+# Libération du verrou de distribution par son seul détenteur (lecture et suppression atomiques)
+# KEYS[1] = verrou, ARGV[1] = jeton du détenteur
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class FairShareScheduler:
+    """
+    Files de vérification par client avec distribution pondérée
+
+    Les lots de moins de `interactive_threshold` numéros passent par la
+    file interactive du client, servie en priorité à temps virtuel égal,
+    dans la limite de `interactive_share` des places de chaque distribution
+    tant que d'autres clients attendent. Les deux voies d'un client
+    partagent son temps virtuel : la priorité interactive ne profite
+    qu'aux clients qui n'ont pas déjà consommé leur part.
+    """
+
+    LANE_INTERACTIVE = 'interactive'
+    LANE_BULK = 'bulk'
+
+    def __init__(self, redis_url: str = 'redis://localhost:6379/1', weights: Dict[str, float] = None,
+                 interactive_threshold: int = 50, interactive_share: float = 0.5):
+        """
+        Initialise l'ordonnanceur
+
+        Args:
+            redis_url (str): URL de connexion Redis
+            weights (Dict[str, float]): Poids par type d'abonnement
+            interactive_threshold (int): Taille maximale d'un lot interactif
+            interactive_share (float): Part maximale des places pour la file interactive
+        """
+        self.redis_client = redis.from_url(redis_url)
+        self.weights = weights or {'free': 1}
+        self.interactive_threshold = interactive_threshold
+        self.interactive_share = interactive_share
+
+        self.prefix = 'vatproof:fair:'
+        self.queue_prefix = f'{self.prefix}queue:'
+        self.tenants_key = f'{self.prefix}tenants'
+        self.interactive_prefix = f'{self.prefix}interactive:'
+        self.interactive_tenants_key = f'{self.prefix}interactive_tenants'
+        self.weights_key = f'{self.prefix}weights'
+        self.clock_key = f'{self.prefix}clock'
+        self.inflight_key = f'{self.prefix}inflight'
+        self.lock_key = f'{self.prefix}dispatch_lock'
+
+        self._dispatch = self.redis_client.register_script(_DISPATCH_SCRIPT)
+        self._release_lock = self.redis_client.register_script(_RELEASE_LOCK_SCRIPT)
+
+    def enqueue(self, user_id: str, subscription_type: str, payloads: List[Dict]) -> Dict:
+        """
+        Met en file les vérifications d'un lot
+
+        Args:
+            user_id (str): ID du client
+            subscription_type (str): Abonnement (détermine le poids)
+            payloads (List[Dict]): Arguments de verify_single_vat, un par job
+
+        Returns:
+            Dict: Voie choisie et ID de tâche Celery pré-attribué par job
+        """
+        lane = self.LANE_INTERACTIVE if len(payloads) <= self.interactive_threshold else self.LANE_BULK
+        now = time.time()
+        task_ids = []
+        items = []
+
+        for kwargs in payloads:
+            task_id = str(uuid.uuid4())
+            task_ids.append(task_id)
+            items.append(json.dumps({
+                'task_id': task_id,
+                'user_id': user_id,
+                'plan': subscription_type,
+                'lane': lane,
+                'enqueued_at': now,
+                'kwargs': kwargs
+            }))
+
+        if not items:
+            return {'lane': lane, 'task_ids': []}
+
+        if lane == self.LANE_INTERACTIVE:
+            queue_key, tenants_key, other_key = (f'{self.interactive_prefix}{user_id}',
+                                                 self.interactive_tenants_key, self.tenants_key)
+        else:
+            queue_key, tenants_key, other_key = (f'{self.queue_prefix}{user_id}',
+                                                 self.tenants_key, self.interactive_tenants_key)
+
+        # Un client qui (re)devient actif reprend le temps virtuel de son autre voie,
+        # sinon part de l'horloge courante, sans crédit accumulé
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.get(self.clock_key)
+        pipe.zscore(other_key, user_id)
+        clock, vtime = pipe.execute()
+        if vtime is None:
+            vtime = float(clock or 0)
+
+        pipe = self.redis_client.pipeline()
+        pipe.rpush(queue_key, *items)
+        pipe.hset(self.weights_key, user_id, self.weights.get(subscription_type, 1))
+        pipe.zadd(tenants_key, {user_id: vtime}, nx=True)
+        pipe.execute()
+
+        return {'lane': lane, 'task_ids': task_ids}
+
+    def dispatch(self, max_jobs: int) -> List[Dict]:
+        """
+        Retire jusqu'à `max_jobs` jobs dans l'ordre équitable
+
+        Args:
+            max_jobs (int): Places disponibles dans la file Celery
+
+        Returns:
+            List[Dict]: Jobs à soumettre (task_id, kwargs..., raw pour ack)
+        """
+        if max_jobs <= 0:
+            return []
+
+        max_interactive = max(1, int(max_jobs * self.interactive_share))
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.zrange(self.tenants_key, 0, -1)
+        pipe.zrange(self.interactive_tenants_key, 0, -1)
+        bulk, interactive = ([tenant.decode() for tenant in tenants] for tenants in pipe.execute())
+
+        raw_items = self._dispatch(
+            keys=[self.tenants_key, self.interactive_tenants_key, self.weights_key, self.clock_key, self.inflight_key]
+                 + [f'{self.queue_prefix}{tenant}' for tenant in bulk]
+                 + [f'{self.interactive_prefix}{tenant}' for tenant in interactive],
+            args=[max_jobs, max_interactive, time.time(), len(bulk)] + bulk + interactive
+        )
+
+        items = [dict(json.loads(raw), raw=raw) for raw in raw_items]
+        self._record_waits(items)
+        return items
+
+    def ack(self, items: List[Dict]):
+        """Retire de la liste en vol des jobs envoyés à Celery"""
+        if items:
+            self.redis_client.zrem(self.inflight_key, *[item['raw'] for item in items])
+
+    def recover_inflight(self, older_than: float = 60) -> List[Dict]:
+        """
+        Jobs retirés depuis plus de `older_than` secondes et jamais acquittés
+        (distributeur arrêté avant l'envoi) ; leur délai repart de zéro
+
+        Returns:
+            List[Dict]: Jobs à renvoyer
+        """
+        now = time.time()
+        raw_items = self.redis_client.zrangebyscore(self.inflight_key, '-inf', now - older_than)
+        if not raw_items:
+            return []
+
+        self.redis_client.zadd(self.inflight_key, {raw: now for raw in raw_items}, xx=True)
+        return [dict(json.loads(raw), raw=raw) for raw in raw_items]
+
+    def _record_waits(self, items: List[Dict]):
+        """Publie le temps d'attente en file de chaque job distribué"""
+        if not items:
+            return
+
+        now = time.time()
+        pipe = self.redis_client.pipeline(transaction=False)
+
+        for item in items:
+            wait = max(0.0, now - item['enqueued_at'])
+            TENANT_QUEUE_WAIT_SECONDS.labels(item['lane'], item['plan']).observe(wait)
+
+            stats_key = f"{self.prefix}wait:{item['user_id']}"
+            pipe.hincrby(stats_key, 'count', 1)
+            pipe.hincrbyfloat(stats_key, 'total_seconds', wait)
+            pipe.hset(stats_key, 'last_seconds', round(wait, 3))
+            pipe.expire(stats_key, 7 * 86400)
+
+        pipe.execute()
+
+    def get_tenant_stats(self, user_id: str) -> Dict:
+        """
+        Statistiques d'attente d'un client
+
+        Args:
+            user_id (str): ID du client
+
+        Returns:
+            Dict: Jobs en attente, âge du plus ancien et attentes observées
+        """
+        pipe = self.redis_client.pipeline(transaction=False)
+        for queue_key in (f'{self.queue_prefix}{user_id}', f'{self.interactive_prefix}{user_id}'):
+            pipe.llen(queue_key)
+            pipe.lindex(queue_key, 0)
+        pipe.hgetall(f'{self.prefix}wait:{user_id}')
+        bulk_pending, bulk_oldest, interactive_pending, interactive_oldest, stats = pipe.execute()
+
+        stats = {k.decode(): float(v) for k, v in stats.items()}
+        count = stats.get('count', 0)
+        enqueued = [json.loads(oldest)['enqueued_at'] for oldest in (bulk_oldest, interactive_oldest) if oldest]
+
+        return {
+            'pending': bulk_pending + interactive_pending,
+            'oldest_wait_seconds': round(time.time() - min(enqueued), 1) if enqueued else 0,
+            'dispatched': int(count),
+            'avg_wait_seconds': round(stats.get('total_seconds', 0) / count, 1) if count else None,
+            'last_wait_seconds': stats.get('last_seconds')
+        }
+
+    def pending_counts(self) -> Dict[str, int]:
+        """Jobs en attente par voie"""
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.zrange(self.tenants_key, 0, -1)
+        pipe.zrange(self.interactive_tenants_key, 0, -1)
+        bulk, interactive = ([t.decode() for t in tenants] for tenants in pipe.execute())
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for tenant in bulk:
+            pipe.llen(f'{self.queue_prefix}{tenant}')
+        for tenant in interactive:
+            pipe.llen(f'{self.interactive_prefix}{tenant}')
+        lengths = pipe.execute()
+
+        return {
+            self.LANE_INTERACTIVE: sum(lengths[len(bulk):]),
+            self.LANE_BULK: sum(lengths[:len(bulk)]),
+            'tenants': len(set(bulk) | set(interactive))
+        }
+
+    def acquire_dispatch_lock(self, ttl: int = 30) -> Optional[str]:
+        """Un seul distributeur actif à la fois"""
+        token = str(uuid.uuid4())
+        return token if self.redis_client.set(self.lock_key, token, nx=True, ex=ttl) else None
+
+    def release_dispatch_lock(self, token: str):
+        """Libère le verrou s'il nous appartient encore (un verrou expiré puis repris est conservé)"""
+        self._release_lock(keys=[self.lock_key], args=[token])
@@ -3,12 +3,23 @@ Service de traitement des fichiers CSV/Excel
 Version simplifiée pour démarrage
 """
 import re
-from typing import List
+import csv
+import json
+import logging
+from typing import Iterator, List, Optional, Tuple
 from werkzeug.datastructures import FileStorage
 
+logger = logging.getLogger(__name__)
+
 class FileService:
     """Service pour le traitement des fichiers d'import"""
     
+    # Formats acceptés à l'import
+    ALLOWED_EXTENSIONS = ('csv', 'txt', 'xlsx', 'xls')
+    
+    # En-têtes reconnus comme colonne de numéros de TVA
+    VAT_HEADER_PATTERN = re.compile(r'(?<![a-z])(tva|vat|ust|iva|btw)(?![a-z])', re.IGNORECASE)
+    
     @classmethod
     def parse_file(cls, file: FileStorage) -> dict:
         """Parse un fichier (version simplifiée)"""
@@ -48,4 +59,146 @@ class FileService:
             if line:
                 vat_numbers.append(line)
         
-        return vat_numbers
\ No newline at end of file
+        return vat_numbers
+    
+    @classmethod
+    def iter_file_values(cls, path: str, extension: str) -> Iterator[Tuple[str, Optional[int]]]:
+        """
+        Lit un fichier d'import en flux, sans le charger en mémoire
+        
+        Pour les CSV, la colonne dont l'en-tête évoque la TVA est retenue
+        (à défaut la première) ; les fichiers texte donnent une valeur par ligne.
+        Pour les JSONL, chaque ligne est une chaîne ou un objet dont le champ
+        évoquant la TVA est retenu.
+        
+        Args:
+            path (str): Chemin du fichier sur disque
+            extension (str): Extension ('csv', 'txt', 'xlsx', 'xls', 'jsonl')
+            
+        Yields:
+            Tuple[str, Optional[int]]: Valeur brute et octets lus (None pour Excel)
+        """
+        extension = extension.lower().lstrip('.')
+        
+        if extension in ('xlsx', 'xls'):
+            yield from cls._iter_excel_values(path, extension)
+            return
+        
+        if extension in ('jsonl', 'ndjson'):
+            yield from cls._iter_jsonl_values(path)
+            return
+        
+        with open(path, 'rb') as f:
+            bytes_read = 0
+            delimiter = None
+            column = 0
+            
+            for raw_line in f:
+                bytes_read += len(raw_line)
+                line = raw_line.decode('utf-8', errors='replace').strip('\ufeff\r\n')
+                if not line.strip():
+                    continue
+                
+                if extension != 'csv':
+                    yield line.strip(), bytes_read
+                    continue
+                
+                if delimiter is None:
+                    # Première ligne : séparateur et éventuel en-tête
+                    delimiter = max((';', ',', '\t'), key=line.count)
+                    cells = next(csv.reader([line], delimiter=delimiter))
+                    header_column = cls._find_vat_column(cells)
+                    if header_column is not None:
+                        column = header_column
+                        continue
+                else:
+                    cells = next(csv.reader([line], delimiter=delimiter))
+                
+                if column < len(cells) and cells[column].strip():
+                    yield cells[column].strip(), bytes_read
+    
+    @classmethod
+    def _iter_excel_values(cls, path: str, extension: str) -> Iterator[Tuple[str, Optional[int]]]:
+        """Lit la première feuille d'un classeur Excel ligne par ligne"""
+        column = None
+        for row in cls._iter_excel_rows(path, extension):
+            cells = ['' if value is None else str(value) for value in row]
+            
+            if column is None:
+                header_column = cls._find_vat_column(cells)
+                column = header_column if header_column is not None else 0
+                if header_column is not None:
+                    continue
+            
+            if column < len(cells) and cells[column].strip():
+                yield cells[column].strip(), None
+    
+    @classmethod
+    def _iter_jsonl_values(cls, path: str) -> Iterator[Tuple[str, Optional[int]]]:
+        """
+        Lit un fichier JSON Lines (une chaîne ou un objet par ligne)
+        
+        Le champ du numéro de TVA est cherché dans chaque objet (les clés
+        peuvent varier d'une ligne à l'autre) ; les lignes illisibles ou sans
+        champ de TVA sont ignorées et comptées dans le journal.
+        """
+        fields = {}  # Clés d'un objet -> champ du numéro de TVA (None si aucun)
+        unreadable = []
+        
+        with open(path, 'rb') as f:
+            bytes_read = 0
+            
+            for line_number, raw_line in enumerate(f, 1):
+                bytes_read += len(raw_line)
+                if not raw_line.strip():
+                    continue
+                
+                try:
+                    record = json.loads(raw_line)
+                except ValueError:  # JSON invalide ou encodage incorrect
+                    unreadable.append(line_number)
+                    continue
+                
+                if isinstance(record, dict):
+                    keys = tuple(record)
+                    if keys not in fields:
+                        column = cls._find_vat_column(list(keys))
+                        fields[keys] = keys[column] if column is not None else None
+                    if fields[keys] is None:
+                        unreadable.append(line_number)
+                        continue
+                    record = record[fields[keys]]
+                
+                if record is not None and str(record).strip():
+                    yield str(record).strip(), bytes_read
+        
+        if unreadable:
+            logger.warning(f"{path}: {len(unreadable)} lignes JSON illisibles ou sans champ de TVA ignorées "
+                           f"(lignes {', '.join(map(str, unreadable[:10]))}{'...' if len(unreadable) > 10 else ''})")
+    
+    @classmethod
+    def _iter_excel_rows(cls, path: str, extension: str) -> Iterator[tuple]:
+        """Lignes brutes de la première feuille (openpyxl en lecture seule pour xlsx)"""
+        if extension == 'xls':
+            # Ancien format : pas de lecture en flux possible
+            import pandas as pd
+            frame = pd.read_excel(path, header=None, dtype=str)
+            for row in frame.itertuples(index=False):
+                yield tuple(None if pd.isna(value) else value for value in row)
+            return
+        
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    
+    @classmethod
+    def _find_vat_column(cls, cells: List[str]) -> Optional[int]:
+        """Index de la colonne dont l'en-tête évoque un numéro de TVA"""
+        for index, cell in enumerate(cells):
+            if cls.VAT_HEADER_PATTERN.search(cell or ''):
+                return index
+        return None
@@ -0,0 +1,187 @@
+"""
+Service de supervision de l'état des composants
+Sondes exécutées en arrière-plan, instantané partagé dans Redis
+"""
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Une sonde retourne (statut, détail) ; toute exception vaut statut 'error'
+Probe = Callable[[], Tuple[str, Optional[str]]]
+
+
+class HealthMonitor:
+    """
+    Rafraîchit périodiquement l'état des composants (base, Redis, Celery)
+
+    Un seul processus sonde à chaque cycle (verrou Redis) ; /api/status ne fait
+    que relire l'instantané, avec l'âge de chaque mesure.
+    """
+
+    SNAPSHOT_KEY = 'vatproof:health:snapshot'
+    REFRESH_LOCK_KEY = 'vatproof:health:refresh_lock'
+
+    STATUS_OK = 'ok'
+    STATUS_ERROR = 'error'
+    STATUS_STALE = 'stale'
+    STATUS_UNKNOWN = 'unknown'
+
+    def __init__(self, redis_url: str = 'redis://localhost:6379/1', interval: int = 15,
+                 probes: Dict[str, Probe] = None, local_cache_seconds: float = 1.0):
+        """
+        Initialise le superviseur
+
+        Args:
+            redis_url (str): URL de connexion Redis
+            interval (int): Cadence des sondes en secondes
+            probes (Dict[str, Probe]): Sondes additionnelles par composant
+            local_cache_seconds (float): Durée de réutilisation locale de l'instantané
+        """
+        self.redis_client = redis.from_url(redis_url, socket_timeout=1, socket_connect_timeout=1)
+        self.interval = interval
+        self.stale_after = interval * 3
+        self.local_cache_seconds = local_cache_seconds
+
+        self.probes = {'redis': self._probe_redis}
+        self.probes.update(probes or {})
+
+        self._last_probe: Dict[str, Dict] = {}
+        self._cached_snapshot: Optional[Dict[str, Dict]] = None
+        self._cached_at = 0.0
+        self._thread = None
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Démarre le rafraîchissement en arrière-plan (une fois par processus)"""
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='health-refresher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Arrête le rafraîchissement"""
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self._acquire_refresh_slot():
+                    self.refresh()
+            except Exception as e:
+                logger.warning(f"Rafraîchissement de l'état des services impossible: {e}")
+            self._stop.wait(self.interval)
+
+    def _acquire_refresh_slot(self) -> bool:
+        """Un seul processus sonde par cycle ; sans Redis, chaque processus sonde pour lui-même"""
+        try:
+            return bool(self.redis_client.set(
+                self.REFRESH_LOCK_KEY, os.getpid(), nx=True, ex=max(1, self.interval - 1)
+            ))
+        except redis.RedisError:
+            return True
+
+    def refresh(self) -> Dict[str, Dict]:
+        """
+        Exécute toutes les sondes et publie l'instantané
+
+        Returns:
+            Dict[str, Dict]: Résultat par composant
+        """
+        results = {}
+
+        for component, probe in self.probes.items():
+            start = time.monotonic()
+            try:
+                status, detail = probe()
+            except Exception as e:
+                status, detail = self.STATUS_ERROR, str(e)
+
+            results[component] = {
+                'status': status,
+                'detail': detail,
+                'checked_at': time.time(),
+                'latency_ms': int((time.monotonic() - start) * 1000)
+            }
+
+        self._last_probe = results
+
+        try:
+            self.redis_client.hset(self.SNAPSHOT_KEY, mapping={
+                component: json.dumps(result) for component, result in results.items()
+            })
+        except redis.RedisError as e:
+            logger.warning(f"Publication de l'état des services impossible: {e}")
+
+        return results
+
+    def get_snapshot(self) -> Dict:
+        """
+        Retourne le dernier instantané sans lancer de sonde
+
+        Returns:
+            Dict: Statut global et détail par composant (avec âge de la mesure)
+        """
+        now = time.monotonic()
+        if self._cached_snapshot is None or now - self._cached_at > self.local_cache_seconds:
+            self._cached_snapshot = self._read_snapshot()
+            self._cached_at = now
+
+        wall_now = time.time()
+        components = {}
+
+        for component in self.probes:
+            result = self._cached_snapshot.get(component)
+            if not result:
+                components[component] = {'status': self.STATUS_UNKNOWN, 'checked_at': None, 'age_seconds': None}
+                continue
+
+            age = max(0.0, wall_now - result['checked_at'])
+            status = result['status']
+            if age > self.stale_after:
+                status = self.STATUS_STALE
+
+            components[component] = {
+                'status': status,
+                'detail': result.get('detail'),
+                'checked_at': datetime.utcfromtimestamp(result['checked_at']).isoformat(),
+                'age_seconds': round(age, 1),
+                'latency_ms': result.get('latency_ms')
+            }
+
+        # Un composant pas encore sondé (démarrage) ne dégrade pas le statut global
+        degraded = any(c['status'] in (self.STATUS_ERROR, self.STATUS_STALE) for c in components.values())
+        overall = 'degraded' if degraded else 'ok'
+
+        return {'status': overall, 'components': components}
+
+    def _read_snapshot(self) -> Dict[str, Dict]:
+        """Lit l'instantané partagé (repli sur les dernières sondes locales)"""
+        try:
+            raw = self.redis_client.hgetall(self.SNAPSHOT_KEY)
+        except redis.RedisError:
+            snapshot = dict(self._last_probe)
+            snapshot['redis'] = {
+                'status': self.STATUS_ERROR,
+                'detail': 'Redis injoignable',
+                'checked_at': time.time(),
+                'latency_ms': None
+            }
+            return snapshot
+
+        return {
+            (key.decode() if isinstance(key, bytes) else key): json.loads(value)
+            for key, value in raw.items()
+        }
+
+    def _probe_redis(self) -> Tuple[str, Optional[str]]:
+        self.redis_client.ping()
+        return self.STATUS_OK, None
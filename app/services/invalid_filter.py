@@ -0,0 +1,341 @@
+"""
+Cache négatif des numéros de TVA confirmés invalides par VIES
+Filtre de Bloom extensible (tranches successives de plus en plus grandes et
+de plus en plus strictes) stocké dans Redis : quelques octets par numéro,
+taux de faux positifs borné, reconstruit périodiquement depuis l'historique
+des VerificationJob pour n'y garder que les verdicts récents
+"""
+import uuid
+import hashlib
+import logging
+from itertools import islice
+from typing import Dict, Iterable, List
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Numéros par appel de script (durée de blocage de Redis bornée)
+_SCRIPT_BATCH = 1000
+
+# Nouvelles tentatives quand le filtre est reconstruit pendant un appel
+_STALE_RETRIES = 5
+
+# Toutes les clés d'un filtre partagent l'étiquette {invalid_filter} (même slot
+# Redis Cluster) et chaque script reçoit dans KEYS toutes les clés qu'il touche :
+# le client lit la génération et le nombre de tranches, le script vérifie
+# qu'ils n'ont pas changé (sinon -1, le client relit et recommence).
+#
+# KEYS[1] = métadonnées, KEYS[2..] = tranches <préfixe><génération>:<n> ;
+# tailles des tranches dans le hash de métadonnées. Positions des bits par
+# double hachage : (h1 + j * h2) % m, j < k (h1, h2 < 2^32 : calcul exact en Lua)
+_SLICES_LUA = """
+local meta = KEYS[1]
+
+local function load(gen)
+    local p = redis.call('HMGET', meta, 'gen', 'slices')
+    if not p[1] then
+        return {}
+    end
+    local count = tonumber(p[2])
+    if p[1] ~= gen or count > #KEYS - 1 then
+        return nil
+    end
+    local slices = {}
+    for i = 0, count - 1 do
+        local s = redis.call('HMGET', meta, 'm' .. i, 'k' .. i)
+        slices[#slices + 1] = {KEYS[i + 2], tonumber(s[1]), tonumber(s[2])}
+    end
+    return slices
+end
+
+local function present(slice, h1, h2)
+    for j = 0, slice[3] - 1 do
+        if redis.call('GETBIT', slice[1], (h1 + j * h2) % slice[2]) == 0 then
+            return false
+        end
+    end
+    return true
+end
+
+local function contains(slices, h1, h2)
+    for i = #slices, 1, -1 do
+        if present(slices[i], h1, h2) then
+            return true
+        end
+    end
+    return false
+end
+"""
+
+# Recherche : KEYS = [métadonnées, tranches...], ARGV = [génération, h1, h2, h1, h2...]
+_CONTAINS_SCRIPT = _SLICES_LUA + """
+local slices = load(ARGV[1])
+if not slices then
+    return -1
+end
+local found = {}
+for a = 2, #ARGV, 2 do
+    found[#found + 1] = contains(slices, tonumber(ARGV[a]), tonumber(ARGV[a + 1])) and 1 or 0
+end
+return found
+"""
+
+# Ajout (nouvelle tranche quand la dernière est pleine) : KEYS = [métadonnées,
+# tranches..., tranche suivante], ARGV = [génération, capacité, taux d'erreur,
+# croissance, resserrement, h1, h2...]. Retourne {ajoutés, traités} : une
+# seule tranche peut être créée par appel, le client renvoie le reste
+_ADD_SCRIPT = _SLICES_LUA + """
+if redis.call('EXISTS', meta) == 0 then
+    redis.call('HSET', meta, 'gen', ARGV[1], 'capacity', ARGV[2], 'error_rate', ARGV[3],
+               'growth', ARGV[4], 'tightening', ARGV[5], 'slices', 0, 'count', 0, 'total', 0)
+end
+
+local slices = load(ARGV[1])
+if not slices then
+    return {-1, 0}
+end
+
+local p = redis.call('HMGET', meta, 'capacity', 'error_rate', 'growth', 'tightening', 'count', 'total')
+local capacity, rate, growth, tightening = tonumber(p[1]), tonumber(p[2]), tonumber(p[3]), tonumber(p[4])
+local count, total = tonumber(p[5]), tonumber(p[6])
+local added, processed = 0, 0
+
+for a = 6, #ARGV, 2 do
+    local h1, h2 = tonumber(ARGV[a]), tonumber(ARGV[a + 1])
+    if not contains(slices, h1, h2) then
+        local n = #slices
+        if n == 0 or count >= capacity * growth ^ (n - 1) then
+            if n + 2 > #KEYS then
+                break
+            end
+            -- Tranche suivante : capacité multipliée, taux d'erreur resserré
+            local slice_rate = rate * tightening ^ n
+            local m = math.ceil(capacity * growth ^ n * -math.log(slice_rate) / math.log(2) ^ 2)
+            local k = math.ceil(-math.log(slice_rate) / math.log(2))
+            redis.call('HSET', meta, 'm' .. n, m, 'k' .. n, k)
+            slices[n + 1] = {KEYS[n + 2], m, k}
+            count = 0
+        end
+
+        local slice = slices[#slices]
+        for j = 0, slice[3] - 1 do
+            redis.call('SETBIT', slice[1], (h1 + j * h2) % slice[2], 1)
+        end
+        count = count + 1
+        total = total + 1
+        added = added + 1
+    end
+    processed = processed + 1
+end
+
+redis.call('HSET', meta, 'slices', #slices, 'count', count, 'total', total)
+return {added, processed}
+"""
+
+# Substitution d'une génération reconstruite : KEYS = [métadonnées, métadonnées
+# reconstruites, tranches de l'ancienne génération], ARGV = [ancienne génération
+# ('' si aucune), délai de grâce]. Retourne 0 si l'ancienne génération a changé
+_SWAP_SCRIPT = """
+local p = redis.call('HMGET', KEYS[1], 'gen', 'slices')
+if (p[1] or '') ~= ARGV[1] or tonumber(p[2] or 0) ~= #KEYS - 2 then
+    return 0
+end
+
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('RENAME', KEYS[2], KEYS[1])
+else
+    redis.call('DEL', KEYS[1])
+end
+
+-- Ancienne génération conservée le temps des recherches en cours
+for i = 3, #KEYS do
+    redis.call('EXPIRE', KEYS[i], ARGV[2])
+end
+return 1
+"""
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _batches(items: Iterable, size: int) -> Iterable[list]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class InvalidVATFilter:
+    """
+    Filtre de Bloom extensible des numéros confirmés invalides
+
+    Un numéro absent n'y est jamais signalé ; un numéro signalé a été confirmé
+    invalide, sauf faux positif (probabilité inférieure à error_rate). Un
+    filtre de Bloom ne permet pas de retirer un numéro : un verdict redevenu
+    valide disparaît à la reconstruction suivante.
+    """
+
+    def __init__(self, redis_url: str = 'redis://localhost:6379/1', error_rate: float = 0.001,
+                 capacity: int = 100000, growth: int = 2, tightening: float = 0.5):
+        """
+        Initialise le filtre
+
+        Args:
+            redis_url (str): URL de connexion Redis
+            error_rate (float): Taux de faux positifs visé (toutes tranches confondues)
+            capacity (int): Numéros de la première tranche
+            growth (int): Facteur de capacité entre deux tranches
+            tightening (float): Facteur du taux d'erreur entre deux tranches
+        """
+        if not 0 < error_rate < 1 or not 0 < tightening < 1:
+            raise ValueError("error_rate et tightening doivent être compris entre 0 et 1")
+
+        self.redis_client = redis.from_url(redis_url)
+        self.key_prefix = "vatproof:{invalid_filter}:"
+        self.meta_key = f"{self.key_prefix}meta"
+        self.capacity = capacity
+        self.growth = growth
+        self.tightening = tightening
+        # Somme des taux des tranches (série géométrique) <= error_rate
+        self.first_slice_error_rate = error_rate * (1 - tightening)
+
+        self._contains = self.redis_client.register_script(_CONTAINS_SCRIPT)
+        self._add = self.redis_client.register_script(_ADD_SCRIPT)
+        self._swap = self.redis_client.register_script(_SWAP_SCRIPT)
+
+    @staticmethod
+    def _hashes(vat: str) -> tuple:
+        """Deux empreintes 32 bits du numéro complet (h2 impaire : positions distinctes)"""
+        digest = int.from_bytes(hashlib.blake2b(vat.encode(), digest_size=8).digest(), 'big')
+        return digest >> 32, (digest & 0xFFFFFFFF) | 1
+
+    def _layout(self, meta_key: str) -> tuple:
+        """Génération courante (None si le filtre n'existe pas) et nombre de tranches"""
+        generation, slices = self.redis_client.hmget(meta_key, 'gen', 'slices')
+        return _text(generation), int(slices or 0)
+
+    def _slice_keys(self, generation: str, count: int) -> List[str]:
+        return [f"{self.key_prefix}{generation}:{i}" for i in range(count)]
+
+    def _add_batch(self, meta_key: str, vats: List[str], capacity: int, generation: str = None) -> int:
+        hashes = [h for vat in vats for h in self._hashes(vat)]
+        added = stale = 0
+
+        while hashes:
+            current, count = self._layout(meta_key)
+            # Génération imposée (reconstruction) ou nouvelle si le filtre n'existe pas encore
+            current = current or generation or uuid.uuid4().hex[:12]
+            keys = [meta_key] + self._slice_keys(current, count + 1)
+            args = [current, capacity, self.first_slice_error_rate, self.growth, self.tightening]
+
+            batch_added, processed = self._add(keys=keys, args=args + hashes)
+            if batch_added < 0:
+                stale += 1
+                if stale >= _STALE_RETRIES:
+                    raise RuntimeError("Cache négatif reconstruit en continu, ajout abandonné")
+                continue
+
+            added += batch_added
+            hashes = hashes[2 * processed:]
+
+        return added
+
+    def _contains_batch(self, vats: List[str]) -> List[bool]:
+        hashes = [h for vat in vats for h in self._hashes(vat)]
+
+        for _ in range(_STALE_RETRIES):
+            generation, count = self._layout(self.meta_key)
+            keys = [self.meta_key] + self._slice_keys(generation, count)
+            flags = self._contains(keys=keys, args=[generation or ''] + hashes)
+            if flags != -1:
+                return [bool(flag) for flag in flags]
+
+        raise RuntimeError("Cache négatif reconstruit en continu, recherche abandonnée")
+
+    def add(self, country_code: str, vat_number: str) -> bool:
+        """
+        Enregistre un numéro confirmé invalide
+
+        Returns:
+            bool: False si le numéro était déjà signalé
+        """
+        return self.add_many([f'{country_code}{vat_number}']) == 1
+
+    def add_many(self, vats: Iterable[str]) -> int:
+        """
+        Enregistre des numéros complets (pays + numéro) confirmés invalides
+
+        Returns:
+            int: Numéros ajoutés (déjà signalés exclus)
+        """
+        return sum(self._add_batch(self.meta_key, batch, self.capacity)
+                   for batch in _batches(vats, _SCRIPT_BATCH))
+
+    def contains(self, country_code: str, vat_number: str) -> bool:
+        """Le numéro a-t-il été récemment confirmé invalide"""
+        return self.contains_many([f'{country_code}{vat_number}'])[0]
+
+    def contains_many(self, vats: Iterable[str]) -> List[bool]:
+        """
+        Recherche de numéros complets (pays + numéro)
+
+        Returns:
+            List[bool]: Numéros signalés, dans l'ordre
+        """
+        found = []
+        for batch in _batches(vats, _SCRIPT_BATCH):
+            found.extend(self._contains_batch(batch))
+
+        return found
+
+    def rebuild(self, vats: Iterable[str], expected: int = 0) -> int:
+        """
+        Reconstruit le filtre (nouvelle génération) puis le substitue d'un bloc
+
+        Les ajouts faits pendant la reconstruction sont perdus jusqu'à la
+        suivante : les verdicts sont de toute façon relus en base.
+
+        Args:
+            vats (Iterable[str]): Numéros complets confirmés invalides
+            expected (int): Nombre attendu (dimensionne la première tranche)
+
+        Returns:
+            int: Numéros distincts dans le nouveau filtre
+        """
+        generation = uuid.uuid4().hex[:12]
+        staging_key = f"{self.meta_key}:{generation}"
+        capacity = max(self.capacity, int(expected * 1.25))
+
+        total = sum(self._add_batch(staging_key, batch, capacity, generation)
+                    for batch in _batches(vats, _SCRIPT_BATCH))
+
+        # Substitution et expiration de l'ancienne génération dans un seul script :
+        # une génération créée entre-temps (ajout sur filtre vide) n'est pas orpheline
+        for _ in range(_STALE_RETRIES):
+            previous, count = self._layout(self.meta_key)
+            keys = [self.meta_key, staging_key] + (self._slice_keys(previous, count) if previous else [])
+            if self._swap(keys=keys, args=[previous or '', 60]):
+                return total
+
+        self.redis_client.delete(staging_key, *self._slice_keys(generation, self._layout(staging_key)[1]))
+        raise RuntimeError("Cache négatif modifié en continu, reconstruction abandonnée")
+
+    def get_stats(self) -> Dict:
+        """
+        Taille et remplissage du filtre
+
+        Returns:
+            Dict: {numbers, slices, memory_bytes, error_rate}
+        """
+        data = {_text(k): _text(v) for k, v in self.redis_client.hgetall(self.meta_key).items()}
+        slices = int(data.get('slices', 0))
+
+        return {
+            'numbers': int(data.get('total', 0)),
+            'slices': slices,
+            'memory_bytes': sum(int(data[f'm{i}']) // 8 for i in range(slices)),
+            'error_rate': self.first_slice_error_rate / (1 - self.tightening)
+        }
@@ -0,0 +1,55 @@
+"""
+Heartbeat des baux de jobs de vérification
+Renouvelle le bail d'un job tant que le worker le traite
+"""
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseHeartbeat:
+    """
+    Renouvelle périodiquement un bail sur une connexion dédiée
+
+    Usage:
+        with LeaseHeartbeat(engine, lambda: VerificationJob.renew_lease_statement(...), 10):
+            ...  # vérification VIES
+    """
+
+    def __init__(self, engine, statement_factory, interval: float):
+        """
+        Initialise le heartbeat
+
+        Args:
+            engine: Moteur SQLAlchemy (le thread n'utilise pas la session de la tâche)
+            statement_factory (callable): Construit l'UPDATE de renouvellement
+            interval (float): Secondes entre deux renouvellements
+        """
+        self.engine = engine
+        self.statement_factory = statement_factory
+        self.interval = interval
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='lease-heartbeat', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                with self.engine.begin() as connection:
+                    if connection.execute(self.statement_factory()).rowcount == 0:
+                        # Bail repris (expiré puis réattribué) : inutile de continuer
+                        self.lost = True
+                        logger.warning("Bail du job perdu, heartbeat arrêté")
+                        return
+            except Exception as e:
+                logger.warning(f"Renouvellement du bail impossible: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join(self.interval)
+        return False
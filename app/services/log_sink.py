@@ -0,0 +1,139 @@
+"""
+Écriture tamponnée des logs système
+File bornée en mémoire, vidée par un thread qui insère les lignes par lots
+"""
+import os
+import queue
+import atexit
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from app.services.metrics import SYSTEM_LOG_DROPPED
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedLogSink:
+    """
+    Puits asynchrone pour SystemLog
+
+    Les lignes sont insérées sur une connexion dédiée du moteur : un échec
+    d'écriture ne touche jamais la session (et le travail en cours) de l'appelant.
+    En surcharge, les nouvelles lignes sont abandonnées et comptées.
+    """
+
+    def __init__(self, engine, table, max_queue_size: int = 10000,
+                 batch_size: int = 200, flush_interval: float = 1.0):
+        """
+        Initialise le puits
+
+        Args:
+            engine: Moteur SQLAlchemy (connexion propre au thread d'écriture)
+            table: Table des logs système
+            max_queue_size (int): Nombre maximum de lignes en attente
+            batch_size (int): Lignes par insertion
+            flush_interval (float): Attente maximale avant écriture d'un lot partiel
+        """
+        self.engine = engine
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self.pid = os.getpid()
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='system-log-sink', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def emit(self, row: Dict) -> bool:
+        """
+        Met une ligne en file sans bloquer
+
+        Args:
+            row (Dict): Colonnes de la ligne de log
+
+        Returns:
+            bool: False si la ligne a été abandonnée (file pleine)
+        """
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            SYSTEM_LOG_DROPPED.inc()
+            return False
+
+    def _run(self):
+        while not self._stop.is_set() or not self._queue.empty():
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+
+    def _next_batch(self) -> List[Dict]:
+        """Attend une première ligne puis complète le lot sans attendre"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _write(self, batch: List[Dict]):
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(self.table.insert(), batch)
+            self.written += len(batch)
+        except Exception as e:
+            self.dropped += len(batch)
+            SYSTEM_LOG_DROPPED.inc(len(batch))
+            logger.warning(f"Écriture de {len(batch)} logs système impossible: {e}")
+
+    def close(self, timeout: float = 5.0):
+        """Vide la file puis arrête le thread d'écriture"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        """Compteurs du puits"""
+        return {
+            'pending': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped
+        }
+
+
+_sink: Optional[BufferedLogSink] = None
+_sink_lock = threading.Lock()
+
+
+def get_log_sink(engine, table, **options) -> BufferedLogSink:
+    """
+    Puits du processus courant (recréé après un fork gunicorn / Celery)
+
+    Args:
+        engine: Moteur SQLAlchemy
+        table: Table des logs système
+        **options: max_queue_size, batch_size, flush_interval
+
+    Returns:
+        BufferedLogSink: Puits actif
+    """
+    global _sink
+
+    if _sink is None or _sink.pid != os.getpid():
+        with _sink_lock:
+            if _sink is None or _sink.pid != os.getpid():
+                _sink = BufferedLogSink(engine, table, **options)
+
+    return _sink
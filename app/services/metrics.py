@@ -0,0 +1,276 @@
+"""
+Registre des métriques de VATProof
+Métriques Prometheus partagées par les processus web et worker
+
+En production, PROMETHEUS_MULTIPROC_DIR doit pointer vers un dossier
+partagé (vidé au démarrage) : chaque processus gunicorn / worker Celery
+y écrit ses valeurs, agrégées à l'exposition par MultiProcessCollector.
+"""
+import os
+import time
+import logging
+from typing import Dict, List, Optional
+from prometheus_client import (
+    Histogram, Counter, CollectorRegistry, REGISTRY, generate_latest, start_http_server
+)
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily
+from celery.signals import task_prerun, task_postrun, task_retry, worker_process_shutdown
+
+logger = logging.getLogger(__name__)
+
+# Phases d'une vérification VIES : de quelques ms (parse) à ~1 min (téléchargement PDF)
+VIES_PHASE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60)
+
+VIES_PHASE_SECONDS = Histogram(
+    'vatproof_vies_phase_seconds',
+    "Durée de chaque phase d'une vérification VIES",
+    ['phase', 'country_code', 'outcome'],
+    buckets=VIES_PHASE_BUCKETS
+)
+
+VIES_LOOKUP_SECONDS = Histogram(
+    'vatproof_vies_lookup_seconds',
+    "Durée totale d'une vérification VIES",
+    ['country_code', 'outcome'],
+    buckets=VIES_PHASE_BUCKETS + (90, 120)
+)
+
+
+def observe_vies_timings(country_code: str, outcome: str, timings: Dict[str, int]):
+    """
+    Publie les durées de phase d'une vérification
+
+    Args:
+        country_code (str): Code pays
+        outcome (str): 'valid', 'invalid', 'throttle' ou 'error'
+        timings (Dict[str, int]): Durées par phase en millisecondes
+    """
+    for phase, duration_ms in timings.items():
+        if phase == 'total':
+            VIES_LOOKUP_SECONDS.labels(country_code, outcome).observe(duration_ms / 1000)
+        else:
+            VIES_PHASE_SECONDS.labels(phase, country_code, outcome).observe(duration_ms / 1000)
+
+
+# HTTP
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'vatproof_http_request_seconds',
+    'Latence des requêtes HTTP par route',
+    ['method', 'route', 'status']
+)
+
+# Uploads et ZIP
+
+UPLOAD_PARSE_SECONDS = Histogram(
+    'vatproof_upload_parse_seconds',
+    "Durée du parsing et de la validation d'un import",
+    ['source'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+)
+
+UPLOAD_ROWS = Counter(
+    'vatproof_upload_rows_total',
+    'Nombre de lignes parsées et validées',
+    ['source']
+)
+
+ZIP_BUILD_SECONDS = Histogram(
+    'vatproof_zip_build_seconds',
+    "Durée de construction d'une archive ZIP de justificatifs",
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120)
+)
+
+# Logs système
+
+SYSTEM_LOG_DROPPED = Counter(
+    'vatproof_system_log_dropped_total',
+    'Logs système abandonnés (file pleine ou échec d\'écriture)'
+)
+
+# Tâches Celery
+
+TASK_SECONDS = Histogram(
+    'vatproof_task_seconds',
+    "Durée d'exécution des tâches Celery",
+    ['task', 'country_code', 'state'],
+    buckets=VIES_PHASE_BUCKETS + (90, 120, 300)
+)
+
+TENANT_QUEUE_WAIT_SECONDS = Histogram(
+    'vatproof_tenant_queue_wait_seconds',
+    "Attente d'un job dans les files équitables avant envoi à Celery",
+    ['lane', 'plan'],
+    buckets=(0.5, 1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200)
+)
+
+TASK_RETRIES = Counter(
+    'vatproof_task_retries_total',
+    'Nombre de relances de tâches Celery',
+    ['task', 'country_code']
+)
+
+_task_starts: Dict[str, float] = {}
+
+
+def _task_country(kwargs: Optional[Dict]) -> str:
+    """Code pays d'une tâche (libellé vide si non applicable)"""
+    return (kwargs or {}).get('country_code') or ''
+
+
+@task_prerun.connect
+def _on_task_prerun(task_id=None, **kwargs):
+    _task_starts[task_id] = time.monotonic()
+
+
+@task_postrun.connect
+def _on_task_postrun(task_id=None, task=None, kwargs=None, state=None, **extra):
+    start = _task_starts.pop(task_id, None)
+    if start is not None and task is not None:
+        TASK_SECONDS.labels(task.name, _task_country(kwargs), state or 'UNKNOWN').observe(
+            time.monotonic() - start
+        )
+
+
+@task_retry.connect
+def _on_task_retry(sender=None, request=None, **kwargs):
+    if sender is not None:
+        TASK_RETRIES.labels(sender.name, _task_country(getattr(request, 'kwargs', None))).inc()
+
+
+@worker_process_shutdown.connect
+def _on_worker_process_shutdown(pid=None, **kwargs):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+# Exposition
+
+class RuntimeCollector:
+    """
+    Métriques calculées à l'exposition : profondeur des files Celery,
+    utilisation du pool de connexions base de données et de Redis,
+    cadencement VIES par pays (état partagé par les workers dans Redis)
+    """
+
+    def __init__(self, redis_url: str = None, queues: List[str] = None, engine=None, pacer=None):
+        self.redis_url = redis_url
+        self.queues = queues or []
+        self.engine = engine
+        self.pacer = pacer
+
+    def collect(self):
+        if self.redis_url:
+            yield from self._collect_redis()
+        if self.engine is not None:
+            yield from self._collect_db_pool()
+        if self.pacer is not None:
+            yield from self._collect_pacing()
+
+    def _collect_redis(self):
+        import redis
+
+        depth = GaugeMetricFamily('vatproof_celery_queue_depth', 'Messages en attente par file Celery',
+                                  labels=['queue'])
+        clients = GaugeMetricFamily('vatproof_redis_connected_clients', 'Connexions clientes Redis')
+        memory = GaugeMetricFamily('vatproof_redis_used_memory_bytes', 'Mémoire utilisée par Redis')
+
+        try:
+            client = redis.from_url(self.redis_url, socket_timeout=1)
+            pipe = client.pipeline(transaction=False)
+            for queue in self.queues:
+                pipe.llen(queue)
+            lengths = pipe.execute()
+            for queue, length in zip(self.queues, lengths):
+                depth.add_metric([queue], length)
+
+            info = client.info()
+            clients.add_metric([], info.get('connected_clients', 0))
+            memory.add_metric([], info.get('used_memory', 0))
+        except Exception as e:
+            logger.warning(f"Métriques Redis indisponibles: {e}")
+            return
+
+        yield depth
+        yield clients
+        yield memory
+
+    def _collect_db_pool(self):
+        pool = self.engine.pool
+        metric = GaugeMetricFamily('vatproof_db_pool_connections', 'Connexions du pool base de données',
+                                   labels=['state'])
+
+        for state, getter in (('size', 'size'), ('checked_out', 'checkedout'),
+                              ('overflow', 'overflow'), ('checked_in', 'checkedin')):
+            if hasattr(pool, getter):
+                metric.add_metric([state], getattr(pool, getter)())
+
+        yield metric
+
+    def _collect_pacing(self):
+        factor = GaugeMetricFamily('vatproof_vies_pacing_factor',
+                                   'Facteur de cadencement des délais VIES par pays',
+                                   labels=['country_code'])
+        outcomes = CounterMetricFamily('vatproof_vies_pacing_outcomes',
+                                       'Vérifications VIES prises en compte par le cadencement',
+                                       labels=['country_code', 'outcome'])
+
+        for country_code, data in sorted(self.pacer.get_metrics().items()):
+            if 'factor' in data:
+                factor.add_metric([country_code], data['factor'])
+            for outcome, field in (('success', 'successes'), ('error', 'errors'), ('throttle', 'throttles')):
+                if field in data:
+                    outcomes.add_metric([country_code, outcome], data[field])
+
+        yield factor
+        yield outcomes
+
+
+class _ProcessRegistry:
+    """Relaie le registre global du processus (mode mono-processus)"""
+
+    def collect(self):
+        return REGISTRY.collect()
+
+
+def build_registry(runtime_collector: RuntimeCollector = None) -> CollectorRegistry:
+    """
+    Construit le registre à exposer (agrégation multi-processus si configurée)
+
+    Args:
+        runtime_collector (RuntimeCollector): Collecteur calculé à l'exposition
+
+    Returns:
+        CollectorRegistry: Registre prêt pour generate_latest
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = CollectorRegistry()
+        registry.register(_ProcessRegistry())
+
+    if runtime_collector is not None:
+        registry.register(runtime_collector)
+
+    return registry
+
+
+def render_metrics(runtime_collector: RuntimeCollector = None) -> bytes:
+    """Exposition texte des métriques"""
+    return generate_latest(build_registry(runtime_collector))
+
+
+def start_worker_metrics_server(port: int, redis_url: str = None, queues: List[str] = None):
+    """
+    Expose les métriques d'un worker Celery sur un port HTTP dédié
+
+    Args:
+        port (int): Port d'écoute
+        redis_url (str): Broker Redis (profondeur des files)
+        queues (List[str]): Files Celery surveillées
+    """
+    start_http_server(port, registry=build_registry(RuntimeCollector(redis_url, queues)))
+    logger.info(f"Métriques worker exposées sur le port {port}")
@@ -0,0 +1,188 @@
+"""
+Service de cadencement adaptatif des requêtes VIES
+Ajuste les délais par pays selon les erreurs et limitations observées
+"""
+import time
+import threading
+import logging
+from typing import Dict, Optional
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Mise à jour atomique du facteur de cadencement (partagé entre workers)
+# KEYS[1] = clé du pays, ARGV = [mode, min, max, decrease, increase, step, now, initial]
+_UPDATE_FACTOR_SCRIPT = """
+local factor = tonumber(redis.call('HGET', KEYS[1], 'factor') or ARGV[8])
+local mode = ARGV[1]
+local min_factor = tonumber(ARGV[2])
+local max_factor = tonumber(ARGV[3])
+
+if mode == 'success' then
+    factor = factor * tonumber(ARGV[4])
+    if factor < 0.01 then factor = 0 end
+    redis.call('HINCRBY', KEYS[1], 'successes', 1)
+else
+    factor = factor * tonumber(ARGV[5]) + tonumber(ARGV[6])
+    redis.call('HINCRBY', KEYS[1], mode == 'throttle' and 'throttles' or 'errors', 1)
+end
+
+if factor < min_factor then factor = min_factor end
+if factor > max_factor then factor = max_factor end
+
+redis.call('HSET', KEYS[1], 'factor', factor, 'updated_at', ARGV[7])
+return tostring(factor)
+"""
+
+
+class AdaptivePacer:
+    """
+    Contrôleur de cadencement AIMD par État membre
+
+    Le facteur multiplie les délais "humains" de VIESAutomation :
+    il décroît géométriquement à chaque succès (jusqu'à 0 quand VIES est sain)
+    et augmente fortement sur erreur ou limitation (MS_MAX_CONCURRENT_REQ...).
+    """
+
+    OUTCOME_SUCCESS = 'success'
+    OUTCOME_ERROR = 'error'
+    OUTCOME_THROTTLE = 'throttle'
+
+    def __init__(self, redis_url: str = 'redis://localhost:6379/1',
+                 initial_factor: float = 1.0, min_factor: float = 0.0, max_factor: float = 4.0,
+                 decrease: float = 0.8, increase: float = 2.0, step: float = 0.25):
+        """
+        Initialise le contrôleur
+
+        Args:
+            redis_url (str): URL de connexion Redis
+            initial_factor (float): Facteur d'un pays jamais observé
+            min_factor (float): Facteur minimum
+            max_factor (float): Facteur maximum
+            decrease (float): Multiplicateur appliqué à chaque succès
+            increase (float): Multiplicateur appliqué à chaque erreur
+            step (float): Incrément additif appliqué à chaque erreur
+        """
+        self.redis_client = redis.from_url(redis_url)
+        self.key_prefix = "vatproof:pacing:"
+        self.initial_factor = initial_factor
+        self.min_factor = min_factor
+        self.max_factor = max_factor
+        self.decrease = decrease
+        self.increase = increase
+        self.step = step
+        self._update_factor = self.redis_client.register_script(_UPDATE_FACTOR_SCRIPT)
+
+        # Repli local si Redis est indisponible
+        self._local_factors: Dict[str, float] = {}
+
+    def get_factor(self, country_code: str) -> float:
+        """
+        Récupère le facteur de cadencement courant d'un pays
+
+        Args:
+            country_code (str): Code pays
+
+        Returns:
+            float: Facteur multiplicatif des délais
+        """
+        try:
+            value = self.redis_client.hget(f"{self.key_prefix}{country_code}", 'factor')
+            return float(value) if value is not None else self.initial_factor
+        except redis.RedisError as e:
+            logger.warning(f"Cadencement: Redis indisponible ({e}), facteur local utilisé")
+            return self._local_factors.get(country_code, self.initial_factor)
+
+    def record(self, country_code: str, outcome: str) -> Optional[float]:
+        """
+        Enregistre le résultat d'une requête VIES et ajuste le facteur
+
+        Args:
+            country_code (str): Code pays
+            outcome (str): 'success', 'error' ou 'throttle'
+
+        Returns:
+            Optional[float]: Nouveau facteur
+        """
+        try:
+            factor = self._update_factor(
+                keys=[f"{self.key_prefix}{country_code}"],
+                args=[outcome, self.min_factor, self.max_factor, self.decrease,
+                      self.increase, self.step, int(time.time()), self.initial_factor]
+            )
+            factor = float(factor)
+        except redis.RedisError as e:
+            logger.warning(f"Cadencement: Redis indisponible ({e}), mise à jour locale")
+            factor = self._local_update(country_code, outcome)
+
+        logger.debug(f"Cadencement {country_code}: {outcome} -> facteur {factor:.2f}")
+        return factor
+
+    def get_metrics(self) -> Dict[str, Dict]:
+        """
+        Exporte l'état de cadencement de tous les pays observés
+
+        Returns:
+            Dict[str, Dict]: {pays: {factor, successes, errors, throttles, updated_at}}
+        """
+        metrics = {}
+
+        try:
+            for key in self.redis_client.scan_iter(f"{self.key_prefix}*"):
+                key = key.decode() if isinstance(key, bytes) else key
+                data = {
+                    (k.decode() if isinstance(k, bytes) else k): float(v)
+                    for k, v in self.redis_client.hgetall(key).items()
+                }
+                metrics[key[len(self.key_prefix):]] = data
+        except redis.RedisError:
+            metrics = {cc: {'factor': f} for cc, f in self._local_factors.items()}
+
+        return metrics
+
+    def _local_update(self, country_code: str, outcome: str) -> float:
+        """Mise à jour du facteur en mémoire (repli sans Redis)"""
+        factor = self._local_factors.get(country_code, self.initial_factor)
+
+        if outcome == self.OUTCOME_SUCCESS:
+            factor *= self.decrease
+            if factor < 0.01:
+                factor = 0.0
+        else:
+            factor = factor * self.increase + self.step
+
+        factor = min(max(factor, self.min_factor), self.max_factor)
+        self._local_factors[country_code] = factor
+        return factor
+
+
+class LocalPacer(AdaptivePacer):
+    """
+    Cadencement AIMD en mémoire, sans Redis (traitements hors ligne d'un seul processus)
+
+    Mêmes règles que AdaptivePacer, partagées entre les threads du processus.
+    """
+
+    def __init__(self, initial_factor: float = 1.0, min_factor: float = 0.0, max_factor: float = 4.0,
+                 decrease: float = 0.8, increase: float = 2.0, step: float = 0.25):
+        self.initial_factor = initial_factor
+        self.min_factor = min_factor
+        self.max_factor = max_factor
+        self.decrease = decrease
+        self.increase = increase
+        self.step = step
+        self._local_factors: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get_factor(self, country_code: str) -> float:
+        """Facteur de cadencement courant d'un pays"""
+        return self._local_factors.get(country_code, self.initial_factor)
+
+    def record(self, country_code: str, outcome: str) -> Optional[float]:
+        """Enregistre le résultat d'une requête VIES et ajuste le facteur"""
+        with self._lock:
+            return self._local_update(country_code, outcome)
+
+    def get_metrics(self) -> Dict[str, Dict]:
+        """État de cadencement des pays observés"""
+        return {cc: {'factor': f} for cc, f in self._local_factors.items()}
@@ -0,0 +1,153 @@
+"""
+Validation multi-processus des très grandes listes de numéros de TVA
+Les valeurs transitent par mémoire partagée (pas de pickling des listes) :
+chaque processus valide et dédoublonne son lot, le processus parent
+fusionne les doublons entre lots en conservant la première occurrence
+"""
+import logging
+from multiprocessing import Pool, shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.vat_service import VATService
+
+logger = logging.getLogger(__name__)
+
+# Segments de mémoire partagée d'une validation (noms transmis aux processus)
+_SEGMENTS = ('text', 'offsets', 'cleaned', 'cleaned_length', 'error_kind', 'duplicate_of')
+
+
+def _validate_shard(task: Tuple[Dict[str, str], int, int, int]) -> int:
+    """
+    Valide les lignes [start, end) et écrit les résultats en mémoire partagée
+
+    Args:
+        task (tuple): Noms des segments, nombre total de lignes, début et fin du lot
+
+    Returns:
+        int: Début du lot (suivi de l'avancement)
+    """
+    names, count, start, end = task
+    segments = {key: shared_memory.SharedMemory(name=name) for key, name in names.items()}
+
+    try:
+        _write_shard_results(segments, count, start, end)
+        return start
+    finally:
+        for segment in segments.values():
+            try:
+                segment.close()
+            except BufferError:
+                pass  # Vue encore référencée par une exception en cours
+
+
+def _write_shard_results(segments: Dict[str, shared_memory.SharedMemory], count: int, start: int, end: int):
+    """Validation d'un lot (les vues sur les segments sont libérées au retour)"""
+    offsets = np.ndarray((count + 1,), dtype=np.int64, buffer=segments['offsets'].buf)
+    text = segments['text'].buf
+    values = [bytes(text[offsets[i]:offsets[i + 1]]).decode('utf-8') for i in range(start, end)]
+
+    cleaned, error_kind = VATService._check_column(values)
+    duplicate_of = VATService._find_column_duplicates(cleaned, error_kind == VATService.COLUMN_OK)
+
+    # Numéros nettoyés (ASCII, jamais plus longs que la valeur) écrits à l'offset de la valeur
+    cleaned_buffer = segments['cleaned'].buf
+    for offset, value in zip(offsets[start:end].tolist(), cleaned):
+        cleaned_buffer[offset:offset + len(value)] = value.encode('ascii')
+
+    np.ndarray((count,), dtype=np.int32, buffer=segments['cleaned_length'].buf)[start:end] = \
+        [len(value) for value in cleaned]
+    np.ndarray((count,), dtype=np.int8, buffer=segments['error_kind'].buf)[start:end] = error_kind
+    np.ndarray((count,), dtype=np.int64, buffer=segments['duplicate_of'].buf)[start:end] = \
+        np.where(duplicate_of >= 0, duplicate_of + start, -1)
+
+
+def _merge_duplicates(cleaned: List[str], error_kind: np.ndarray, duplicate_of: np.ndarray,
+                      shards: List[Tuple[int, int]]) -> np.ndarray:
+    """
+    Détection globale des doublons à partir des doublons locaux de chaque lot
+
+    Les premières occurrences locales sont confrontées, dans l'ordre des lots,
+    aux numéros des lots précédents ; tout doublon renvoie ensuite à la
+    première occurrence globale.
+
+    Returns:
+        np.ndarray: Index de la première occurrence globale (-1 si non doublon)
+    """
+    first_index = {}
+    merged = duplicate_of.copy()
+    is_valid = error_kind == VATService.COLUMN_OK
+
+    for start, end in shards:
+        for i in np.flatnonzero(is_valid[start:end] & (duplicate_of[start:end] < 0)).tolist():
+            row = start + i
+            first = first_index.setdefault(cleaned[row], row)
+            if first != row:
+                merged[row] = first
+
+    for row in np.flatnonzero(duplicate_of >= 0).tolist():
+        merged[row] = first_index[cleaned[row]]
+
+    return merged
+
+
+def validate_parallel(vat_list: List[str], workers: Optional[int] = None, shard_rows: int = 200000) -> Dict:
+    """
+    Valide une liste sur un pool de processus
+
+    Args:
+        vat_list (List[str]): Liste des numéros à valider
+        workers (int): Processus du pool (défaut : nombre de CPU)
+        shard_rows (int): Lignes par lot
+
+    Returns:
+        Dict: Résultats identiques à VATService.validate_vat_list
+    """
+    count = len(vat_list)
+    if count <= shard_rows:
+        return VATService.validate_vat_column(vat_list)
+
+    encoded = [(str(vat_input) if vat_input else '').encode('utf-8') for vat_input in vat_list]
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    text_size = max(int(offsets[-1]), 1)
+
+    sizes = {
+        'text': text_size,
+        'offsets': offsets.nbytes,
+        'cleaned': text_size,
+        'cleaned_length': count * 4,
+        'error_kind': count,
+        'duplicate_of': count * 8,
+    }
+    segments = {key: shared_memory.SharedMemory(create=True, size=sizes[key]) for key in _SEGMENTS}
+
+    try:
+        segments['text'].buf[:offsets[-1]] = b''.join(encoded)
+        np.ndarray(offsets.shape, dtype=np.int64, buffer=segments['offsets'].buf)[:] = offsets
+        del encoded
+
+        names = {key: segment.name for key, segment in segments.items()}
+        shards = [(start, min(start + shard_rows, count)) for start in range(0, count, shard_rows)]
+
+        with Pool(processes=workers) as pool:
+            for done, _ in enumerate(pool.imap_unordered(
+                    _validate_shard, [(names, count, start, end) for start, end in shards]), 1):
+                logger.debug(f"Validation parallèle: lot {done}/{len(shards)}")
+
+        cleaned_length = np.ndarray((count,), dtype=np.int32, buffer=segments['cleaned_length'].buf).copy()
+        error_kind = np.ndarray((count,), dtype=np.int8, buffer=segments['error_kind'].buf).copy()
+        duplicate_of = np.ndarray((count,), dtype=np.int64, buffer=segments['duplicate_of'].buf).copy()
+        cleaned_text = bytes(segments['cleaned'].buf[:offsets[-1]]).decode('latin-1')
+    finally:
+        for segment in segments.values():
+            segment.close()
+            segment.unlink()
+
+    # Octets en dehors des numéros nettoyés ignorés : découpage par offset et longueur
+    cleaned = [cleaned_text[start:start + length]
+               for start, length in zip(offsets[:-1].tolist(), cleaned_length.tolist())]
+    duplicate_of = _merge_duplicates(cleaned, error_kind, duplicate_of, shards)
+
+    return VATService._build_column_results(vat_list, cleaned, error_kind, duplicate_of)
@@ -0,0 +1,125 @@
+"""
+Stockage compressé des réponses brutes VIES
+Les pages HTML sont conservées hors de la table verification_jobs,
+qui ne garde qu'une référence
+"""
+import os
+import gzip
+import logging
+import shutil
+from datetime import datetime, timedelta
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseStore:
+    """Magasin de réponses VIES compressées (un fichier gzip par vérification)"""
+
+    EXTENSION = '.html.gz'
+
+    def __init__(self, base_dir: str = 'vies_responses', compression_level: int = 6):
+        """
+        Initialise le magasin
+
+        Args:
+            base_dir (str): Dossier racine du stockage
+            compression_level (int): Niveau gzip (1 = rapide, 9 = compact)
+        """
+        self.base_dir = os.path.abspath(base_dir)
+        self.compression_level = compression_level
+
+    def save(self, key: str, content: str) -> str:
+        """
+        Compresse et enregistre une réponse
+
+        Args:
+            key (str): Identifiant lisible (ex: 'FR40303265045_<task_id>')
+            content (str): HTML brut de la page VIES
+
+        Returns:
+            str: Référence relative à conserver en base
+        """
+        safe_key = ''.join(c if c.isalnum() or c in '-_' else '_' for c in key)
+        ref = os.path.join(datetime.utcnow().strftime('%Y%m%d'), safe_key + self.EXTENSION)
+        path = os.path.join(self.base_dir, ref)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with gzip.open(path, 'wb', compresslevel=self.compression_level) as f:
+            f.write(content.encode('utf-8'))
+
+        return ref
+
+    def load(self, ref: str) -> Optional[str]:
+        """
+        Relit une réponse à la demande
+
+        Args:
+            ref (str): Référence retournée par save
+
+        Returns:
+            Optional[str]: HTML brut, ou None si absent
+        """
+        path = self._resolve(ref)
+        if not path or not os.path.exists(path):
+            return None
+
+        with gzip.open(path, 'rb') as f:
+            return f.read().decode('utf-8')
+
+    def delete(self, ref: str) -> bool:
+        """Supprime une réponse stockée"""
+        path = self._resolve(ref)
+        if not path or not os.path.exists(path):
+            return False
+
+        os.remove(path)
+        return True
+
+    def purge(self, older_than_days: int) -> int:
+        """
+        Supprime les réponses plus anciennes que la durée de conservation
+
+        Les réponses sont rangées par jour d'enregistrement : les dossiers
+        entiers antérieurs à la limite sont supprimés, sans parcourir les fichiers.
+
+        Args:
+            older_than_days (int): Durée de conservation en jours
+
+        Returns:
+            int: Nombre de dossiers journaliers supprimés
+        """
+        if not os.path.isdir(self.base_dir):
+            return 0
+
+        cutoff = (datetime.utcnow() - timedelta(days=older_than_days)).strftime('%Y%m%d')
+        purged = 0
+
+        for name in os.listdir(self.base_dir):
+            # Seuls les dossiers créés par save (YYYYMMDD) sont concernés
+            if len(name) != 8 or not name.isdigit() or name >= cutoff:
+                continue
+
+            path = os.path.join(self.base_dir, name)
+            if not os.path.isdir(path):
+                continue
+
+            try:
+                shutil.rmtree(path)
+                purged += 1
+            except OSError as e:
+                logger.warning(f"Dossier de réponses VIES {name} non supprimé: {e}")
+
+        return purged
+
+    def _resolve(self, ref: str) -> Optional[str]:
+        """Chemin absolu d'une référence (refuse toute sortie du dossier racine)"""
+        if not ref:
+            return None
+
+        path = os.path.abspath(os.path.join(self.base_dir, ref))
+        if not path.startswith(self.base_dir + os.sep):
+            logger.warning(f"Référence de réponse VIES invalide: {ref}")
+            return None
+
+        return path
@@ -0,0 +1,97 @@
+"""
+Cache local des verdicts VIES
+Base SQLite sur disque : un traitement hors ligne relancé (rapprochement
+nocturne) réutilise les verdicts récents au lieu d'interroger VIES à nouveau
+"""
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+# Champs du résultat conservés (ni page brute ni durées de phase)
+CACHED_FIELDS = (
+    'is_valid', 'company_name', 'company_address', 'verification_date',
+    'request_identifier', 'pdf_path'
+)
+
+
+class VerificationCache:
+    """Verdicts VIES récents, indexés par numéro complet (pays + numéro)"""
+
+    def __init__(self, path: str, max_age: int = 7 * 86400):
+        """
+        Initialise le cache
+
+        Args:
+            path (str): Fichier SQLite (créé au besoin)
+            max_age (int): Âge maximal d'un verdict réutilisable en secondes
+        """
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS verdicts ('
+            'vat TEXT PRIMARY KEY, result TEXT NOT NULL, verified_at REAL NOT NULL)'
+        )
+        self._connection.commit()
+
+    def get(self, country_code: str, vat_number: str) -> Optional[Dict]:
+        """
+        Relit un verdict récent
+
+        Args:
+            country_code (str): Code pays
+            vat_number (str): Numéro sans le code pays
+
+        Returns:
+            Optional[Dict]: Résultat conservé, ou None si absent / trop ancien
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT result FROM verdicts WHERE vat = ? AND verified_at >= ?',
+                (f'{country_code}{vat_number}', time.time() - self.max_age)
+            ).fetchone()
+
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, vats: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Relit les verdicts récents de plusieurs numéros complets (pays + numéro)
+
+        Returns:
+            Dict[str, Dict]: Résultat conservé par numéro (absents / trop anciens omis)
+        """
+        vats = list(vats)
+        found = {}
+        oldest = time.time() - self.max_age
+
+        with self._lock:
+            # Par paquets : limite du nombre de paramètres SQLite
+            for start in range(0, len(vats), 500):
+                batch = vats[start:start + 500]
+                rows = self._connection.execute(
+                    f'SELECT vat, result FROM verdicts WHERE verified_at >= ? '
+                    f'AND vat IN ({",".join("?" * len(batch))})',
+                    (oldest, *batch)
+                ).fetchall()
+                found.update((vat, json.loads(result)) for vat, result in rows)
+
+        return found
+
+    def put(self, country_code: str, vat_number: str, result: Dict):
+        """Enregistre le verdict d'une vérification aboutie"""
+        if not result.get('success'):
+            return
+
+        payload = json.dumps({field: result.get(field) for field in CACHED_FIELDS}, separators=(',', ':'))
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO verdicts (vat, result, verified_at) VALUES (?, ?, ?)',
+                (f'{country_code}{vat_number}', payload, time.time())
+            )
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
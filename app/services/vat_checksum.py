@@ -0,0 +1,211 @@
+"""
+Clés de contrôle des numéros de TVA intracommunautaire
+Règles nationales publiées (somme pondérée, modulo 97, Luhn...) ; un
+numéro au bon format mais à la clé fausse est une faute de saisie
+"""
+from typing import Callable, Dict, Optional
+
+
+def _weighted_sum(number: str, weights) -> int:
+    return sum(int(c) * w for c, w in zip(number, weights))
+
+
+def _luhn(number: str) -> bool:
+    total = 0
+    for i, c in enumerate(reversed(number)):
+        d = int(c)
+        if i % 2:
+            d = d * 2 - 9 if d > 4 else d * 2
+        total += d
+    return total % 10 == 0
+
+
+def _mod_11_10(number: str) -> bool:
+    """ISO 7064 MOD 11,10 (Allemagne, Croatie)"""
+    product = 10
+    for c in number[:-1]:
+        total = (int(c) + product) % 10 or 10
+        product = (2 * total) % 11
+    return (11 - product) % 10 == int(number[-1])
+
+
+def _check_at(number: str) -> bool:
+    total = 0
+    for i, c in enumerate(number[1:8]):
+        d = int(c) * (2 if i % 2 else 1)
+        total += d // 10 + d % 10
+    return (10 - (total + 4) % 10) % 10 == int(number[8])
+
+
+def _check_be(number: str) -> bool:
+    return 97 - int(number[:8]) % 97 == int(number[8:])
+
+
+def _check_bg(number: str) -> Optional[bool]:
+    if len(number) != 9:
+        return None  # Personnes physiques (10 chiffres) : pas de règle vérifiée
+    check = _weighted_sum(number, range(1, 9)) % 11
+    if check == 10:
+        check = _weighted_sum(number, range(3, 11)) % 11 % 10
+    return check == int(number[8])
+
+
+def _check_cy(number: str) -> bool:
+    odd = (1, 0, 5, 7, 9, 13, 15, 17, 19, 21)
+    total = sum(odd[int(c)] if i % 2 == 0 else int(c) for i, c in enumerate(number[:8]))
+    return chr(65 + total % 26) == number[8]
+
+
+def _check_cz(number: str) -> Optional[bool]:
+    if len(number) != 8:
+        return None  # Personnes physiques (9-10 chiffres) : pas de règle vérifiée
+    check = 11 - _weighted_sum(number, range(8, 1, -1)) % 11
+    return check % 10 == int(number[7])
+
+
+def _check_dk(number: str) -> bool:
+    return _weighted_sum(number, (2, 7, 6, 5, 4, 3, 2, 1)) % 11 == 0
+
+
+def _check_ee(number: str) -> bool:
+    return (10 - _weighted_sum(number, (3, 7, 1, 3, 7, 1, 3, 7)) % 10) % 10 == int(number[8])
+
+
+def _check_el(number: str) -> bool:
+    return _weighted_sum(number, (256, 128, 64, 32, 16, 8, 4, 2)) % 11 % 10 == int(number[8])
+
+
+def _check_es(number: str) -> bool:
+    if number[0].isdigit() or number[0] in 'XYZ':
+        # Personnes physiques (DNI / NIE) : lettre de contrôle modulo 23
+        digits = str('XYZ'.index(number[0])) + number[1:8] if number[0] in 'XYZ' else number[:8]
+        return digits.isdigit() and 'TRWAGMYFPDXBNJZSQVHLCKE'[int(digits) % 23] == number[8]
+
+    # Personnes morales : chiffre ou lettre de contrôle sur les 7 chiffres centraux
+    if not number[1:8].isdigit():
+        return False
+    total = 0
+    for i, c in enumerate(number[1:8]):
+        d = int(c) * (1 if i % 2 else 2)
+        total += d // 10 + d % 10
+    check = (10 - total % 10) % 10
+    return number[8] in (str(check), 'JABCDEFGHI'[check])
+
+
+def _check_fi(number: str) -> bool:
+    check = 11 - _weighted_sum(number, (7, 9, 10, 5, 8, 4, 2)) % 11
+    return check != 10 and check % 11 == int(number[7])
+
+
+def _check_fr(number: str) -> Optional[bool]:
+    if not number.isdigit():
+        return None  # Clés alphanumériques (anciens numéros) : pas de règle vérifiée
+    return (12 + 3 * (int(number[2:]) % 97)) % 97 == int(number[:2])
+
+
+def _check_hu(number: str) -> bool:
+    return (10 - _weighted_sum(number, (9, 7, 3, 1, 9, 7, 3)) % 10) % 10 == int(number[7])
+
+
+def _check_ie(number: str) -> bool:
+    if number[1].isalpha() or number[1] in '+*':
+        # Ancien format : le deuxième caractère est déplacé en fin de séquence
+        number = '0' + number[2:7] + number[0] + number[7:]
+    if not number[:7].isdigit():
+        return False
+    total = _weighted_sum(number, range(8, 1, -1))
+    if len(number) == 9 and number[8] != 'W':
+        total += (ord(number[8]) - 64) * 9
+    return 'WABCDEFGHIJKLMNOPQRSTUV'[total % 23] == number[7]
+
+
+def _check_lt(number: str) -> bool:
+    size = len(number) - 1
+    check = _weighted_sum(number, [1 + i % 9 for i in range(size)]) % 11
+    if check == 10:
+        check = _weighted_sum(number, [1 + (i + 2) % 9 for i in range(size)]) % 11 % 10
+    return check == int(number[-1])
+
+
+def _check_lu(number: str) -> bool:
+    return int(number[:6]) % 89 == int(number[6:])
+
+
+def _check_lv(number: str) -> Optional[bool]:
+    if int(number[0]) <= 3:
+        return None  # Personnes physiques (date de naissance) : pas de règle vérifiée
+    check = 3 - _weighted_sum(number, (9, 1, 4, 8, 3, 10, 2, 5, 7, 6)) % 11
+    if check == -1:
+        return False
+    return (check + 11 if check < -1 else check) == int(number[10])
+
+
+def _check_mt(number: str) -> bool:
+    return 37 - _weighted_sum(number, (3, 4, 6, 7, 8, 9)) % 37 == int(number[6:])
+
+
+def _check_nl(number: str) -> bool:
+    # Numéros historiques (modulo 11) ou attribués depuis 2020 (modulo 97 sur "NL" + numéro)
+    if _weighted_sum(number, range(9, 1, -1)) % 11 == int(number[8]):
+        return True
+    return int('2321' + number[:9] + '11' + number[10:]) % 97 == 1
+
+
+def _check_pl(number: str) -> bool:
+    return _weighted_sum(number, (6, 5, 7, 2, 3, 4, 5, 6, 7)) % 11 == int(number[9])
+
+
+def _check_pt(number: str) -> bool:
+    check = 11 - _weighted_sum(number, range(9, 1, -1)) % 11
+    return (0 if check >= 10 else check) == int(number[8])
+
+
+def _check_ro(number: str) -> bool:
+    weights = (7, 5, 3, 2, 1, 7, 5, 3, 2)[10 - len(number):]
+    return _weighted_sum(number, weights) * 10 % 11 % 10 == int(number[-1])
+
+
+def _check_se(number: str) -> bool:
+    return _luhn(number[:10]) and number[10:] != '00'
+
+
+def _check_si(number: str) -> bool:
+    check = 11 - _weighted_sum(number, range(8, 1, -1)) % 11
+    return number[0] != '0' and check != 11 and check % 10 == int(number[7])
+
+
+def _check_sk(number: str) -> bool:
+    return int(number) % 11 == 0
+
+
+# Règle de contrôle par pays (le numéro doit déjà respecter VATService.VAT_PATTERNS)
+CHECKSUM_RULES: Dict[str, Callable[[str], Optional[bool]]] = {
+    'AT': _check_at, 'BE': _check_be, 'BG': _check_bg, 'CY': _check_cy, 'CZ': _check_cz,
+    'DE': _mod_11_10, 'DK': _check_dk, 'EE': _check_ee, 'EL': _check_el,
+    'ES': _check_es, 'FI': _check_fi, 'FR': _check_fr, 'HR': _mod_11_10,
+    'HU': _check_hu, 'IE': _check_ie, 'IT': _luhn, 'LT': _check_lt,
+    'LU': _check_lu, 'LV': _check_lv, 'MT': _check_mt, 'NL': _check_nl,
+    'PL': _check_pl, 'PT': _check_pt, 'RO': _check_ro, 'SE': _check_se,
+    'SI': _check_si, 'SK': _check_sk,
+}
+
+
+def verify_checksum(country_code: str, vat_number: str) -> Optional[bool]:
+    """
+    Vérifie la clé de contrôle d'un numéro au bon format
+
+    Args:
+        country_code (str): Code pays
+        vat_number (str): Numéro sans le code pays, au format du pays
+
+    Returns:
+        Optional[bool]: Résultat du contrôle, None si aucune règle ne s'applique
+    """
+    rule = CHECKSUM_RULES.get(country_code)
+    if rule is None:
+        return None
+
+    try:
+        return rule(vat_number)
+    except (ValueError, IndexError):
+        return False
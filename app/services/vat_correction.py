@@ -0,0 +1,250 @@
+"""
+Suggestions de correction des numéros de TVA invalides
+Génère les variantes des fautes de saisie courantes (chiffres inversés,
+chiffre manquant ou en trop, O/0 et I/1 confondus, code pays absent) et ne
+retient que celles au format du pays et à la clé de contrôle correcte
+"""
+import itertools
+import re
+from functools import lru_cache
+from typing import Dict, List
+
+from app.services.vat_service import VATService
+from app.services.vat_checksum import verify_checksum
+
+# Types de correction, par ordre de vraisemblance
+CORRECTION_CONFUSION = 'confusion'
+CORRECTION_TRANSPOSITION = 'transposition'
+CORRECTION_MISSING_PREFIX = 'missing_prefix'
+CORRECTION_EXTRA_DIGIT = 'extra_digit'
+CORRECTION_MISSING_DIGIT = 'missing_digit'
+
+CORRECTION_LABELS = {
+    CORRECTION_CONFUSION: 'lettre O/I confondue avec 0/1',
+    CORRECTION_TRANSPOSITION: 'chiffres inversés',
+    CORRECTION_MISSING_PREFIX: 'code pays manquant',
+    CORRECTION_EXTRA_DIGIT: 'caractère en trop',
+    CORRECTION_MISSING_DIGIT: 'chiffre manquant',
+}
+
+_CORRECTION_RANK = {kind: rank for rank, kind in enumerate(CORRECTION_LABELS)}
+
+# Signature d'un numéro : D pour un chiffre, L pour une lettre
+_SIGNATURE_TABLE = str.maketrans('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'D' * 10 + 'L' * 26)
+_CONFUSIONS = {'O': '0', 'I': '1'}
+_CONFUSION_TABLE = str.maketrans(_CONFUSIONS)
+
+# En deçà, un numéro est trop incomplet pour qu'une seule faute l'explique
+_MIN_EDIT_LENGTH = 6
+
+# Signature de chaque élément des motifs de VATService.VAT_PATTERNS
+_ATOM_SIGNATURES = {'\\d': 'D', '[A-Z]': 'L', '[A-Z\\d]': 'DL'}
+
+
+class FormatIndex:
+    """
+    Index précalculé des formats nationaux : longueurs et signatures
+    (suite chiffre / lettre) admises par pays, pays admis par longueur
+    """
+
+    def __init__(self, patterns: Dict[str, str]):
+        self.shapes = {}
+        self.lengths = {}
+        self.countries_by_length = {}
+
+        for country_code, pattern in patterns.items():
+            shapes = set()
+            for alternative in pattern.split('|'):
+                shapes.update(self._expand(alternative.strip('^$')))
+
+            self.shapes[country_code] = frozenset(shapes)
+            self.lengths[country_code] = frozenset(len(shape) for shape in shapes)
+            for length in self.lengths[country_code]:
+                self.countries_by_length.setdefault(length, []).append(country_code)
+
+        self.compiled = {country_code: re.compile(pattern) for country_code, pattern in patterns.items()}
+
+    @staticmethod
+    def _expand(alternative: str) -> List[str]:
+        """Signatures d'une alternative (quantificateurs {n,m} développés)"""
+        parts = []
+        for atom, quantifier in VATService._PATTERN_ATOM_RE.findall(alternative):
+            low, _, high = quantifier.strip('{}').partition(',')
+            low = int(low or 1)
+            high = int(high or low)
+            choices = _ATOM_SIGNATURES.get(atom, 'L')
+            parts.append([''.join(combo) for count in range(low, high + 1)
+                          for combo in itertools.product(choices, repeat=count)])
+
+        return [''.join(combo) for combo in itertools.product(*parts)]
+
+    def matches(self, country_code: str, vat_number: str) -> bool:
+        """Le numéro respecte-t-il le format du pays (longueur, signature puis motif exact)"""
+        return (len(vat_number) in self.lengths[country_code]
+                and vat_number.translate(_SIGNATURE_TABLE) in self.shapes[country_code]
+                and self.compiled[country_code].match(vat_number) is not None)
+
+
+_format_index = None
+
+def get_format_index() -> FormatIndex:
+    """Index des formats (construit une fois par processus)"""
+    global _format_index
+
+    if _format_index is None:
+        _format_index = FormatIndex(VATService.VAT_PATTERNS)
+
+    return _format_index
+
+
+def _body_variants(vat_number: str, index: FormatIndex, country_code: str):
+    """Variantes d'un numéro sans code pays : (numéro, type de correction)"""
+    lengths = index.lengths[country_code]
+    shapes = index.shapes[country_code]
+    size = len(vat_number)
+
+    # O/0 et I/1 : toutes les occurrences, puis chacune séparément
+    if any(c in _CONFUSIONS for c in vat_number):
+        yield vat_number.translate(_CONFUSION_TABLE), CORRECTION_CONFUSION
+        for i, c in enumerate(vat_number):
+            if c in _CONFUSIONS:
+                yield vat_number[:i] + _CONFUSIONS[c] + vat_number[i + 1:], CORRECTION_CONFUSION
+
+    if size < _MIN_EDIT_LENGTH:
+        return
+
+    if size in lengths:
+        for i in range(size - 1):
+            if vat_number[i] != vat_number[i + 1]:
+                yield vat_number[:i] + vat_number[i + 1] + vat_number[i] + vat_number[i + 2:], CORRECTION_TRANSPOSITION
+
+    if size - 1 in lengths:
+        for i in range(size):
+            if i == 0 or vat_number[i] != vat_number[i - 1]:  # Même résultat pour une suite de caractères identiques
+                yield vat_number[:i] + vat_number[i + 1:], CORRECTION_EXTRA_DIGIT
+
+    if size + 1 in lengths:
+        signature = vat_number.translate(_SIGNATURE_TABLE)
+        # Un chiffre inséré à ces positions doit donner une signature admise
+        positions = [i for i in range(size + 1) if signature[:i] + 'D' + signature[i:] in shapes]
+
+        # Chiffre doublé perdu à la saisie (le plus fréquent), puis tout chiffre
+        for i in positions:
+            if i < size and vat_number[i].isdigit():
+                yield vat_number[:i] + vat_number[i] + vat_number[i:], CORRECTION_MISSING_DIGIT
+        for i in positions:
+            for digit in '0123456789':
+                yield vat_number[:i] + digit + vat_number[i:], CORRECTION_MISSING_DIGIT
+
+
+@lru_cache(maxsize=65536)
+def _candidates(cleaned: str) -> tuple:
+    """
+    Corrections possibles d'un numéro nettoyé (mises en cache : les mêmes
+    erreurs reviennent souvent dans un même fichier)
+
+    Returns:
+        tuple: (numéro complet, type, clé de contrôle vérifiée ou None si sans règle)
+    """
+    index = get_format_index()
+    found = {}
+
+    country_code, vat_number = cleaned[:2], cleaned[2:]
+    if country_code in index.lengths:
+        variants = _body_variants(vat_number, index, country_code)
+        candidates = ((country_code, body, kind) for body, kind in variants)
+    else:
+        # Code pays absent : pays dont le format et la clé acceptent le numéro tel quel
+        bodies = {cleaned, cleaned.translate(_CONFUSION_TABLE)}
+        candidates = ((code, body, CORRECTION_MISSING_PREFIX) for body in bodies
+                      for code in index.countries_by_length.get(len(body), ()))
+
+    for code, body, kind in candidates:
+        vat = code + body
+        if vat == cleaned or vat in found or not index.matches(code, body):
+            continue
+
+        checksum = verify_checksum(code, body)
+        if checksum is False:
+            continue
+
+        found[vat] = (vat, kind, checksum)
+
+    return tuple(found.values())
+
+
+def find_corrections(cleaned: str, cache=None, limit: int = 3) -> List[Dict]:
+    """
+    Corrections vraisemblables d'un numéro invalide
+
+    Une variante sans règle de clé connue n'est retenue que pour une confusion
+    O/0 - I/1, ou si le cache local la confirme.
+
+    Args:
+        cleaned (str): Numéro nettoyé (VATService.clean_vat_number)
+        cache (VerificationCache): Cache local des verdicts VIES (optionnel)
+        limit (int): Nombre maximal de suggestions
+
+    Returns:
+        List[Dict]: {vat, kind, label, checksum, confirmed}, les plus vraisemblables d'abord
+    """
+    return suggest_for_rows([cleaned], cache=cache, limit=limit)[0]
+
+
+def suggest_for_rows(values: List[str], cache=None, limit: int = 3) -> List[List[Dict]]:
+    """
+    Corrections de plusieurs numéros nettoyés, avec une seule lecture du cache
+
+    Returns:
+        List[List[Dict]]: Corrections de chaque numéro (voir find_corrections)
+    """
+    candidates = [_candidates(cleaned) if cleaned else () for cleaned in values]
+
+    verdicts = {}
+    if cache is not None:
+        verdicts = cache.get_many({vat for row in candidates for vat, _, _ in row})
+
+    suggestions = []
+    for row in candidates:
+        kept = []
+        for position, (vat, kind, checksum) in enumerate(row):
+            verdict = verdicts.get(vat)
+            confirmed = None if verdict is None else bool(verdict.get('is_valid'))
+
+            if confirmed is False or (checksum is None and not confirmed and kind != CORRECTION_CONFUSION):
+                continue
+
+            kept.append((not confirmed, _CORRECTION_RANK[kind], position, {
+                'vat': vat,
+                'kind': kind,
+                'label': CORRECTION_LABELS[kind],
+                'checksum': checksum,
+                'confirmed': confirmed,
+            }))
+
+        kept.sort(key=lambda item: item[:3])
+        suggestions.append([item[3] for item in kept[:limit]])
+
+    return suggestions
+
+
+def add_suggestions(invalid_results: List[Dict], cache=None, limit: int = 3) -> int:
+    """
+    Ajoute les corrections suggérées ('suggestions') aux résultats invalides
+
+    Args:
+        invalid_results (List[Dict]): Résultats de validation invalides
+        cache (VerificationCache): Cache local des verdicts VIES (optionnel)
+        limit (int): Suggestions par ligne
+
+    Returns:
+        int: Lignes ayant au moins une suggestion
+    """
+    suggestions = suggest_for_rows([result['cleaned'] for result in invalid_results], cache=cache, limit=limit)
+
+    corrected = 0
+    for result, row in zip(invalid_results, suggestions):
+        result['suggestions'] = [suggestion['vat'] for suggestion in row]
+        corrected += bool(row)
+
+    return corrected
@@ -3,9 +3,14 @@ Service de validation des numéros de TVA intracommunautaire
 Gère la validation, nettoyage et extraction des informations TVA
 """
 import re
-from typing import Dict, List, Optional, Tuple
+import heapq
+from operator import itemgetter
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
 from collections import Counter
 
+if TYPE_CHECKING:
+    import numpy as np  # Annotations seulement : numpy est chargé à la demande
+
 class VATService:
     """Service pour la validation et le traitement des numéros de TVA"""
     
@@ -40,6 +45,27 @@ class VATService:
         'SK': r'^\d{10}$',                    # Slovaquie
     }
     
+    # Taille de liste à partir de laquelle la validation se fait par colonne
+    COLUMNAR_THRESHOLD = 50000
+    
+    # Nettoyage d'une colonne concaténée (les sauts de ligne séparent les valeurs)
+    _COLUMN_CLEAN_RE = re.compile(r'[^A-Za-z0-9\n]')
+    
+    # Types d'erreur de la validation par colonne (un octet par ligne)
+    COLUMN_OK = 0
+    COLUMN_EMPTY = 1
+    COLUMN_TOO_SHORT = 2
+    COLUMN_TOO_LONG = 3
+    COLUMN_NO_COUNTRY = 4
+    COLUMN_BAD_FORMAT = 5
+    
+    # Extraction en texte libre : séparateurs tolérés à l'intérieur d'un numéro
+    _MIXED_SEPARATORS = ' .-\u00a0'
+    _SEPARATOR_TABLE = str.maketrans('', '', _MIXED_SEPARATORS)
+    _PATTERN_ATOM_RE = re.compile(r'(\\d|\[[^\]]*\]|[A-Z])(\{\d+(?:,\d+)?\})?')
+    _MIXED_CONTENT_OVERLAP = 64  # > longueur maximale d'un numéro avec séparateurs
+    _mixed_content_re = None
+    
     # Noms complets des pays
     COUNTRY_NAMES = {
         'AT': 'Autriche', 'BE': 'Belgique', 'BG': 'Bulgarie', 'CY': 'Chypre',
@@ -192,65 +218,257 @@ class VATService:
         return result
     
     @classmethod
-    def validate_vat_list(cls, vat_list: List[str]) -> Dict[str, any]:
+    def validate_vat_list(cls, vat_list: List[str], invalid_filter=None) -> Dict[str, any]:
         """
         Valide une liste de numéros de TVA
         
         Args:
             vat_list (List[str]): Liste des numéros à valider
+            invalid_filter (InvalidVATFilter): Cache négatif des numéros confirmés
+                invalides par VIES (optionnel, voir flag_recently_invalid)
             
         Returns:
             Dict: Résultats de validation avec statistiques
         """
-        if not vat_list:
-            return {
-                'valid': [],
-                'invalid': [],
-                'duplicates': [],
-                'summary': {
-                    'total_count': 0,
-                    'valid_count': 0,
-                    'invalid_count': 0,
-                    'duplicate_count': 0,
-                    'countries': {}
-                }
-            }
+        # Grandes listes : validation par colonne (mêmes résultats)
+        if len(vat_list) >= cls.COLUMNAR_THRESHOLD:
+            validation_results = cls.validate_vat_column(vat_list)
+        else:
+            validator = VATListValidator()
+            
+            for vat_input in vat_list:
+                validator.add(vat_input)
+            
+            validation_results = validator.results()
         
-        valid_results = []
-        invalid_results = []
-        seen_numbers = {}  # Pour détecter les doublons
-        countries = Counter()
+        if invalid_filter is not None:
+            cls.flag_recently_invalid(validation_results['valid'], invalid_filter)
+            validation_results['summary']['recently_invalid_count'] = sum(
+                1 for result in validation_results['valid'] if result.get('recently_invalid')
+            )
         
-        for line_number, vat_input in enumerate(vat_list, 1):
-            # Validation individuelle
-            validation_result = cls.validate_single_vat(vat_input, line_number)
+        return validation_results
+    
+    @classmethod
+    def flag_recently_invalid(cls, results: List[Dict], invalid_filter) -> int:
+        """
+        Signale ('recently_invalid') les numéros au format valide que VIES a
+        récemment déclarés invalides, d'après le cache négatif
+        
+        Le cache est probabiliste : un numéro signalé peut être un faux positif
+        (taux borné par le filtre), un numéro non signalé ne l'a jamais été.
+        
+        Args:
+            results (List[Dict]): Résultats de validation (doublons et formats invalides ignorés)
+            invalid_filter (InvalidVATFilter): Cache négatif
             
-            # Détection des doublons
-            if validation_result['is_valid']:
-                full_vat = f"{validation_result['country_code']}{validation_result['vat_number']}"
-                
-                if full_vat in seen_numbers:
-                    # Marquer comme doublon
-                    validation_result['is_duplicate'] = True
-                    validation_result['duplicate_of_line'] = seen_numbers[full_vat]
-                    validation_result['error'] = f"Doublon de la ligne {seen_numbers[full_vat]}"
-                else:
-                    seen_numbers[full_vat] = line_number
-                    validation_result['is_duplicate'] = False
-                    
-                    # Comptage par pays (seulement pour les non-doublons)
-                    countries[validation_result['country_code']] += 1
-                
-                valid_results.append(validation_result)
-            else:
-                validation_result['is_duplicate'] = False
-                invalid_results.append(validation_result)
+        Returns:
+            int: Numéros signalés
+        """
+        candidates = [r for r in results if r['is_valid'] and not r.get('is_duplicate')]
+        flags = invalid_filter.contains_many(f"{r['country_code']}{r['vat_number']}" for r in candidates)
+        
+        for result, flag in zip(candidates, flags):
+            result['recently_invalid'] = flag
+        
+        return sum(flags)
+    
+    @classmethod
+    def validate_vat_column(cls, vat_list: List[str]) -> Dict[str, any]:
+        """
+        Valide une liste de numéros de TVA colonne par colonne (pandas)
+        
+        Nettoyage, découpage du préfixe pays et contrôle des formats sont
+        faits sur la colonne entière, les formats étant testés pays par pays ;
+        les doublons sont détectés par hachage. Les résultats sont identiques
+        à ceux du parcours ligne à ligne.
+        
+        Args:
+            vat_list (List[str]): Liste des numéros à valider
+            
+        Returns:
+            Dict: Résultats de validation avec statistiques (format de validate_vat_list)
+        """
+        if not len(vat_list):
+            return VATListValidator().results()
+        
+        values = [str(vat_input) if vat_input else '' for vat_input in vat_list]
+        cleaned, error_kind = cls._check_column(values)
+        duplicate_of = cls._find_column_duplicates(cleaned, error_kind == cls.COLUMN_OK)
+        
+        return cls._build_column_results(vat_list, cleaned, error_kind, duplicate_of)
+    
+    @classmethod
+    def validate_vat_list_parallel(cls, vat_list: List[str], workers: int = None,
+                                   shard_rows: int = 200000) -> Dict[str, any]:
+        """
+        Valide une très grande liste sur plusieurs processus
+        
+        Voir app.services.parallel_validation ; les résultats sont identiques
+        à ceux de validate_vat_list.
+        
+        Args:
+            vat_list (List[str]): Liste des numéros à valider
+            workers (int): Processus du pool (défaut : nombre de CPU)
+            shard_rows (int): Lignes par lot confié à un processus
+            
+        Returns:
+            Dict: Résultats de validation avec statistiques
+        """
+        from app.services.parallel_validation import validate_parallel
+        
+        return validate_parallel(vat_list, workers=workers, shard_rows=shard_rows)
+    
+    @classmethod
+    def _check_column(cls, values: List[str]) -> Tuple[List[str], 'np.ndarray']:
+        """
+        Contrôles de format d'une colonne de valeurs (chaînes, '' si vide)
+        
+        Args:
+            values (List[str]): Valeurs brutes converties en texte
+            
+        Returns:
+            Tuple: Numéros nettoyés et type d'erreur par ligne (COLUMN_*, int8)
+        """
+        import numpy as np
+        import pandas as pd
         
-        # Statistiques
-        duplicate_count = len([v for v in valid_results if v.get('is_duplicate')])
+        count = len(values)
+        
+        # Nettoyage (équivalent de clean_vat_number) en une passe sur la colonne
+        # concaténée ; repli ligne à ligne si une valeur contient un saut de ligne
+        buffer = '\n'.join(values)
+        if buffer.count('\n') == count - 1:
+            cleaned = cls._COLUMN_CLEAN_RE.sub('', buffer).upper().split('\n')
+        else:
+            cleaned = [cls.clean_vat_number(value) for value in values]
+        length = np.fromiter(map(len, cleaned), dtype=np.int64, count=count)
+        
+        # Préfixe pays (équivalent de extract_country_and_number)
+        prefix = pd.Series([value[:2] for value in cleaned], dtype=object)
+        rest = [value[2:] for value in cleaned]
+        
+        empty = length == 0
+        too_short = ~empty & (length < 3)
+        too_long = length > 15
+        no_country = ~(empty | too_short | too_long) & ~prefix.isin(list(cls.VAT_PATTERNS)).to_numpy()
+        has_country = ~(empty | too_short | too_long | no_country)
+        
+        # Formats testés par pays, sur la colonne du pays concaténée : en mode
+        # multiligne, le motif (ancré ^...$) placé en assertion négative ne
+        # s'arrête qu'aux débuts des lignes non conformes, retrouvées par offset
+        format_ok = has_country.copy()
+        candidates = np.flatnonzero(has_country)
+        for country_code, positions in pd.Series(candidates).groupby(prefix.to_numpy()[candidates]).indices.items():
+            rows = candidates[positions]
+            starts = np.zeros(len(rows), dtype=np.int64)
+            np.cumsum(length[rows][:-1] - 1, out=starts[1:])  # numéro (longueur - 2) + saut de ligne
+            
+            column = '\n'.join([rest[i] for i in rows.tolist()])
+            mismatch = re.compile(f'^(?!(?:{cls.VAT_PATTERNS[country_code]}))', re.MULTILINE)
+            rejected = np.fromiter((m.start() for m in mismatch.finditer(column)), dtype=np.int64)
+            format_ok[rows[np.searchsorted(starts, rejected)]] = False
+        
+        error_kind = np.select(
+            [empty, too_short, too_long, no_country, has_country & ~format_ok],
+            [cls.COLUMN_EMPTY, cls.COLUMN_TOO_SHORT, cls.COLUMN_TOO_LONG, cls.COLUMN_NO_COUNTRY, cls.COLUMN_BAD_FORMAT],
+            default=cls.COLUMN_OK
+        ).astype(np.int8)
+        
+        return cleaned, error_kind
+    
+    @classmethod
+    def _find_column_duplicates(cls, cleaned: List[str], is_valid: 'np.ndarray') -> 'np.ndarray':
+        """
+        Doublons parmi les numéros valides (hachage, première occurrence conservée)
+        
+        Returns:
+            np.ndarray: Index de la première occurrence pour chaque doublon, -1 sinon
+        """
+        import numpy as np
+        import pandas as pd
+        
+        # factorize attribue les codes dans l'ordre de première apparition
+        valid_rows = np.flatnonzero(is_valid)
+        codes, _ = pd.factorize(np.array(cleaned, dtype=object)[valid_rows])
+        _, first_positions = np.unique(codes, return_index=True)
+        first_rows = valid_rows[first_positions[codes]]
+        
+        duplicate_of = np.full(len(cleaned), -1, dtype=np.int64)
+        duplicated = first_rows != valid_rows
+        duplicate_of[valid_rows[duplicated]] = first_rows[duplicated]
+        
+        return duplicate_of
+    
+    @classmethod
+    def _build_column_results(cls, vat_list: List[str], cleaned: List[str], error_kind: 'np.ndarray',
+                              duplicate_of: 'np.ndarray') -> Dict[str, any]:
+        """
+        Reconstruit les résultats par ligne à partir des colonnes calculées
+        
+        Args:
+            vat_list (List[str]): Valeurs d'origine
+            cleaned (List[str]): Numéros nettoyés
+            error_kind (np.ndarray): Type d'erreur par ligne (COLUMN_*)
+            duplicate_of (np.ndarray): Index de la première occurrence (-1 si non doublon)
+            
+        Returns:
+            Dict: Résultats au format de validate_vat_list
+        """
+        import numpy as np
+        
+        count = len(vat_list)
+        is_valid = error_kind == cls.COLUMN_OK
+        has_country = is_valid | (error_kind == cls.COLUMN_BAD_FORMAT)
+        is_duplicate = duplicate_of >= 0
+        
+        messages = {
+            cls.COLUMN_OK: None,
+            cls.COLUMN_EMPTY: 'Numéro vide ou invalide',
+            cls.COLUMN_TOO_SHORT: 'Numéro trop court (minimum 3 caractères)',
+            cls.COLUMN_TOO_LONG: 'Numéro trop long (maximum 15 caractères)',
+            cls.COLUMN_NO_COUNTRY: 'Code pays manquant ou invalide (doit commencer par 2 lettres)',
+        }
+        format_errors = {
+            country_code: f"Format invalide pour {cls.COUNTRY_NAMES.get(country_code, country_code)} (attendu: {pattern})"
+            for country_code, pattern in cls.VAT_PATTERNS.items()
+        }
+        
+        country_codes = [value[:2] if ok else None for value, ok in zip(cleaned, has_country.tolist())]
+        error = [messages[kind] if kind != cls.COLUMN_BAD_FORMAT else format_errors[code]
+                 for kind, code in zip(error_kind.tolist(), country_codes)]
+        
+        duplicate_rows = np.flatnonzero(is_duplicate).tolist()
+        for i in duplicate_rows:
+            error[i] = f"Doublon de la ligne {duplicate_of[i] + 1}"
+        
+        results = [
+            {
+                'original': vat_input,
+                'cleaned': clean,
+                'country_code': code,
+                'vat_number': clean[2:] if code else None,
+                'is_valid': valid,
+                'line_number': line_number,
+                'error': message,
+                'country_name': cls.COUNTRY_NAMES.get(code, code) if code else None,
+                'is_duplicate': duplicate
+            }
+            for vat_input, clean, code, valid, line_number, message, duplicate in zip(
+                vat_list, cleaned, country_codes, is_valid.tolist(), range(1, count + 1),
+                error, is_duplicate.tolist())
+        ]
+        for i in duplicate_rows:
+            results[i]['duplicate_of_line'] = int(duplicate_of[i]) + 1
+        
+        valid_results = [results[i] for i in np.flatnonzero(is_valid).tolist()]
+        invalid_results = [results[i] for i in np.flatnonzero(~is_valid).tolist()]
+        
+        duplicate_count = len(duplicate_rows)
+        countries = Counter(code for code, keep in zip(country_codes, (is_valid & ~is_duplicate).tolist()) if keep)
         
         summary = {
-            'total_count': len(vat_list),
+            'total_count': count,
             'valid_count': len(valid_results) - duplicate_count,  # Valides non-doublons
             'invalid_count': len(invalid_results),
             'duplicate_count': duplicate_count,
@@ -260,7 +478,7 @@ class VATService:
         return {
             'valid': valid_results,
             'invalid': invalid_results,
-            'duplicates': [v for v in valid_results if v.get('is_duplicate')],
+            'duplicates': [v for v in valid_results if v['is_duplicate']],
             'summary': summary
         }
     
@@ -427,51 +645,154 @@ RÉPARTITION PAR PAYS:
         from datetime import datetime
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
+    @classmethod
+    def _mixed_content_pattern(cls) -> re.Pattern:
+        """
+        Expression unique d'extraction en texte libre, construite depuis VAT_PATTERNS
+        
+        Une alternative par pays (regroupées par première lettre du code) :
+        l'expression commence par un littéral, ce qui permet au moteur de
+        sauter rapidement les positions sans intérêt, et la frontière gauche
+        est vérifiée juste après le code pays. Chaque caractère du numéro peut
+        être précédé d'un séparateur ("FR 40 303 265 045", "BE0123.456.789").
+        Un numéro suivi d'un autre groupe de chiffres ("DE 123 456 789 00")
+        est ambigu et n'est pas retenu ; seuls les chiffres ASCII comptent.
+        """
+        if cls._mixed_content_re is not None:
+            return cls._mixed_content_re
+        
+        separators = f'[{re.escape(cls._MIXED_SEPARATORS)}]'
+        separator = f'{separators}?'
+        by_letter = {}
+        
+        for country_code, pattern in cls.VAT_PATTERNS.items():
+            alternatives = []
+            for alternative in pattern.split('|'):
+                alternative = alternative.strip('^$')
+                atoms = cls._PATTERN_ATOM_RE.findall(alternative)
+                if ''.join(atom + quantifier for atom, quantifier in atoms) != alternative:
+                    raise ValueError(f"Motif {country_code} non pris en charge pour l'extraction: {pattern}")
+                alternatives.append(''.join(f'(?:{separator}{atom}){quantifier}' for atom, quantifier in atoms))
+            
+            # Frontière gauche : ni lettre ni chiffre avant le code pays
+            by_letter.setdefault(country_code[0], []).append(
+                f"{country_code[1]}(?<![A-Za-z0-9]..)(?:{'|'.join(alternatives)})"
+            )
+        
+        countries = '|'.join(f"{letter}(?:{'|'.join(branches)})" for letter, branches in by_letter.items())
+        
+        # Frontière droite : ni lettre ni chiffre, ni lettre après un point ou un tiret,
+        # ni chiffre après un séparateur (le numéro se poursuivrait)
+        cls._mixed_content_re = re.compile(
+            f'(?:{countries})(?![A-Za-z0-9])(?![.\\-][A-Za-z])(?!{separators}[0-9])',
+            re.ASCII
+        )
+        return cls._mixed_content_re
+    
     @classmethod
     def extract_vat_from_mixed_content(cls, content: str) -> List[str]:
         """
         Extrait les numéros de TVA d'un contenu mixte (texte libre)
         
+        Un seul parcours linéaire du texte ; seuls les numéros au format de
+        leur pays sont retenus (codes pays en majuscules : "de 123456789"
+        dans une phrase n'est pas un numéro allemand).
+        
         Args:
             content (str): Contenu textuel pouvant contenir des numéros de TVA
             
         Returns:
-            List[str]: Liste des numéros de TVA détectés
+            List[str]: Numéros de TVA détectés, nettoyés, dans l'ordre du texte
         """
         if not content:
             return []
         
-        # Pattern pour détecter les numéros de TVA dans du texte libre
-        # Cherche: 2 lettres + 8-12 chiffres/lettres
-        vat_pattern = r'\b([A-Z]{2})[\s\-\.]?([A-Z0-9]{8,12})\b'
+        return [match.group(0).translate(cls._SEPARATOR_TABLE)
+                for match in cls._mixed_content_pattern().finditer(content)]
+    
+    @classmethod
+    def iter_vat_in_stream(cls, chunks: Iterable[str]) -> Iterator[str]:
+        """
+        Extrait les numéros de TVA d'un texte lu par morceaux (gros fichiers,
+        texte extrait page à page d'un PDF)
         
-        matches = re.findall(vat_pattern, content.upper())
-        vat_numbers = []
+        Seule la fin du morceau précédent est conservée, pour les numéros à
+        cheval sur deux morceaux : mémoire bornée, mêmes résultats
+        qu'extract_vat_from_mixed_content sur le texte complet.
         
-        for country, number in matches:
-            # Vérification basique que c'est un pays EU
-            if country in cls.VAT_PATTERNS:
-                vat_numbers.append(f"{country}{number}")
+        Args:
+            chunks (Iterable[str]): Morceaux successifs du texte
+            
+        Yields:
+            str: Numéros de TVA détectés, nettoyés, dans l'ordre du texte
+        """
+        pattern = cls._mixed_content_pattern()
+        buffer = ''
+        position = 0
         
-        return vat_numbers
+        for chunk in chunks:
+            buffer += chunk
+            
+            # Un numéro qui commence avant la limite est entièrement lisible dans le tampon
+            limit = len(buffer) - cls._MIXED_CONTENT_OVERLAP
+            if limit <= position:
+                continue
+            
+            for match in pattern.finditer(buffer, position):
+                if match.start() >= limit:
+                    break
+                yield match.group(0).translate(cls._SEPARATOR_TABLE)
+                position = match.end()
+            
+            # Un caractère de plus est conservé pour la frontière gauche
+            position = max(position, limit)
+            buffer = buffer[position - 1:]
+            position = 1
+        
+        for match in pattern.finditer(buffer, position):
+            yield match.group(0).translate(cls._SEPARATOR_TABLE)
     
     @classmethod
-    def suggest_corrections(cls, invalid_vat: str) -> List[str]:
+    def find_corrections(cls, invalid_vat: str, cache=None, limit: int = 3) -> List[Dict]:
+        """
+        Numéros corrigés vraisemblables (faute de saisie) au format et à la clé valides
+        
+        Args:
+            invalid_vat (str): Numéro de TVA invalide
+            cache (VerificationCache): Cache local des verdicts VIES (optionnel)
+            limit (int): Nombre maximal de corrections
+            
+        Returns:
+            List[Dict]: Corrections {vat, kind, label, checksum, confirmed}, les plus vraisemblables d'abord
+        """
+        from app.services.vat_correction import find_corrections
+        
+        return find_corrections(cls.clean_vat_number(invalid_vat), cache=cache, limit=limit)
+    
+    @classmethod
+    def suggest_corrections(cls, invalid_vat: str, cache=None) -> List[str]:
         """
         Suggère des corrections pour un numéro de TVA invalide
         
         Args:
             invalid_vat (str): Numéro de TVA invalide
+            cache (VerificationCache): Cache local des verdicts VIES (optionnel)
             
         Returns:
             List[str]: Liste de suggestions de correction
         """
+        from app.services.vat_correction import get_format_index
+        
         suggestions = []
         cleaned = cls.clean_vat_number(invalid_vat)
         
         if not cleaned:
             return ["Saisir un numéro de TVA non vide"]
         
+        # Numéros corrigés (chiffres inversés, manquants, O/0...)
+        for correction in cls.find_corrections(cleaned, cache=cache):
+            suggestions.append(f"Vouliez-vous dire {correction['vat']} ? ({correction['label']})")
+        
         # Si pas de code pays
         if len(cleaned) < 2 or not cleaned[:2].isalpha():
             suggestions.append("Ajouter le code pays au début (ex: FR, DE, IT, ES...)")
@@ -489,20 +810,146 @@ RÉPARTITION PAR PAYS:
         
         # Vérification de la longueur selon le pays
         if country_code in cls.VAT_PATTERNS:
-            pattern = cls.VAT_PATTERNS[country_code]
-            
-            # Analyse du pattern pour suggérer la longueur attendue
-            if 'FR' == country_code:
-                if len(vat_number) != 11:
-                    suggestions.append("Numéro français: 11 chiffres attendus après FR")
-            elif 'DE' == country_code:
-                if len(vat_number) != 9:
-                    suggestions.append("Numéro allemand: 9 chiffres attendus après DE")
-            elif 'IT' == country_code:
-                if len(vat_number) != 11:
-                    suggestions.append("Numéro italien: 11 chiffres attendus après IT")
+            lengths = sorted(get_format_index().lengths[country_code])
+            if len(vat_number) not in lengths:
+                if len(lengths) == 1:
+                    expected = str(lengths[0])
+                elif lengths == list(range(lengths[0], lengths[-1] + 1)):
+                    expected = f"{lengths[0]} à {lengths[-1]}"
+                else:
+                    expected = ' ou '.join(str(length) for length in lengths)
+                suggestions.append(f"{cls.get_country_name(country_code)}: "
+                                   f"{expected} caractères attendus après {country_code}")
         
         if not suggestions:
             suggestions.append("Vérifier le format selon le pays d'origine")
         
-        return suggestions
\ No newline at end of file
+        return suggestions
+
+class VATListValidator:
+    """
+    Validation incrémentale d'une liste de numéros de TVA
+    
+    Produit les mêmes résultats que VATService.validate_vat_list, mais
+    accepte les numéros un par un (fichiers lus en flux) et expose les
+    compteurs en cours de route.
+    """
+    
+    def __init__(self, keep_results: bool = True):
+        """
+        Args:
+            keep_results (bool): Conserver les résultats (False : seuls les
+                compteurs et les numéros déjà vus sont gardés, pour les flux
+                dont les résultats sont écrits au fil de l'eau)
+        """
+        self.keep_results = keep_results
+        self.valid_results = []
+        self.invalid_results = []
+        self.seen_numbers = {}  # Pour détecter les doublons
+        self.countries = Counter()
+        self.total_count = 0
+        self.invalid_count = 0
+        self.duplicate_count = 0
+    
+    def add(self, vat_input: str) -> Dict[str, any]:
+        """
+        Valide le numéro suivant de la liste
+        
+        Args:
+            vat_input (str): Numéro de TVA brut
+            
+        Returns:
+            Dict: Résultat de validation (avec détection des doublons)
+        """
+        self.total_count += 1
+        line_number = self.total_count
+        
+        # Validation individuelle
+        validation_result = VATService.validate_single_vat(vat_input, line_number)
+        
+        # Détection des doublons
+        if validation_result['is_valid']:
+            full_vat = f"{validation_result['country_code']}{validation_result['vat_number']}"
+            
+            if full_vat in self.seen_numbers:
+                # Marquer comme doublon
+                validation_result['is_duplicate'] = True
+                validation_result['duplicate_of_line'] = self.seen_numbers[full_vat]
+                validation_result['error'] = f"Doublon de la ligne {self.seen_numbers[full_vat]}"
+                self.duplicate_count += 1
+            else:
+                self.seen_numbers[full_vat] = line_number
+                validation_result['is_duplicate'] = False
+                
+                # Comptage par pays (seulement pour les non-doublons)
+                self.countries[validation_result['country_code']] += 1
+            
+            if self.keep_results:
+                self.valid_results.append(validation_result)
+        else:
+            validation_result['is_duplicate'] = False
+            self.invalid_count += 1
+            if self.keep_results:
+                self.invalid_results.append(validation_result)
+        
+        return validation_result
+    
+    def extend(self, vat_inputs: List[str]) -> List[Dict[str, any]]:
+        """
+        Valide un bloc de numéros par colonne (VATService.validate_vat_column)
+        
+        Numéros de ligne et doublons sont recalés sur les blocs précédents :
+        le résultat est le même qu'avec add() appelé ligne à ligne.
+        
+        Args:
+            vat_inputs (List[str]): Numéros bruts suivants de la liste
+            
+        Returns:
+            List[Dict]: Résultats du bloc, dans l'ordre des lignes
+        """
+        chunk = VATService.validate_vat_column(vat_inputs)
+        offset = self.total_count
+        self.total_count += len(vat_inputs)
+        
+        for validation_result in chunk['invalid']:
+            validation_result['line_number'] += offset
+        
+        for validation_result in chunk['valid']:
+            validation_result['line_number'] += offset
+            full_vat = f"{validation_result['country_code']}{validation_result['vat_number']}"
+            
+            if validation_result['is_duplicate'] or full_vat in self.seen_numbers:
+                # Doublon dans le bloc ou d'un bloc précédent : renvoi vers la première occurrence
+                validation_result['is_duplicate'] = True
+                validation_result['duplicate_of_line'] = self.seen_numbers[full_vat]
+                validation_result['error'] = f"Doublon de la ligne {self.seen_numbers[full_vat]}"
+                self.duplicate_count += 1
+            else:
+                self.seen_numbers[full_vat] = validation_result['line_number']
+                self.countries[validation_result['country_code']] += 1
+        
+        self.invalid_count += len(chunk['invalid'])
+        if self.keep_results:
+            self.valid_results.extend(chunk['valid'])
+            self.invalid_results.extend(chunk['invalid'])
+        
+        return list(heapq.merge(chunk['valid'], chunk['invalid'], key=itemgetter('line_number')))
+    
+    def summary(self) -> Dict[str, any]:
+        """Statistiques des numéros validés jusqu'ici"""
+        return {
+            'total_count': self.total_count,
+            'valid_count': len(self.seen_numbers),  # Valides non-doublons
+            'invalid_count': self.invalid_count,
+            'duplicate_count': self.duplicate_count,
+            'countries': dict(self.countries)
+        }
+    
+    def results(self) -> Dict[str, any]:
+        """Résultats complets, au format de VATService.validate_vat_list"""
+        return {
+            'valid': self.valid_results,
+            'invalid': self.invalid_results,
+            'duplicates': [v for v in self.valid_results if v.get('is_duplicate')],
+            'summary': self.summary()
+        }
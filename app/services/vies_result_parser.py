@@ -0,0 +1,150 @@
+"""
+Service d'analyse des résultats VIES
+Extraction structurée du résultat en un seul appel de script dans la page
+"""
+import re
+from typing import Dict, List, Optional
+
+
+class VIESResultParser:
+    """Service pour l'extraction et l'interprétation des résultats VIES"""
+
+    # Script exécuté dans la page : un seul aller-retour WebDriver.
+    # Il collecte le statut et toutes les paires libellé/valeur affichées
+    # (tableaux th/td ou td/td, listes dl/dt/dd, blocs "libellé : valeur").
+    EXTRACTION_SCRIPT = r"""
+    const clean = (t) => (t || '').replace(/\s+/g, ' ').trim();
+    const out = {status: 'unknown', status_text: null, fields: [], error_text: null};
+
+    const validEl = document.querySelector('.validStyle, .vat-valid, [class*="valid-result"]');
+    const invalidEl = document.querySelector('.invalidStyle, .vat-invalid, [class*="invalid-result"]');
+    const body = clean(document.body ? document.body.innerText : '');
+
+    if (invalidEl || /no,\s*invalid vat number/i.test(body)) {
+        out.status = 'invalid';
+        out.status_text = clean((invalidEl || {}).innerText);
+    } else if (validEl || /yes,\s*valid vat number/i.test(body)) {
+        out.status = 'valid';
+        out.status_text = clean((validEl || {}).innerText);
+    }
+
+    document.querySelectorAll('tr').forEach((row) => {
+        const cells = row.querySelectorAll('th, td');
+        if (cells.length >= 2) {
+            out.fields.push([clean(cells[0].innerText), clean(cells[cells.length - 1].innerText)]);
+        }
+    });
+    document.querySelectorAll('dt').forEach((dt) => {
+        const dd = dt.nextElementSibling;
+        if (dd && dd.tagName === 'DD') {
+            out.fields.push([clean(dt.innerText), clean(dd.innerText)]);
+        }
+    });
+    document.querySelectorAll('label, .label, strong').forEach((label) => {
+        const value = label.nextElementSibling;
+        if (value && !['INPUT', 'SELECT', 'TEXTAREA'].includes(value.tagName)) {
+            out.fields.push([clean(label.innerText), clean(value.innerText)]);
+        }
+    });
+
+    const errorEl = document.querySelector('.errorStyle, .alert-danger, .error, [role="alert"]');
+    if (errorEl) {
+        out.error_text = clean(errorEl.innerText);
+    }
+    out.body_excerpt = body.slice(0, 2000);
+    return out;
+    """
+
+    # Libellés rencontrés selon la langue et la mise en page de chaque État membre
+    FIELD_LABELS = {
+        'name': ['name', 'trader name', 'nom', 'name des unternehmens', 'denominazione', 'nombre'],
+        'address': ['address', 'trader address', 'adresse', 'anschrift', 'indirizzo', 'dirección'],
+        'request_identifier': ['consultation number', 'request identifier', 'numéro de consultation',
+                               'abfragenummer', 'numero di consultazione'],
+        'request_date': ['date when request received', 'date of request', 'date de la demande',
+                         "date de réception de la demande", 'datum der anfrage'],
+    }
+
+    # Valeurs signifiant "non communiqué" (DE, ES... ne publient pas nom/adresse)
+    EMPTY_VALUES = {'', '---', '--', '-', 'n/a', 'name not available', 'address not available'}
+
+    # Codes d'erreur VIES reconnus dans le texte de la page
+    VIES_ERROR_CODES = [
+        'MS_MAX_CONCURRENT_REQ', 'GLOBAL_MAX_CONCURRENT_REQ', 'MS_UNAVAILABLE',
+        'SERVICE_UNAVAILABLE', 'TIMEOUT', 'INVALID_INPUT', 'INVALID_REQUESTER_INFO'
+    ]
+
+    _error_code_re = re.compile(r'\b(' + '|'.join(VIES_ERROR_CODES) + r')\b')
+
+    @classmethod
+    def parse(cls, raw: Optional[Dict]) -> Dict:
+        """
+        Interprète l'objet renvoyé par EXTRACTION_SCRIPT
+
+        Args:
+            raw (Dict): Résultat brut de l'exécution du script
+
+        Returns:
+            Dict: {is_valid, status, company_name, company_address,
+                   request_identifier, request_date, vies_error_code, error}
+        """
+        result = {
+            'is_valid': False,
+            'status': 'unknown',
+            'company_name': None,
+            'company_address': None,
+            'request_identifier': None,
+            'request_date': None,
+            'vies_error_code': None,
+            'error': None
+        }
+
+        if not raw:
+            result['error'] = 'Résultat VIES vide'
+            return result
+
+        result['status'] = raw.get('status') or 'unknown'
+        fields = cls._index_fields(raw.get('fields') or [])
+
+        for key in ('name', 'address', 'request_identifier', 'request_date'):
+            value = cls._lookup(fields, cls.FIELD_LABELS[key])
+            target = f'company_{key}' if key in ('name', 'address') else key
+            result[target] = value
+
+        if result['status'] == 'valid':
+            result['is_valid'] = True
+        elif result['status'] == 'unknown':
+            text = ' '.join(filter(None, [raw.get('error_text'), raw.get('body_excerpt')]))
+            match = cls._error_code_re.search(text.upper())
+            result['vies_error_code'] = match.group(1) if match else None
+            result['error'] = 'Résultat VIES ambigu ou service indisponible'
+
+        return result
+
+    @classmethod
+    def _index_fields(cls, pairs: List) -> Dict[str, str]:
+        """Indexe les paires libellé/valeur par libellé normalisé (première occurrence)"""
+        indexed = {}
+
+        for pair in pairs:
+            if not pair or len(pair) < 2:
+                continue
+            label = cls._normalize_label(pair[0])
+            if label and label not in indexed:
+                indexed[label] = (pair[1] or '').strip()
+
+        return indexed
+
+    @classmethod
+    def _lookup(cls, fields: Dict[str, str], labels: List[str]) -> Optional[str]:
+        """Recherche la première valeur renseignée parmi les libellés candidats"""
+        for label in labels:
+            value = fields.get(label)
+            if value is not None and value.lower() not in cls.EMPTY_VALUES:
+                return value
+        return None
+
+    @staticmethod
+    def _normalize_label(label: str) -> str:
+        """Normalise un libellé ('Name :' -> 'name')"""
+        return re.sub(r'\s+', ' ', (label or '').strip().rstrip(':').strip()).lower()
@@ -8,6 +8,8 @@ const VATProof = {
     config: {
         apiBaseUrl: '/api',
         pollInterval: 5000, // 5 secondes
+        parseStartTimeout: 30000, // Analyse d'un import non démarrée (aucun worker uploads)
+        parseStallTimeout: 120000, // Analyse d'un import sans progression
         maxFileSize: 16 * 1024 * 1024, // 16 MB
         allowedExtensions: ['.csv', '.xlsx', '.xls', '.txt']
     },
@@ -96,6 +98,15 @@ const Utils = {
         }
     },
     
+    /**
+     * Échappe un texte issu d'un fichier client avant insertion dans le HTML
+     */
+    escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = text == null ? '' : String(text);
+        return div.innerHTML;
+    },
+    
     /**
      * Effectue un appel API
      */
@@ -155,7 +166,13 @@ const FileManager = {
                 body: formData
             });
             
-            const data = await response.json();
+            let data = await response.json();
+            
+            // Analyse en tâche de fond : suivi jusqu'à la fin, aperçu affiché dès qu'il arrive
+            if (response.status === 202 && data.status_url) {
+                data = await this.waitForParsing(data.status_url);
+            }
+            
             Utils.hideLoading();
             
             if (data.error) {
@@ -179,6 +196,51 @@ const FileManager = {
         }
     },
     
+    /**
+     * Suit l'analyse d'un fichier jusqu'à son terme (abandon si elle ne
+     * démarre pas ou ne progresse plus)
+     */
+    async waitForParsing(statusUrl) {
+        let rowsRead = 0;
+        let lastProgressAt = Date.now();
+        
+        while (true) {
+            const response = await fetch(statusUrl);
+            const data = await response.json();
+            
+            if (!response.ok || data.status === 'failed') {
+                return { error: data.error || 'Erreur lors de l\'analyse du fichier' };
+            }
+            
+            if (data.status === 'parsed') {
+                return data;
+            }
+            
+            const currentRows = data.progress ? data.progress.rows_read : 0;
+            if (currentRows > rowsRead) {
+                rowsRead = currentRows;
+                lastProgressAt = Date.now();
+            }
+            
+            const waited = Date.now() - lastProgressAt;
+            if (rowsRead === 0 && waited > VATProof.config.parseStartTimeout) {
+                return { error: 'L\'analyse du fichier n\'a pas démarré, veuillez réessayer dans quelques instants' };
+            }
+            if (waited > VATProof.config.parseStallTimeout) {
+                return { error: 'L\'analyse du fichier ne progresse plus, veuillez réessayer' };
+            }
+            
+            if (data.preview && data.preview.length > 0) {
+                Utils.hideLoading();
+                PreviewManager.showPreview(data);
+            } else if (data.progress) {
+                Utils.showLoading(`Analyse du fichier en cours... ${data.progress.rows_read} lignes lues`);
+            }
+            
+            await new Promise(resolve => setTimeout(resolve, 500));
+        }
+    },
+    
     /**
      * Traite le texte collé
      */
@@ -234,7 +296,8 @@ const PreviewManager = {
         }
         
         // Mise à jour du compteur
-        validCount.textContent = data.lines_count || 0;
+        const totalCount = data.stats ? data.stats.total_count : (data.lines_count || 0);
+        validCount.textContent = totalCount;
         
         // Génération du tableau de prévisualisation
         let html = '<div class="table-responsive">';
@@ -245,16 +308,23 @@ const PreviewManager = {
         
         if (data.preview && data.preview.length > 0) {
             data.preview.forEach((line, index) => {
-                // Extraction du code pays (2 premières lettres)
-                const countryCode = line.substring(0, 2).toUpperCase();
-                const vatNumber = line.substring(2);
-                
+                // Lignes détaillées de l'API (objets) ou simples chaînes
+                const value = typeof line === 'string' ? line : (line.cleaned || line.original);
+                const countryCode = typeof line === 'string' ? line.substring(0, 2).toUpperCase() : (line.country_code || '?');
+                const lineNumber = typeof line === 'string' ? index + 1 : line.line_number;
+                const statusBadge = typeof line === 'string' || !line.status_class
+                    ? '<span class="badge bg-secondary">À vérifier</span>'
+                    : `<span class="badge bg-${line.status_class}">${Utils.escapeHtml(line.error || (line.recently_invalid ? 'Récemment déclaré invalide par VIES' : 'Format valide'))}</span>`;
+                const suggestions = line.suggestions && line.suggestions.length > 0
+                    ? `<div class="small text-muted mt-1">Vouliez-vous dire : ${line.suggestions.map(s => `<code>${Utils.escapeHtml(s)}</code>`).join(', ')} ?</div>`
+                    : '';
+
                 html += `
                     <tr>
-                        <td>${index + 1}</td>
-                        <td><code>${line}</code></td>
-                        <td><span class="badge bg-info">${countryCode}</span></td>
-                        <td><span class="badge bg-secondary">À vérifier</span></td>
+                        <td>${lineNumber}</td>
+                        <td><code>${Utils.escapeHtml(value)}</code></td>
+                        <td><span class="badge bg-info">${Utils.escapeHtml(countryCode)}</span></td>
+                        <td>${statusBadge}${suggestions}</td>
                     </tr>
                 `;
             });
@@ -263,10 +333,10 @@ const PreviewManager = {
         html += '</tbody></table></div>';
         
         // Affichage du nombre total si supérieur à l'aperçu
-        if (data.lines_count > 5) {
+        if (totalCount > 5) {
             html += `<p class="text-muted small mt-2">
                 <i class="bi bi-info-circle me-1"></i>
-                Aperçu des 5 premiers numéros sur ${data.lines_count} au total
+                Aperçu des premiers numéros sur ${totalCount} ${data.status === 'parsing' ? 'lus jusqu\'ici' : 'au total'}
             </p>`;
         }
         
@@ -0,0 +1,230 @@
+"""
+Tâches Celery d'analyse des fichiers importés
+Lit le fichier en flux, valide les numéros et publie la progression
+et l'aperçu dans Redis au fil de l'eau
+"""
+import os
+import time
+import logging
+from typing import Dict, Optional
+
+from config import Config
+from app.services.chunked_upload import ChunkedUploadService
+from app.services.batch_staging import BatchStagingService
+from app.services.file_service import FileService
+from app.services.vat_service import VATService, VATListValidator
+from app.services.result_cache import VerificationCache
+from app.services.vat_correction import add_suggestions
+from app.services import metrics
+from app.tasks.vies_verification import celery, get_invalid_filter
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+# Intervalle minimal entre deux publications de la progression (secondes)
+PROGRESS_INTERVAL = 0.5
+
+_upload_service = None
+
+def get_upload_service() -> ChunkedUploadService:
+    """Sessions d'upload (une instance par processus worker)"""
+    global _upload_service
+
+    if _upload_service is None:
+        _upload_service = ChunkedUploadService(
+            Config.UPLOAD_FOLDER,
+            Config.REDIS_URL,
+            chunk_size=Config.UPLOAD_CHUNK_SIZE,
+            max_size=Config.UPLOAD_MAX_SIZE,
+            ttl=Config.UPLOAD_SESSION_TTL
+        )
+
+    return _upload_service
+
+_verification_cache = None
+
+def get_verification_cache() -> Optional[VerificationCache]:
+    """Cache local des verdicts VIES pour les corrections suggérées (None si non configuré)"""
+    global _verification_cache
+
+    if _verification_cache is None and Config.VERIFICATION_CACHE_PATH:
+        _verification_cache = VerificationCache(Config.VERIFICATION_CACHE_PATH)
+
+    return _verification_cache
+
+# Lignes d'aperçu conservées par catégorie (comme _format_preview_data)
+PREVIEW_ROWS = 5
+
+# Lignes validées par bloc (validation par colonne) ; le premier bloc est
+# court pour que l'aperçu soit publié sans attendre
+FIRST_CHUNK_ROWS = 1000
+CHUNK_ROWS = 20000
+
+# Champs d'un résultat de validation repris dans l'aperçu
+_PREVIEW_FIELDS = ('line_number', 'original', 'cleaned', 'country_code', 'is_valid', 'is_duplicate', 'error',
+                   'suggestions', 'recently_invalid')
+
+def _build_preview(validator: VATListValidator) -> Dict:
+    """Premières lignes valides et invalides, au format attendu par _format_preview_data"""
+    return {
+        category: [{field: result.get(field) for field in _PREVIEW_FIELDS} for result in results[:PREVIEW_ROWS]]
+        for category, results in (('valid', validator.valid_results), ('invalid', validator.invalid_results))
+    }
+
+def _validate_chunk(validator: VATListValidator, vat_inputs: list):
+    """
+    Valide un bloc, joint les corrections suggérées à ses lignes invalides et
+    signale les numéros récemment confirmés invalides par VIES
+    """
+    results = validator.extend(vat_inputs)
+
+    invalid_filter = get_invalid_filter()
+    if invalid_filter:
+        VATService.flag_recently_invalid(results, invalid_filter)
+
+    if Config.VAT_CORRECTION_SUGGESTIONS:
+        add_suggestions([result for result in results if not result['is_valid']], cache=get_verification_cache())
+
+def _publish_progress(uploads: ChunkedUploadService, upload_id: str, validator: VATListValidator,
+                      bytes_read, **fields):
+    """Compteurs et aperçu de l'analyse en cours, lus par GET /api/uploads/<id>"""
+    summary = validator.summary()
+    uploads.update_progress(
+        upload_id,
+        rows_read=summary['total_count'],
+        bytes_read=bytes_read,
+        valid_count=summary['valid_count'],
+        invalid_count=summary['invalid_count'],
+        duplicate_count=summary['duplicate_count'],
+        countries=summary['countries'],
+        **fields
+    )
+
+@celery.task(ignore_result=True)
+def parse_uploaded_file(upload_id: str) -> Dict:
+    """
+    Analyse un fichier importé (d'un bloc ou par morceaux) et prépare son batch
+
+    Args:
+        upload_id (str): ID de la session d'upload
+
+    Returns:
+        Dict: Statut final de l'analyse
+    """
+    from app import db
+    from app.models.user import VerificationBatch, SystemLog
+
+    uploads = get_upload_service()
+    session = uploads.get(upload_id)
+    if session is None:
+        logger.warning(f"Upload {upload_id} expiré avant analyse")
+        return {'upload_id': upload_id, 'status': 'expired'}
+
+    if not os.path.exists(session['path']):
+        # Fichier reçu par le serveur web mais absent ici : UPLOAD_FOLDER n'est pas partagé
+        logger.error(f"Fichier de l'upload {upload_id} introuvable dans {uploads.upload_dir} : "
+                     f"UPLOAD_FOLDER doit être un stockage partagé entre le serveur web et les workers")
+        uploads.update_progress(upload_id, status=ChunkedUploadService.STATUS_FAILED,
+                                error='Fichier importé introuvable, veuillez le renvoyer')
+        return {'upload_id': upload_id, 'status': ChunkedUploadService.STATUS_FAILED}
+
+    validator = VATListValidator()
+    preview = None
+    pending = []
+    bytes_read = 0
+    source = session.get('source', 'chunked')
+    parse_start = time.monotonic()
+    last_publish = parse_start
+
+    try:
+        for vat_input, position in FileService.iter_file_values(session['path'], session['extension']):
+            pending.append(vat_input)
+            bytes_read = position if position is not None else bytes_read
+
+            if len(pending) < (CHUNK_ROWS if validator.total_count else FIRST_CHUNK_ROWS):
+                continue
+
+            _validate_chunk(validator, pending)
+            pending = []
+
+            # Aperçu publié dès qu'il change (premiers blocs), compteurs à intervalle régulier
+            current_preview = _build_preview(validator)
+            if current_preview != preview or time.monotonic() - last_publish >= PROGRESS_INTERVAL:
+                _publish_progress(uploads, upload_id, validator, bytes_read,
+                                  preview=current_preview if current_preview != preview else None)
+                preview = current_preview
+                last_publish = time.monotonic()
+
+        if pending:
+            _validate_chunk(validator, pending)
+
+        validation_results = validator.results()
+        summary = validation_results['summary']
+        metrics.UPLOAD_PARSE_SECONDS.labels(source).observe(time.monotonic() - parse_start)
+        metrics.UPLOAD_ROWS.labels(source).inc(summary['total_count'])
+
+        if not summary['total_count']:
+            _publish_progress(uploads, upload_id, validator, session['total_size'],
+                              status=ChunkedUploadService.STATUS_FAILED,
+                              error='Aucun numéro de TVA trouvé dans le fichier')
+            return {'upload_id': upload_id, 'status': ChunkedUploadService.STATUS_FAILED}
+
+        # Création du batch et mise en attente des lignes validées
+        batch = VerificationBatch(
+            user_id=session['user_id'],
+            original_filename=session['filename'],
+            file_type=session['extension'],
+            total_jobs=summary['valid_count']
+        )
+        db.session.add(batch)
+        db.session.flush()
+
+        BatchStagingService(Config.REDIS_URL, ttl=Config.BATCH_STAGING_TTL).stage(
+            str(batch.id), VATService.prepare_for_vies_verification(validation_results)
+        )
+        db.session.commit()
+
+        _publish_progress(uploads, upload_id, validator, session['total_size'],
+                          status=ChunkedUploadService.STATUS_PARSED, batch_id=str(batch.id),
+                          preview=_build_preview(validator))
+
+        SystemLog.log_info('file_upload',
+                           f"Fichier {session['filename']} parsé: {summary['total_count']} numéros, "
+                           f"{summary['valid_count']} valides",
+                           user_id=session['user_id'])
+
+        return {'upload_id': upload_id, 'batch_id': str(batch.id), 'status': ChunkedUploadService.STATUS_PARSED}
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Erreur analyse upload {upload_id}: {e}")
+        _publish_progress(uploads, upload_id, validator, bytes_read,
+                          status=ChunkedUploadService.STATUS_FAILED,
+                          error='Erreur interne lors du traitement du fichier')
+        SystemLog.log_error('file_upload', f"Erreur analyse upload {upload_id}: {str(e)}",
+                            user_id=session['user_id'])
+        return {'upload_id': upload_id, 'status': ChunkedUploadService.STATUS_FAILED}
+
+    finally:
+        uploads.discard_file(session)
+
+@celery.task(ignore_result=True)
+def purge_stale_uploads() -> Dict:
+    """
+    Supprime les fichiers des uploads abandonnés (session expirée)
+
+    Returns:
+        Dict: Nombre de fichiers supprimés
+    """
+    purged = get_upload_service().purge_stale_files()
+
+    if purged:
+        logger.info(f"{purged} fichiers d'upload abandonnés supprimés")
+
+    return {'purged': purged}
+
+celery.conf.beat_schedule['purge-stale-uploads'] = {
+    'task': purge_stale_uploads.name,
+    'schedule': Config.UPLOAD_PURGE_INTERVAL,
+    'options': {'expires': Config.UPLOAD_PURGE_INTERVAL},
+}
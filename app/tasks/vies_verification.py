@@ -4,12 +4,18 @@ Utilise Selenium pour automatiser le site officiel VIES
 """
 import os
 import time
+import json
+import socket
+import uuid
 import random
 import tempfile
-from datetime import datetime
-from typing import Dict, Optional
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 
-from celery import Celery
+from celery import Celery, group
+from celery.signals import worker_init, worker_ready, worker_process_init
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
@@ -21,29 +27,198 @@ from selenium.webdriver.chrome.service import Service
 
 import logging
 
+from config import Config
+from app.services.pacing_service import AdaptivePacer
+from app.services.vies_result_parser import VIESResultParser
+from app.services.circuit_breaker import CountryCircuitBreaker
+from app.services.response_store import ResponseStore
+from app.services.job_storage import JobStorageService
+from app.services.fair_scheduler import FairShareScheduler
+from app.services.job_lease import LeaseHeartbeat
+from app.services.invalid_filter import InvalidVATFilter
+from app.services.metrics import observe_vies_timings, start_worker_metrics_server
+
 # Configuration du logger
 logger = logging.getLogger(__name__)
 
 # Instance Celery (sera configurée dans create_app)
 celery = Celery('vatproof')
 
+# Instant de démarrage du processus (mesure du temps de démarrage worker)
+_PROCESS_START = time.monotonic()
+
+# Binaires navigateur résolus une seule fois par processus (hérités par les forks)
+_driver_binaries: Dict = {}
+
+def resolve_driver_binaries(force: bool = False) -> Dict:
+    """
+    Résout les chemins du chromedriver et de Chrome une seule fois
+    
+    Les chemins épinglés dans la configuration sont prioritaires ;
+    webdriver-manager n'est utilisé qu'en l'absence de chemin et si
+    CHROMEDRIVER_AUTO_INSTALL est actif.
+    
+    Args:
+        force (bool): Ignorer le cache et résoudre à nouveau
+        
+    Returns:
+        Dict: {'driver_path': str, 'browser_path': Optional[str]}
+    """
+    if _driver_binaries and not force:
+        return _driver_binaries
+    
+    driver_path = Config.CHROMEDRIVER_PATH
+    if not driver_path:
+        if not Config.CHROMEDRIVER_AUTO_INSTALL:
+            raise RuntimeError("CHROMEDRIVER_PATH non défini et installation automatique désactivée")
+        driver_path = ChromeDriverManager().install()
+    
+    _driver_binaries.clear()
+    _driver_binaries.update({
+        'driver_path': driver_path,
+        'browser_path': Config.CHROME_BINARY_PATH or None
+    })
+    
+    return _driver_binaries
+
+def preflight_check() -> Dict:
+    """
+    Vérifie que les binaires navigateur sont présents et exécutables
+    
+    Returns:
+        Dict: Chemins et versions détectés
+        
+    Raises:
+        RuntimeError: Si un binaire est absent ou inutilisable
+    """
+    binaries = resolve_driver_binaries(force=True)
+    versions = {}
+    
+    for key in ('driver_path', 'browser_path'):
+        path = binaries.get(key)
+        if not path:
+            continue
+        
+        if not os.path.isfile(path) or not os.access(path, os.X_OK):
+            raise RuntimeError(f"Binaire introuvable ou non exécutable: {path}")
+        
+        try:
+            output = subprocess.run(
+                [path, '--version'],
+                capture_output=True, text=True, timeout=Config.CHROME_PREFLIGHT_TIMEOUT
+            )
+        except subprocess.TimeoutExpired:
+            raise RuntimeError(f"Binaire {path} ne répond pas (timeout --version)")
+        
+        if output.returncode != 0:
+            raise RuntimeError(f"Binaire {path} en erreur: {output.stderr.strip()}")
+        
+        versions[key.replace('_path', '_version')] = output.stdout.strip()
+    
+    return dict(binaries, **versions)
+
+@worker_init.connect
+def _worker_preflight(**kwargs):
+    """Résolution des binaires au démarrage du worker (échec immédiat si KO)"""
+    start = time.monotonic()
+    
+    try:
+        info = preflight_check()
+    except Exception as e:
+        logger.critical(f"Preflight navigateur en échec, arrêt du worker: {e}")
+        raise SystemExit(1)
+    
+    logger.info(f"Preflight navigateur OK en {time.monotonic() - start:.2f}s: {info}")
+
+@worker_ready.connect
+def _report_worker_startup(**kwargs):
+    """Publie le temps de démarrage du worker"""
+    startup_seconds = time.monotonic() - _PROCESS_START
+    logger.info(f"Worker prêt en {startup_seconds:.2f}s")
+    
+    try:
+        import redis
+        redis.from_url(Config.REDIS_URL).hset(
+            'vatproof:metrics:worker_startup',
+            socket.gethostname(),
+            json.dumps({
+                'startup_seconds': round(startup_seconds, 3),
+                'ready_at': datetime.utcnow().isoformat()
+            })
+        )
+    except Exception as e:
+        logger.warning(f"Impossible de publier la métrique de démarrage: {e}")
+    
+    # Exposition Prometheus du worker (agrège ses processus enfants via PROMETHEUS_MULTIPROC_DIR)
+    if Config.METRICS_ENABLED and Config.WORKER_METRICS_PORT:
+        try:
+            start_worker_metrics_server(
+                Config.WORKER_METRICS_PORT,
+                redis_url=Config.CELERY_BROKER_URL,
+                queues=Config.CELERY_MONITORED_QUEUES
+            )
+        except OSError as e:
+            logger.warning(f"Port de métriques {Config.WORKER_METRICS_PORT} indisponible: {e}")
+
 class VIESAutomation:
     """Classe pour l'automatisation du site VIES"""
     
     VIES_URL = "https://ec.europa.eu/taxation_customs/vies/"
     
-    def __init__(self, headless=True, delay_range=(3, 8)):
+    # Profils navigateur disponibles
+    PROFILE_STANDARD = 'standard'
+    PROFILE_LEAN = 'lean'
+    
+    # Ressources non essentielles bloquées en profil "lean" (motifs CDP Network.setBlockedURLs)
+    LEAN_BLOCKED_URLS = [
+        '*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg', '*.ico', '*.webp',
+        '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+        '*.mp4', '*.webm', '*.mp3',
+        '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+        '*webanalytics.europa.eu*', '*piwik*', '*matomo*',
+        '*europa.eu/webtools/load.js*', '*webtools.europa.eu*',
+    ]
+    
+    # Cookie de consentement pré-positionné (kit cookie consent de la Commission)
+    # pour que la bannière n'apparaisse jamais
+    LEAN_CONSENT_COOKIES = [
+        {
+            'name': 'cck1',
+            'value': '%7B%22cm%22%3Atrue%2C%22all1st%22%3Atrue%2C%22closed%22%3Atrue%7D',
+            'domain': '.europa.eu',
+            'path': '/',
+        },
+    ]
+    
+    # Codes d'erreur VIES signalant une surcharge ou une limitation
+    VIES_THROTTLE_CODES = [
+        'MS_MAX_CONCURRENT_REQ', 'GLOBAL_MAX_CONCURRENT_REQ',
+        'MS_UNAVAILABLE', 'SERVICE_UNAVAILABLE', 'TIMEOUT'
+    ]
+    
+    def __init__(self, headless=True, delay_range=(3, 8), profile=PROFILE_LEAN, pacer=None):
         """
         Initialise l'automatisation VIES
         
         Args:
             headless (bool): Mode headless pour Chrome
             delay_range (tuple): Délai aléatoire entre actions (min, max) en secondes
+            profile (str): Profil navigateur ('lean' ou 'standard')
+            pacer (AdaptivePacer): Contrôleur de cadencement adaptatif (optionnel)
         """
         self.headless = headless
         self.delay_range = delay_range
+        self.profile = profile
+        self.pacer = pacer
+        self.pace_factor = 1.0
+        self.timings = {}
         self.driver = None
         self.download_dir = None
+    
+    @property
+    def is_lean(self) -> bool:
+        """Indique si le profil navigateur allégé est actif"""
+        return self.profile == self.PROFILE_LEAN
         
     def setup_driver(self):
         """Configure et initialise le driver Chrome"""
@@ -74,10 +249,31 @@ class VIESAutomation:
                 "safebrowsing.enabled": True,
                 "plugins.always_open_pdf_externally": True
             }
+            
+            if self.is_lean:
+                # Pas d'attente des sous-ressources : le DOM suffit pour le formulaire
+                chrome_options.page_load_strategy = 'eager'
+                chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+                chrome_options.add_argument('--disable-extensions')
+                chrome_options.add_argument('--disable-background-networking')
+                chrome_options.add_argument('--disable-component-update')
+                chrome_options.add_argument('--disable-default-apps')
+                chrome_options.add_argument('--disable-sync')
+                chrome_options.add_argument('--mute-audio')
+                prefs.update({
+                    "profile.managed_default_content_settings.images": 2,
+                    "profile.managed_default_content_settings.media_stream": 2,
+                    "profile.default_content_setting_values.notifications": 2,
+                })
+            
             chrome_options.add_experimental_option("prefs", prefs)
             
-            # Installation automatique du driver
-            service = Service(ChromeDriverManager().install())
+            # Binaires résolus une seule fois au démarrage du worker
+            binaries = resolve_driver_binaries()
+            if binaries['browser_path']:
+                chrome_options.binary_location = binaries['browser_path']
+            
+            service = Service(binaries['driver_path'])
             
             # Initialisation du driver
             self.driver = webdriver.Chrome(service=service, options=chrome_options)
@@ -85,23 +281,64 @@ class VIESAutomation:
             # Masquer l'automatisation
             self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
             
-            logger.info("Driver Chrome initialisé avec succès")
+            if self.is_lean:
+                self._apply_lean_profile()
+            
+            logger.info(f"Driver Chrome initialisé avec succès (profil: {self.profile})")
             return True
             
         except Exception as e:
             logger.error(f"Erreur lors de l'initialisation du driver: {e}")
             return False
     
+    def _apply_lean_profile(self):
+        """Active l'interception réseau et pré-positionne le cookie de consentement"""
+        try:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.LEAN_BLOCKED_URLS})
+            
+            for cookie in self.LEAN_CONSENT_COOKIES:
+                self.driver.execute_cdp_cmd('Network.setCookie', dict(cookie, secure=True))
+            
+            logger.debug(f"Profil lean appliqué: {len(self.LEAN_BLOCKED_URLS)} motifs bloqués")
+            
+        except Exception as e:
+            # Le blocage est une optimisation : on continue avec le profil standard
+            logger.warning(f"Impossible d'appliquer le profil lean: {e}")
+    
     def human_delay(self, min_delay=None, max_delay=None):
-        """Simule un délai humain"""
+        """Simule un délai humain, modulé par le facteur de cadencement du pays"""
         if min_delay is None:
             min_delay = self.delay_range[0]
         if max_delay is None:
             max_delay = self.delay_range[1]
         
-        delay = random.uniform(min_delay, max_delay)
-        time.sleep(delay)
-        logger.debug(f"Délai humain: {delay:.2f}s")
+        delay = random.uniform(min_delay, max_delay) * self.pace_factor
+        if delay > 0:
+            time.sleep(delay)
+            self.timings['pacing'] = self.timings.get('pacing', 0) + int(delay * 1000)
+        logger.debug(f"Délai humain: {delay:.2f}s (facteur {self.pace_factor:.2f})")
+    
+    @contextmanager
+    def _phase(self, name: str):
+        """Chronomètre une phase de la vérification (horloge monotone, en ms)"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = int((time.monotonic() - start) * 1000)
+            self.timings[name] = self.timings.get(name, 0) + elapsed
+    
+    def _classify_outcome(self, result: Dict) -> str:
+        """Classe le résultat d'une vérification pour le cadencement"""
+        if result['success'] and not result.get('error'):
+            return 'success'
+        
+        error_code = result.get('vies_error_code')
+        if error_code in self.VIES_THROTTLE_CODES or result.get('timed_out'):
+            return 'throttle'
+        
+        return 'error'
     
     def verify_vat_number(self, country_code: str, vat_number: str) -> Dict:
         """
@@ -122,79 +359,121 @@ class VIESAutomation:
             'verification_date': datetime.utcnow().isoformat(),
             'pdf_path': None,
             'error': None,
-            'vies_response': None
+            'vies_response': None,
+            'request_identifier': None,
+            'request_date': None
         }
         
+        # Facteur de cadencement lu une fois par vérification
+        self.pace_factor = self.pacer.get_factor(country_code) if self.pacer else 1.0
+        self.timings = {}
+        lookup_start = time.monotonic()
+        
         try:
-            if not self.driver:
-                if not self.setup_driver():
-                    result['error'] = 'Impossible d\'initialiser le navigateur'
-                    return result
+            with self._phase('driver_setup'):
+                driver_ready = bool(self.driver) or self.setup_driver()
+            
+            if not driver_ready:
+                result['error'] = 'Impossible d\'initialiser le navigateur'
+                return self._finalize_result(result, country_code, lookup_start)
             
             logger.info(f"Début vérification: {country_code}{vat_number}")
             
             # Accès au site VIES
-            self.driver.get(self.VIES_URL)
-            self.human_delay(2, 4)
+            with self._phase('navigation'):
+                self.driver.get(self.VIES_URL)
+                self.human_delay(2, 4)
             
             # Gestion des cookies si nécessaire
-            self._handle_cookies_banner()
-            
-            # Sélection du pays
-            country_select = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.NAME, "memberStateCode"))
-            )
-            
-            select = Select(country_select)
-            select.select_by_value(country_code)
-            self.human_delay(1, 2)
+            with self._phase('cookies'):
+                self._handle_cookies_banner()
             
-            # Saisie du numéro de TVA
-            vat_input = self.driver.find_element(By.NAME, "number")
-            vat_input.clear()
-            # Simulation de frappe humaine
-            for char in vat_number:
-                vat_input.send_keys(char)
-                time.sleep(random.uniform(0.05, 0.15))
-            
-            self.human_delay(1, 3)
-            
-            # Soumission du formulaire
-            verify_button = self.driver.find_element(By.CSS_SELECTOR, "input[type='submit'][value*='Verify']")
-            verify_button.click()
-            
-            # Attente du résultat
-            WebDriverWait(self.driver, 15).until(
-                lambda driver: driver.find_elements(By.CSS_SELECTOR, ".validStyle, .invalidStyle") or
-                              driver.find_elements(By.XPATH, "//*[contains(text(), 'Valid') or contains(text(), 'Invalid')]")
-            )
+            with self._phase('form_fill'):
+                # Sélection du pays
+                country_select = WebDriverWait(self.driver, 10).until(
+                    EC.presence_of_element_located((By.NAME, "memberStateCode"))
+                )
+                
+                select = Select(country_select)
+                select.select_by_value(country_code)
+                self.human_delay(1, 2)
+                
+                # Saisie du numéro de TVA
+                vat_input = self.driver.find_element(By.NAME, "number")
+                vat_input.clear()
+                # Simulation de frappe humaine (saisie directe si VIES est sain)
+                if self.pace_factor > 0:
+                    for char in vat_number:
+                        vat_input.send_keys(char)
+                        time.sleep(random.uniform(0.05, 0.15) * self.pace_factor)
+                else:
+                    vat_input.send_keys(vat_number)
+                
+                self.human_delay(1, 3)
             
-            self.human_delay(2, 4)
+            with self._phase('submit_result'):
+                # Soumission du formulaire
+                verify_button = self.driver.find_element(By.CSS_SELECTOR, "input[type='submit'][value*='Verify']")
+                verify_button.click()
+                
+                # Attente du résultat
+                WebDriverWait(self.driver, 15).until(
+                    lambda driver: driver.find_elements(By.CSS_SELECTOR, ".validStyle, .invalidStyle") or
+                                  driver.find_elements(By.XPATH, "//*[contains(text(), 'Valid') or contains(text(), 'Invalid')]")
+                )
+                
+                self.human_delay(2, 4)
             
             # Analyse du résultat
-            result_info = self._parse_vies_result()
-            result.update(result_info)
+            with self._phase('parse'):
+                result_info = self._parse_vies_result()
+                result.update(result_info)
             
             # Si le numéro est valide, télécharger le PDF
             if result['is_valid']:
-                pdf_path = self._download_pdf(country_code, vat_number)
-                result['pdf_path'] = pdf_path
+                with self._phase('pdf_capture'):
+                    pdf_path = self._download_pdf(country_code, vat_number)
+                    result['pdf_path'] = pdf_path
+                # L'attente du téléchargement est mesurée séparément
+                self.timings['pdf_capture'] -= self.timings.get('download_wait', 0)
             
             result['success'] = True
             logger.info(f"Vérification réussie: {country_code}{vat_number} - Valide: {result['is_valid']}")
             
         except TimeoutException:
             result['error'] = 'Timeout lors de la vérification VIES'
+            result['timed_out'] = True
             logger.error(f"Timeout pour {country_code}{vat_number}")
             
         except Exception as e:
             result['error'] = f'Erreur lors de la vérification: {str(e)}'
             logger.error(f"Erreur vérification {country_code}{vat_number}: {e}")
         
+        return self._finalize_result(result, country_code, lookup_start)
+    
+    def _finalize_result(self, result: Dict, country_code: str, lookup_start: float) -> Dict:
+        """Attache les durées de phase au résultat, publie les métriques et le cadencement"""
+        self.timings['total'] = int((time.monotonic() - lookup_start) * 1000)
+        result['timings'] = dict(self.timings)
+        
+        outcome = self._classify_outcome(result)
+        if outcome == 'success':
+            outcome = 'valid' if result['is_valid'] else 'invalid'
+        observe_vies_timings(country_code, outcome, result['timings'])
+        
+        if self.pacer:
+            self.pacer.record(country_code, self._classify_outcome(result))
+        
         return result
     
     def _handle_cookies_banner(self):
         """Gère la bannière de cookies si elle apparaît"""
+        if self.is_lean:
+            # Le cookie de consentement est pré-positionné : simple vérification
+            # instantanée, sans attente explicite
+            self._click_visible_cookie_button()
+            return
+        
         try:
             # Recherche de boutons de cookies courants
             cookie_selectors = [
@@ -222,33 +501,44 @@ class VIESAutomation:
             # Pas de bannière de cookies, on continue
             pass
     
+    def _click_visible_cookie_button(self):
+        """Clique sur un bouton d'acceptation déjà présent, sans attente"""
+        try:
+            buttons = self.driver.find_elements(
+                By.CSS_SELECTOR,
+                "button[id*='cookie'][id*='accept'], button[class*='cookie'][class*='accept'], "
+                ".cookie-accept, #cookie-accept"
+            )
+            for button in buttons:
+                if button.is_displayed():
+                    button.click()
+                    logger.info("Bannière de cookies acceptée (profil lean)")
+                    return
+        except Exception:
+            pass
+    
     def _parse_vies_result(self) -> Dict:
-        """Parse le résultat affiché par VIES"""
+        """Parse le résultat affiché par VIES (un seul appel de script dans la page)"""
         try:
-            # Recherche d'éléments indiquant la validité
-            page_source = self.driver.page_source.lower()
-            
-            if 'yes, valid vat number' in page_source or 'validstyle' in page_source:
-                # Numéro valide
-                company_info = self._extract_company_info()
-                return {
-                    'is_valid': True,
-                    'company_name': company_info.get('name'),
-                    'company_address': company_info.get('address'),
-                    'vies_response': self.driver.page_source
-                }
-            elif 'no, invalid vat number' in page_source or 'invalidstyle' in page_source:
-                # Numéro invalide
-                return {
-                    'is_valid': False,
-                    'vies_response': self.driver.page_source
-                }
-            else:
+            raw = self.driver.execute_script(VIESResultParser.EXTRACTION_SCRIPT)
+            parsed = VIESResultParser.parse(raw)
+            
+            result = {
+                'is_valid': parsed['is_valid'],
+                'company_name': parsed['company_name'],
+                'company_address': parsed['company_address'],
+                'request_identifier': parsed['request_identifier'],
+                'request_date': parsed['request_date']
+            }
+            
+            if parsed['status'] == 'unknown':
                 # Résultat ambigu
-                return {
-                    'is_valid': False,
-                    'error': 'Résultat VIES ambigu ou service indisponible'
-                }
+                result['vies_error_code'] = parsed['vies_error_code']
+                result['error'] = parsed['error']
+            else:
+                result['vies_response'] = self.driver.page_source
+            
+            return result
                 
         except Exception as e:
             logger.error(f"Erreur lors du parsing du résultat: {e}")
@@ -257,57 +547,6 @@ class VIESAutomation:
                 'error': f'Erreur parsing résultat: {str(e)}'
             }
     
-    def _extract_company_info(self) -> Dict:
-        """Extrait les informations de l'entreprise depuis la page VIES"""
-        try:
-            company_info = {'name': None, 'address': None}
-            
-            # Recherche du nom de l'entreprise
-            name_selectors = [
-                "//td[contains(text(), 'Name')]/following-sibling::td",
-                "//th[contains(text(), 'Name')]/following-sibling::td",
-                ".company-name",
-                "#company-name"
-            ]
-            
-            for selector in name_selectors:
-                try:
-                    if selector.startswith('//'):
-                        element = self.driver.find_element(By.XPATH, selector)
-                    else:
-                        element = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    
-                    company_info['name'] = element.text.strip()
-                    break
-                except:
-                    continue
-            
-            # Recherche de l'adresse
-            address_selectors = [
-                "//td[contains(text(), 'Address')]/following-sibling::td",
-                "//th[contains(text(), 'Address')]/following-sibling::td",
-                ".company-address",
-                "#company-address"
-            ]
-            
-            for selector in address_selectors:
-                try:
-                    if selector.startswith('//'):
-                        element = self.driver.find_element(By.XPATH, selector)
-                    else:
-                        element = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    
-                    company_info['address'] = element.text.strip()
-                    break
-                except:
-                    continue
-            
-            return company_info
-            
-        except Exception as e:
-            logger.error(f"Erreur extraction info entreprise: {e}")
-            return {'name': None, 'address': None}
-    
     def _download_pdf(self, country_code: str, vat_number: str) -> Optional[str]:
         """Télécharge le PDF de justification depuis VIES"""
         try:
@@ -330,7 +569,8 @@ class VIESAutomation:
                     self.human_delay(2, 4)
                     
                     # Attente du téléchargement
-                    pdf_path = self._wait_for_download(country_code, vat_number)
+                    with self._phase('download_wait'):
+                        pdf_path = self._wait_for_download(country_code, vat_number)
                     return pdf_path
                     
                 except:
@@ -340,7 +580,8 @@ class VIESAutomation:
             self.driver.execute_script("window.print();")
             self.human_delay(3, 5)
             
-            return self._wait_for_download(country_code, vat_number)
+            with self._phase('download_wait'):
+                return self._wait_for_download(country_code, vat_number)
             
         except Exception as e:
             logger.error(f"Erreur téléchargement PDF: {e}")
@@ -393,10 +634,458 @@ class VIESAutomation:
         except Exception as e:
             logger.error(f"Erreur lors du nettoyage: {e}")
 
+# Contrôleur de cadencement partagé par les tâches du processus
+_pacer = None
+
+def get_pacer():
+    """
+    Retourne le contrôleur de cadencement adaptatif du processus
+    
+    Returns:
+        Optional[AdaptivePacer]: Contrôleur, ou None si désactivé
+    """
+    global _pacer
+    
+    if not Config.VIES_ADAPTIVE_PACING:
+        return None
+    
+    if _pacer is None:
+        _pacer = AdaptivePacer(
+            redis_url=Config.REDIS_URL,
+            max_factor=Config.VIES_PACING_MAX_FACTOR
+        )
+    
+    return _pacer
+
+# Disjoncteur par pays partagé par les tâches du processus
+_circuit_breaker = None
+
+def get_circuit_breaker():
+    """
+    Retourne le disjoncteur par pays du processus
+    
+    Returns:
+        Optional[CountryCircuitBreaker]: Disjoncteur, ou None si désactivé
+    """
+    global _circuit_breaker
+    
+    if not Config.VIES_CIRCUIT_BREAKER:
+        return None
+    
+    if _circuit_breaker is None:
+        _circuit_breaker = CountryCircuitBreaker(
+            redis_url=Config.REDIS_URL,
+            failure_threshold=Config.VIES_CIRCUIT_FAILURE_THRESHOLD,
+            cooldown_seconds=Config.VIES_CIRCUIT_COOLDOWN_SECONDS
+        )
+    
+    return _circuit_breaker
+
+# Magasin des réponses brutes VIES (hors base et hors backend de résultats)
+_response_store = None
+
+def get_response_store() -> ResponseStore:
+    """Retourne le magasin de réponses VIES du processus"""
+    global _response_store
+    
+    if _response_store is None:
+        _response_store = ResponseStore(Config.VIES_RESPONSE_STORE_DIR)
+    
+    return _response_store
+
+def _offload_vies_response(result: Dict, key: str):
+    """Remplace la page brute du résultat par une référence vers le magasin compressé"""
+    raw_response = result.pop('vies_response', None)
+    if not raw_response:
+        return
+    
+    try:
+        result['vies_response_ref'] = get_response_store().save(key, raw_response)
+    except OSError as e:
+        logger.warning(f"Réponse VIES {key} non conservée: {e}")
+
+# Suivi Redis des jobs (JobStorageService), partagé par les tâches du processus
+_job_storage = None
+
+def get_job_storage() -> JobStorageService:
+    """Retourne le service de suivi des jobs du processus"""
+    global _job_storage
+    
+    if _job_storage is None:
+        _job_storage = JobStorageService(Config.REDIS_URL)
+    
+    return _job_storage
+
+# Champs conservés dans le suivi Redis (la page brute reste dans le ResponseStore)
+_STORED_RESULT_FIELDS = (
+    'success', 'is_valid', 'company_name', 'company_address', 'verification_date',
+    'pdf_path', 'vies_response_ref', 'request_identifier', 'error'
+)
+
+def _persist_result(result: Dict, job_data: Optional[Dict], task_id: str, owner: Optional[str] = None) -> bool:
+    """
+    Enregistre le résultat dans VerificationJob et dans le suivi Redis
+    (le backend de résultats Celery n'est plus utilisé)
+    
+    L'écriture est conditionnée au bail : un worker dont le bail a été repris
+    (heartbeat perdu, job relancé par le reaper) n'écrase pas le résultat de
+    l'autre et ne compte pas le job deux fois dans son batch.
+    
+    Returns:
+        bool: False si la base n'a pas été mise à jour (suivi Redis laissé en l'état)
+    """
+    job_id = (job_data or {}).get('job_id')
+    if not job_id:
+        return True
+    
+    succeeded = bool(result.get('success'))
+    
+    try:
+        from app.models.user import VerificationJob
+        
+        job = VerificationJob.query.get(job_id)
+        if not job:
+            logger.warning(f"Job {job_id} introuvable, résultat non enregistré")
+            return False
+        
+        if succeeded:
+            finished = job.complete_success(result, owner=owner)
+        else:
+            finished = job.complete_failure(result.get('error') or 'Erreur inconnue',
+                                            timings=result.get('timings'), owner=owner)
+        if not finished:
+            # Résultat enregistré par le worker qui a repris le job
+            logger.warning(f"Job {job_id} déjà terminé ou repris par un autre worker, résultat ignoré")
+            return True
+    except Exception as e:
+        # Le job reste en cours en base : ni suivi Redis ni verdict annoncé
+        logger.error(f"Enregistrement du job {job_id} impossible: {e}")
+        try:
+            from app import db
+            db.session.rollback()
+        except Exception:
+            pass
+        return False
+    
+    try:
+        get_job_storage().update_job_status(
+            job_id,
+            'completed' if succeeded else 'failed',
+            celery_task_id=task_id,
+            result={field: result.get(field) for field in _STORED_RESULT_FIELDS if result.get(field) is not None},
+            error=None if succeeded else result.get('error')
+        )
+    except Exception as e:
+        logger.warning(f"Suivi Redis du job {job_id} non mis à jour: {e}")
+    
+    return True
+
+def _unrecorded(result: Dict) -> Dict:
+    """Résultat annoncé quand la base n'a pas enregistré le verdict"""
+    return dict(result, success=False, is_valid=False,
+                error='Résultat non enregistré en base, vérification à reprendre')
+
+def _lease_owner(task_id: str) -> str:
+    """Identifiant du détenteur d'un bail (hôte, processus, tâche)"""
+    return f"{socket.gethostname()}:{os.getpid()}:{task_id}"
+
+def _claim_job(job_data: Optional[Dict], owner: str) -> bool:
+    """
+    Prend le bail du job avant tout appel VIES
+    
+    Returns:
+        bool: False si le job est déjà terminé ou traité par un autre worker
+    """
+    job_id = (job_data or {}).get('job_id')
+    if not job_id:
+        return True
+    
+    try:
+        from app.models.user import VerificationJob
+        return VerificationJob.claim(job_id, owner, Config.JOB_LEASE_SECONDS)
+    except Exception as e:
+        logger.warning(f"Bail du job {job_id} non acquis (base indisponible), vérification poursuivie: {e}")
+        return True
+
+def _release_job(job_data: Optional[Dict], owner: str):
+    """Rend le job (relance différée ou mise en attente) sans attendre l'expiration du bail"""
+    job_id = (job_data or {}).get('job_id')
+    if not job_id:
+        return
+    
+    try:
+        from app.models.user import VerificationJob
+        VerificationJob.release(job_id, owner)
+    except Exception as e:
+        logger.warning(f"Bail du job {job_id} non libéré: {e}")
+
+def _mark_dispatched(payloads: List[Dict]) -> bool:
+    """
+    Date d'envoi des messages Celery (le reaper relance ceux qu'aucun worker ne prend)
+    
+    Returns:
+        bool: False si la base n'a pas pu être mise à jour
+    """
+    job_ids = [(payload.get('job_data') or {}).get('job_id') for payload in payloads]
+    job_ids = [job_id for job_id in job_ids if job_id]
+    if not job_ids:
+        return True
+    
+    try:
+        from app.models.user import VerificationJob
+        VerificationJob.mark_dispatched(job_ids)
+        return True
+    except Exception as e:
+        logger.warning(f"Date d'envoi de {len(job_ids)} jobs non enregistrée: {e}")
+        return False
+
+@contextmanager
+def _job_heartbeat(job_data: Optional[Dict], owner: str):
+    """Renouvelle le bail du job pendant la vérification"""
+    job_id = (job_data or {}).get('job_id')
+    if not job_id:
+        yield
+        return
+    
+    from app import db
+    from app.models.user import VerificationJob
+    
+    heartbeat = LeaseHeartbeat(
+        db.engine,
+        lambda: VerificationJob.renew_lease_statement(job_id, owner, Config.JOB_LEASE_SECONDS),
+        interval=Config.JOB_LEASE_SECONDS / 3
+    )
+    with heartbeat:
+        yield
+
+def _result_envelope(result: Dict, country_code: str, vat_number: str,
+                     job_data: Optional[Dict], task_id: str) -> Dict:
+    """Résultat compact retourné par la tâche (le détail est en base)"""
+    envelope = {
+        'success': bool(result.get('success')),
+        'is_valid': bool(result.get('is_valid')),
+        'task_id': task_id,
+        'job_id': (job_data or {}).get('job_id'),
+        'country_code': country_code,
+        'vat_number': vat_number
+    }
+    
+    for optional in ('error', 'parked', 'skipped'):
+        if result.get(optional):
+            envelope[optional] = result[optional]
+    
+    return envelope
+
+# Ordonnanceur équitable partagé par les tâches du processus
+_fair_scheduler = None
+
+def get_fair_scheduler() -> Optional[FairShareScheduler]:
+    """
+    Retourne l'ordonnanceur équitable du processus
+    
+    Returns:
+        Optional[FairShareScheduler]: Ordonnanceur, ou None si désactivé
+    """
+    global _fair_scheduler
+    
+    if not Config.FAIR_SHARE_SCHEDULER:
+        return None
+    
+    if _fair_scheduler is None:
+        weights = {}
+        for entry in Config.FAIR_SHARE_WEIGHTS.split(','):
+            plan, _, weight = entry.partition(':')
+            if plan.strip():
+                weights[plan.strip()] = float(weight or 1)
+        
+        _fair_scheduler = FairShareScheduler(
+            redis_url=Config.REDIS_URL,
+            weights=weights,
+            interactive_threshold=Config.FAIR_SHARE_INTERACTIVE_THRESHOLD,
+            interactive_share=Config.FAIR_SHARE_INTERACTIVE_SHARE
+        )
+    
+    return _fair_scheduler
+
+# Cache négatif des numéros confirmés invalides, partagé par les tâches du processus
+_invalid_filter = None
+
+def get_invalid_filter() -> Optional[InvalidVATFilter]:
+    """
+    Retourne le cache négatif des numéros confirmés invalides du processus
+    
+    Returns:
+        Optional[InvalidVATFilter]: Filtre, ou None si désactivé
+    """
+    global _invalid_filter
+    
+    if not Config.INVALID_FILTER_ENABLED:
+        return None
+    
+    if _invalid_filter is None:
+        _invalid_filter = InvalidVATFilter(
+            redis_url=Config.REDIS_URL,
+            error_rate=Config.INVALID_FILTER_ERROR_RATE,
+            capacity=Config.INVALID_FILTER_CAPACITY
+        )
+    
+    return _invalid_filter
+
+def _remember_invalid(result: Dict, country_code: str, vat_number: str):
+    """Numéro déclaré invalide par VIES : ajouté au cache négatif"""
+    invalid_filter = get_invalid_filter()
+    if not invalid_filter or not result.get('success') or result.get('is_valid'):
+        return
+    
+    try:
+        invalid_filter.add(country_code, vat_number)
+    except Exception as e:
+        logger.warning(f"Cache négatif non mis à jour pour {country_code}{vat_number}: {e}")
+
+def _refill_fair_share():
+    """
+    Job terminé : une place s'est libérée dans la file Celery, la suite des
+    files équitables est distribuée sans attendre le passage de Celery beat
+    """
+    if not get_fair_scheduler():
+        return
+    
+    try:
+        dispatch_fair_share()
+    except Exception as e:
+        logger.warning(f"Distribution équitable non relancée: {e}")
+
+_broker_client = None
+
+def _get_broker_client():
+    """Connexion Redis au broker Celery"""
+    global _broker_client
+    
+    if _broker_client is None:
+        import redis
+        _broker_client = redis.from_url(Config.CELERY_BROKER_URL)
+    
+    return _broker_client
+
+def _broker_queue_depth(queue: str = 'celery') -> int:
+    """Messages en attente dans une file du broker Celery"""
+    return _get_broker_client().llen(queue)
+
+def _broker_task_ids(chunk: int = 1000) -> set:
+    """
+    IDs des tâches encore dans le broker : en file, ou réservées par un worker
+    sans être acquittées (préchargement, relance différée avec countdown)
+    """
+    client = _get_broker_client()
+    task_ids = set()
+    
+    def add(message):
+        headers = message.get('headers') or {}
+        task_id = headers.get('id') or (message.get('properties') or {}).get('correlation_id')
+        if task_id:
+            task_ids.add(task_id)
+    
+    for queue in Config.CELERY_MONITORED_QUEUES:
+        start = 0
+        while True:
+            raw_messages = client.lrange(queue, start, start + chunk - 1)
+            for raw in raw_messages:
+                add(json.loads(raw))
+            if len(raw_messages) < chunk:
+                break
+            start += chunk
+    
+    # Messages non acquittés (transport Redis de kombu) : [message, exchange, routing_key]
+    for raw in client.hvals('unacked'):
+        add(json.loads(raw)[0])
+    
+    return task_ids
+
+def _requeue_reclaimed(jobs: List, scheduler: Optional[FairShareScheduler]):
+    """
+    Relance des jobs repris par le reaper : par les files équitables si
+    l'ordonnanceur est actif (sans doubler la file Celery), sinon en direct
+    """
+    from app import db
+    from app.models.user import User
+    
+    if scheduler:
+        by_user = {}
+        for job in jobs:
+            by_user.setdefault(job.user_id, []).append(job)
+        
+        for user_id, user_jobs in by_user.items():
+            user = User.query.get(user_id)
+            queued = scheduler.enqueue(str(user_id), user.subscription_type if user else 'free',
+                                       [job.to_task_kwargs() for job in user_jobs])
+            for job, task_id in zip(user_jobs, queued['task_ids']):
+                job.celery_task_id = task_id
+        db.session.commit()
+        return
+    
+    # Identifiant enregistré avant l'envoi (contrôle du broker au passage suivant)
+    task_ids = {}
+    for job in jobs:
+        task_ids[job.id] = job.celery_task_id = str(uuid.uuid4())
+    db.session.commit()
+    
+    for job in jobs:
+        verify_single_vat.apply_async(kwargs=job.to_task_kwargs(), task_id=task_ids[job.id])
+
+def _skip_verification(country_code: str, vat_number: str, job_data: Dict, task_id: str) -> Dict:
+    """Job déjà terminé ou en cours sur un autre worker : aucun nouvel appel VIES"""
+    logger.info(f"Vérification {country_code}{vat_number} ignorée (job terminé ou déjà pris)")
+    return _result_envelope(
+        {'success': False, 'skipped': True, 'error': 'Job déjà terminé ou en cours'},
+        country_code, vat_number, job_data, task_id
+    )
+
+def _park_verification(breaker, country_code: str, vat_number: str, job_data: Dict, task_id: str,
+                       owner: Optional[str] = None) -> Dict:
+    """Met une vérification en attente pendant l'indisponibilité du pays"""
+    breaker.park(country_code, {
+        'country_code': country_code,
+        'vat_number': vat_number,
+        'job_data': job_data
+    })
+    
+    # Hors du broker : ni bail ni date d'envoi, le reaper ne le relance pas
+    job_id = (job_data or {}).get('job_id')
+    if job_id:
+        try:
+            from app.models.user import VerificationJob
+            VerificationJob.park(job_id, owner)
+        except Exception as e:
+            logger.warning(f"Mise en attente du job {job_id} non enregistrée: {e}")
+    logger.info(f"Vérification {country_code}{vat_number} en attente (disjoncteur {country_code} ouvert)")
+    
+    return {
+        'success': False,
+        'is_valid': False,
+        'parked': True,
+        'error': f'Service VIES {country_code} indisponible, vérification en attente',
+        'task_id': task_id,
+        'job_id': (job_data or {}).get('job_id'),
+        'country_code': country_code,
+        'vat_number': vat_number
+    }
+
+def _release_parked_verifications(breaker, country_code: str) -> int:
+    """Relance en bloc les vérifications en attente d'un pays rétabli"""
+    payloads = breaker.release_parked(country_code)
+    
+    if payloads:
+        group(verify_single_vat.s(**payload) for payload in payloads).apply_async()
+        _mark_dispatched(payloads)
+        logger.info(f"Disjoncteur {country_code}: {len(payloads)} vérifications relancées")
+    
+    return len(payloads)
+
 # Tâches Celery
 
-@celery.task(bind=True, max_retries=3, default_retry_delay=60)
-def verify_single_vat(self, country_code: str, vat_number: str, job_data: Dict = None) -> Dict:
+@celery.task(bind=True, max_retries=3, default_retry_delay=60, ignore_result=True)
+def verify_single_vat(self, country_code: str, vat_number: str, job_data: Dict = None,
+                      is_probe: bool = False) -> Dict:
     """
     Tâche Celery pour vérifier un seul numéro de TVA
     
@@ -404,35 +1093,65 @@ def verify_single_vat(self, country_code: str, vat_number: str, job_data: Dict =
         country_code (str): Code pays
         vat_number (str): Numéro de TVA
         job_data (Dict): Données additionnelles du job
+        is_probe (bool): Requête de sonde d'un disjoncteur half-open
         
     Returns:
-        Dict: Résultat de la vérification
+        Dict: Enveloppe compacte (le résultat détaillé est enregistré dans VerificationJob)
     """
     automation = None
+    owner = None
+    breaker = None
+    probing = False
     
     try:
         logger.info(f"Début vérification Celery: {country_code}{vat_number}")
         
-        # Délai aléatoire pour éviter la surcharge
-        initial_delay = random.uniform(1, 5)
-        time.sleep(initial_delay)
+        # Pays en panne : mise en attente sans lancer de navigateur
+        breaker = get_circuit_breaker()
+        decision = breaker.allow_request(country_code, is_probe=is_probe) if breaker else CountryCircuitBreaker.ALLOW
+        if decision == CountryCircuitBreaker.PARK:
+            return _park_verification(breaker, country_code, vat_number, job_data, self.request.id)
+        probing = decision == CountryCircuitBreaker.PROBE
+        
+        # Bail du job : aucune vérification en double, reprise par le reaper si le worker disparaît
+        owner = _lease_owner(self.request.id)
+        if not _claim_job(job_data, owner):
+            return _skip_verification(country_code, vat_number, job_data, self.request.id)
+        
+        # Délai aléatoire pour éviter la surcharge, modulé par le cadencement du pays
+        pacer = get_pacer()
+        initial_delay = random.uniform(1, 5) * (pacer.get_factor(country_code) if pacer else 1.0)
+        if initial_delay > 0:
+            time.sleep(initial_delay)
         
         # Initialisation de l'automatisation
-        automation = VIESAutomation(headless=True)
+        automation = VIESAutomation(headless=True, profile=Config.VIES_BROWSER_PROFILE, pacer=pacer)
         
         # Vérification
-        result = automation.verify_vat_number(country_code, vat_number)
+        with _job_heartbeat(job_data, owner):
+            result = automation.verify_vat_number(country_code, vat_number)
         
-        # Ajout des métadonnées du job
-        result.update({
-            'task_id': self.request.id,
-            'country_code': country_code,
-            'vat_number': vat_number,
-            'job_data': job_data
-        })
+        # Mise à jour du disjoncteur du pays
+        if breaker:
+            if automation._classify_outcome(result) == 'throttle':
+                probing = False
+                if breaker.record_failure(country_code) == CountryCircuitBreaker.STATE_OPEN:
+                    return _park_verification(breaker, country_code, vat_number, job_data, self.request.id, owner)
+            elif result['success']:
+                probing = False
+                if breaker.record_success(country_code):
+                    _release_parked_verifications(breaker, country_code)
+        
+        # La page brute part dans le magasin compressé, seule sa référence est conservée
+        _offload_vies_response(result, f"{country_code}{vat_number}_{self.request.id}")
+        
+        # Enregistrement direct du résultat (base et suivi Redis)
+        _remember_invalid(result, country_code, vat_number)
+        if not _persist_result(result, job_data, self.request.id, owner):
+            result = _unrecorded(result)
         
         logger.info(f"Vérification Celery terminée: {country_code}{vat_number}")
-        return result
+        return _result_envelope(result, country_code, vat_number, job_data, self.request.id)
         
     except Exception as exc:
         logger.error(f"Erreur vérification Celery {country_code}{vat_number}: {exc}")
@@ -440,21 +1159,273 @@ def verify_single_vat(self, country_code: str, vat_number: str, job_data: Dict =
         # Retry en cas d'erreur
         if self.request.retries < self.max_retries:
             logger.info(f"Retry #{self.request.retries + 1} pour {country_code}{vat_number}")
-            raise self.retry(exc=exc, countdown=60 * (self.request.retries + 1))
+            if owner:
+                _release_job(job_data, owner)
+            # La sonde est libérée ci-dessous : la relance redemande son tour au disjoncteur
+            raise self.retry(exc=exc, countdown=60 * (self.request.retries + 1),
+                             kwargs=dict(self.request.kwargs or {}, is_probe=False))
         
         # Échec définitif
-        return {
+        result = {
             'success': False,
             'is_valid': False,
-            'error': f'Échec définitif après {self.max_retries} tentatives: {str(exc)}',
-            'task_id': self.request.id,
-            'country_code': country_code,
-            'vat_number': vat_number
+            'error': f'Échec définitif après {self.max_retries} tentatives: {str(exc)}'
         }
+        if not _persist_result(result, job_data, self.request.id, owner):
+            result = _unrecorded(result)
+        return _result_envelope(result, country_code, vat_number, job_data, self.request.id)
         
     finally:
         if automation:
             automation.cleanup()
+        # Sonde sans verdict sur le service national (job déjà pris, erreur sans rapport) :
+        # le verrou est rendu pour que la prochaine vérification du pays serve de sonde
+        if probing:
+            breaker.release_probe(country_code)
+        _refill_fair_share()
+
+# Navigateur maintenu ouvert entre deux vérifications express (workers réservés)
+_express_automation = None
+
+def get_express_automation() -> VIESAutomation:
+    """Retourne l'automatisation chaude du processus (créée au besoin)"""
+    global _express_automation
+    
+    if _express_automation is None:
+        _express_automation = VIESAutomation(headless=True, profile=Config.VIES_BROWSER_PROFILE, pacer=get_pacer())
+    
+    return _express_automation
+
+def _retire_express_automation():
+    """Ferme le navigateur chaud (il sera recréé à la prochaine vérification)"""
+    global _express_automation
+    
+    if _express_automation is not None:
+        _express_automation.cleanup()
+        _express_automation = None
+
+@worker_process_init.connect
+def _warm_express_browser(**kwargs):
+    """Démarre le navigateur dès le fork sur les workers de la file express"""
+    if not Config.EXPRESS_WORKER:
+        return
+    
+    try:
+        get_express_automation().setup_driver()
+        logger.info("Navigateur express prêt")
+    except Exception as e:
+        logger.warning(f"Préchauffage du navigateur express impossible: {e}")
+        _retire_express_automation()
+
+@celery.task(bind=True)
+def verify_express(self, country_code: str, vat_number: str, job_data: Dict = None) -> Dict:
+    """
+    Vérification interactive (1 à quelques numéros) sur la file express :
+    navigateur déjà ouvert, ni délai initial ni relance, verdict retourné
+    à l'appelant qui peut l'attendre
+    
+    Args:
+        country_code (str): Code pays
+        vat_number (str): Numéro de TVA
+        job_data (Dict): Données additionnelles du job
+        
+    Returns:
+        Dict: Enveloppe compacte avec le verdict
+    """
+    owner = None
+    breaker = None
+    probing = False
+    
+    try:
+        breaker = get_circuit_breaker()
+        decision = breaker.allow_request(country_code) if breaker else CountryCircuitBreaker.ALLOW
+        if decision == CountryCircuitBreaker.PARK:
+            return _park_verification(breaker, country_code, vat_number, job_data, self.request.id)
+        probing = decision == CountryCircuitBreaker.PROBE
+        
+        owner = _lease_owner(self.request.id)
+        if not _claim_job(job_data, owner):
+            return _skip_verification(country_code, vat_number, job_data, self.request.id)
+        
+        automation = get_express_automation()
+        with _job_heartbeat(job_data, owner):
+            result = automation.verify_vat_number(country_code, vat_number)
+        
+        if breaker:
+            if automation._classify_outcome(result) == 'throttle':
+                probing = False
+                breaker.record_failure(country_code)
+            elif result['success']:
+                probing = False
+                if breaker.record_success(country_code):
+                    _release_parked_verifications(breaker, country_code)
+        
+        # Navigateur dans un état incertain après une erreur : recréé à la prochaine vérification
+        if not result['success']:
+            _retire_express_automation()
+    
+    except Exception as exc:
+        logger.error(f"Erreur vérification express {country_code}{vat_number}: {exc}")
+        _retire_express_automation()
+        result = {'success': False, 'is_valid': False, 'error': str(exc)}
+    
+    finally:
+        # Sonde sans verdict sur le service national : la prochaine vérification du pays servira de sonde
+        if probing:
+            breaker.release_probe(country_code)
+    
+    _offload_vies_response(result, f"{country_code}{vat_number}_{self.request.id}")
+    _remember_invalid(result, country_code, vat_number)
+    if not _persist_result(result, job_data, self.request.id, owner):
+        result = _unrecorded(result)
+    _refill_fair_share()
+    
+    envelope = _result_envelope(result, country_code, vat_number, job_data, self.request.id)
+    envelope.update({
+        'company_name': result.get('company_name'),
+        'company_address': result.get('company_address'),
+        'request_identifier': result.get('request_identifier')
+    })
+    return envelope
+
+@celery.task(ignore_result=True)
+def probe_open_circuits() -> Dict:
+    """
+    Envoie une requête de sonde pour chaque pays dont le disjoncteur est ouvert
+    (à planifier via Celery beat)
+    
+    Returns:
+        Dict: Pays sondés
+    """
+    breaker = get_circuit_breaker()
+    if not breaker:
+        return {'probed': []}
+    
+    probed = []
+    
+    for country_code in breaker.get_open_countries():
+        if breaker.allow_request(country_code) != CountryCircuitBreaker.PROBE:
+            continue
+        
+        candidates = breaker.pop_probe_candidate(country_code)
+        if not candidates:
+            # Aucun job en attente : la prochaine vérification servira de sonde
+            breaker.release_probe(country_code)
+            continue
+        
+        verify_single_vat.apply_async(kwargs=dict(candidates[0], is_probe=True))
+        _mark_dispatched(candidates[:1])
+        probed.append(country_code)
+    
+    if probed:
+        logger.info(f"Sondes disjoncteurs envoyées: {', '.join(probed)}")
+    
+    return {'probed': probed}
+
+@celery.task(ignore_result=True)
+def dispatch_fair_share() -> Dict:
+    """
+    Alimente la file Celery depuis les files équitables, sans dépasser
+    FAIR_SHARE_TARGET_DEPTH messages en attente (planifiée via Celery beat,
+    déclenchée à chaque lancement de lot et à la fin de chaque vérification)
+    
+    Returns:
+        Dict: Nombre de jobs distribués
+    """
+    scheduler = get_fair_scheduler()
+    if not scheduler:
+        return {'dispatched': 0}
+    
+    token = scheduler.acquire_dispatch_lock()
+    if not token:
+        return {'dispatched': 0, 'skipped': 'dispatch en cours'}
+    
+    try:
+        # Jobs retirés par un distributeur arrêté avant leur envoi (même task_id :
+        # un message déjà parti n'entraîne pas de seconde vérification, cf. claim)
+        recovered = scheduler.recover_inflight()
+        if recovered:
+            logger.warning(f"Ordonnanceur équitable: {len(recovered)} jobs en vol renvoyés")
+        
+        slots = Config.FAIR_SHARE_TARGET_DEPTH - _broker_queue_depth() - len(recovered)
+        items = recovered + scheduler.dispatch(slots)
+        
+        for item in items:
+            verify_single_vat.apply_async(kwargs=item['kwargs'], task_id=item['task_id'])
+        
+        # Acquittés une fois envoyés et datés en base (sinon renvoyés au passage suivant)
+        if _mark_dispatched([item['kwargs'] for item in items]):
+            scheduler.ack(items)
+        
+        if items:
+            logger.info(f"Ordonnanceur équitable: {len(items)} jobs distribués")
+        
+        return {'dispatched': len(items)}
+    finally:
+        scheduler.release_dispatch_lock(token)
+
+@celery.task(ignore_result=True)
+def reap_orphaned_jobs() -> Dict:
+    """
+    Relance les jobs dont le bail a expiré (worker arrêté ou perdu en cours
+    de vérification) ; abandon après JOB_MAX_ATTEMPTS tentatives. Relance
+    aussi les jobs envoyés depuis plus de JOB_DISPATCH_TIMEOUT secondes
+    qu'aucun worker n'a pris (message Celery perdu)
+    
+    Returns:
+        Dict: Jobs relancés et abandonnés
+    """
+    from app import db
+    from app.models.user import VerificationJob
+    
+    now = datetime.utcnow()
+    scheduler = get_fair_scheduler()
+    via_scheduler = scheduler is not None
+    abandoned = 0
+    reclaimed = []
+    
+    for job in VerificationJob.find_orphans(now):
+        if not VerificationJob.reclaim_orphan(job.id, now, via_scheduler=via_scheduler):
+            continue  # Renouvelé entre-temps ou repris par un autre reaper
+        db.session.commit()
+        
+        if job.attempts >= Config.JOB_MAX_ATTEMPTS:
+            job.complete_failure(f'Abandon après {job.attempts} tentatives (worker perdu)')
+            abandoned += 1
+            continue
+        
+        reclaimed.append(job)
+    
+    # Jobs jamais pris : relancés seulement si leur message n'est plus dans le broker
+    # (une file Celery chargée retarde les jobs sans les perdre)
+    dispatched_before = now - timedelta(seconds=Config.JOB_DISPATCH_TIMEOUT)
+    stale = VerificationJob.find_stale_dispatches(dispatched_before)
+    if stale:
+        try:
+            in_broker = _broker_task_ids()
+        except Exception as e:
+            logger.warning(f"Reaper: broker illisible, {len(stale)} jobs non pris laissés en l'état: {e}")
+            stale = []
+        
+        for job in stale:
+            if job.celery_task_id in in_broker:
+                continue
+            if not VerificationJob.reclaim_stale_dispatch(job.id, dispatched_before, now,
+                                                          via_scheduler=via_scheduler):
+                continue  # Pris par un worker entre-temps ou repris par un autre reaper
+            db.session.commit()
+            reclaimed.append(job)
+    
+    requeued = len(reclaimed)
+    if reclaimed:
+        _requeue_reclaimed(reclaimed, scheduler)
+        if scheduler:
+            dispatch_fair_share.delay()
+    
+    if requeued or abandoned:
+        logger.warning(f"Reaper: {requeued} jobs orphelins relancés, {abandoned} abandonnés")
+    
+    return {'requeued': requeued, 'abandoned': abandoned}
 
 @celery.task
 def process_vat_batch(vat_list: list, batch_id: str) -> Dict:
@@ -472,14 +1443,14 @@ def process_vat_batch(vat_list: list, batch_id: str) -> Dict:
         logger.info(f"Début traitement lot {batch_id} avec {len(vat_list)} numéros")
         
         # Lancement des tâches individuelles
-        job_results = []
+        launched = 0
         
         for vat_item in vat_list:
             country_code = vat_item['country_code']
             vat_number = vat_item['vat_number']
             
             # Lancement asynchrone
-            task = verify_single_vat.delay(
+            verify_single_vat.delay(
                 country_code=country_code,
                 vat_number=vat_number,
                 job_data={
@@ -489,22 +1460,17 @@ def process_vat_batch(vat_list: list, batch_id: str) -> Dict:
                 }
             )
             
-            job_results.append({
-                'task_id': task.id,
-                'country_code': country_code,
-                'vat_number': vat_number,
-                'status': 'launched'
-            })
+            launched += 1
             
             # Délai entre les lancements pour éviter la surcharge
             time.sleep(random.uniform(0.5, 2))
         
-        logger.info(f"Lot {batch_id}: {len(job_results)} tâches lancées")
+        logger.info(f"Lot {batch_id}: {launched} tâches lancées")
         
+        # Enveloppe compacte : le suivi par job est dans VerificationJob
         return {
             'batch_id': batch_id,
-            'total_jobs': len(job_results),
-            'launched_jobs': job_results,
+            'total_jobs': launched,
             'status': 'processing'
         }
         
@@ -514,4 +1480,79 @@ def process_vat_batch(vat_list: list, batch_id: str) -> Dict:
             'batch_id': batch_id,
             'error': str(e),
             'status': 'failed'
-        }
\ No newline at end of file
+        }
+
+@celery.task(ignore_result=True)
+def rebuild_invalid_filter() -> Dict:
+    """
+    Reconstruit le cache négatif depuis l'historique des VerificationJob : seuls
+    les numéros dont le dernier verdict VIES de la fenêtre est invalide sont
+    conservés (verdicts anciens ou redevenus valides oubliés)
+    
+    Returns:
+        Dict: Numéros conservés
+    """
+    invalid_filter = get_invalid_filter()
+    if not invalid_filter:
+        return {'numbers': 0}
+    
+    from app.models.user import VerificationJob
+    
+    since = datetime.utcnow() - timedelta(days=Config.INVALID_FILTER_WINDOW_DAYS)
+    latest = {}
+    for country_code, vat_number, is_valid in VerificationJob.iter_recent_verdicts(since):
+        latest[f"{country_code}{vat_number}"] = is_valid
+    
+    invalid = [vat for vat, is_valid in latest.items() if not is_valid]
+    numbers = invalid_filter.rebuild(invalid, expected=len(invalid))
+    logger.info(f"Cache négatif reconstruit: {numbers} numéros invalides sur {len(latest)} vérifiés "
+                f"depuis {Config.INVALID_FILTER_WINDOW_DAYS} jours")
+    
+    return {'numbers': numbers}
+
+@celery.task(ignore_result=True)
+def purge_vies_responses() -> Dict:
+    """
+    Supprime les réponses VIES brutes au-delà de VIES_RESPONSE_RETENTION_DAYS
+    (la page n'est alors plus restituée, le verdict reste en base)
+    
+    Returns:
+        Dict: Nombre de dossiers journaliers supprimés
+    """
+    if Config.VIES_RESPONSE_RETENTION_DAYS <= 0:
+        return {'purged': 0}
+    
+    purged = get_response_store().purge(Config.VIES_RESPONSE_RETENTION_DAYS)
+    if purged:
+        logger.info(f"{purged} dossiers de réponses VIES supprimés "
+                    f"(conservation {Config.VIES_RESPONSE_RETENTION_DAYS} jours)")
+    
+    return {'purged': purged}
+
+# Tâches périodiques (Celery beat)
+celery.conf.beat_schedule = {
+    'probe-open-circuits': {
+        'task': probe_open_circuits.name,
+        'schedule': Config.VIES_CIRCUIT_PROBE_INTERVAL,
+    },
+    'reap-orphaned-jobs': {
+        'task': reap_orphaned_jobs.name,
+        'schedule': Config.JOB_REAPER_INTERVAL,
+        'options': {'expires': Config.JOB_REAPER_INTERVAL},
+    },
+    'dispatch-fair-share': {
+        'task': dispatch_fair_share.name,
+        'schedule': Config.FAIR_SHARE_DISPATCH_INTERVAL,
+        'options': {'expires': Config.FAIR_SHARE_DISPATCH_INTERVAL * 2},
+    },
+    'rebuild-invalid-filter': {
+        'task': rebuild_invalid_filter.name,
+        'schedule': Config.INVALID_FILTER_REBUILD_INTERVAL,
+        'options': {'expires': Config.INVALID_FILTER_REBUILD_INTERVAL},
+    },
+    'purge-vies-responses': {
+        'task': purge_vies_responses.name,
+        'schedule': Config.VIES_RESPONSE_PURGE_INTERVAL,
+        'options': {'expires': Config.VIES_RESPONSE_PURGE_INTERVAL},
+    },
+}
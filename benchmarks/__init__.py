@@ -0,0 +1,8 @@
+"""
+Benchmarks VATProof
+Les services sont chargés sans les routes Flask (voir vatproof.load_services_package) :
+importer ce paquet avant app.services
+"""
+from vatproof import load_services_package
+
+load_services_package()
@@ -0,0 +1,88 @@
+"""
+Benchmark des profils navigateur VIES (standard vs lean)
+Mesure la latence par vérification et la mémoire par instance Chrome
+
+Usage:
+    python benchmarks/browser_profile.py FR40303265045 DE811569869 --runs 5
+    python benchmarks/browser_profile.py FR40303265045 --url http://localhost:8080/
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+# Ajout du dossier racine au PATH Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# En premier : le paquet benchmarks charge app sans ses routes Flask
+from benchmarks.common import process_tree_rss
+from app.tasks.vies_verification import VIESAutomation
+
+
+def run_profile(profile, vat_numbers, runs, url=None):
+    """
+    Exécute les vérifications avec un profil et collecte les mesures
+
+    Args:
+        profile (str): Profil navigateur ('standard' ou 'lean')
+        vat_numbers (list): Numéros complets (ex: 'FR40303265045')
+        runs (int): Nombre de passes sur la liste
+        url (str): URL VIES alternative (simulateur local)
+
+    Returns:
+        dict: Latences et mémoire observées
+    """
+    latencies = []
+    peak_rss = 0
+    errors = 0
+
+    automation = VIESAutomation(headless=True, profile=profile)
+    if url:
+        automation.VIES_URL = url
+
+    try:
+        for _ in range(runs):
+            for full_vat in vat_numbers:
+                start = time.perf_counter()
+                result = automation.verify_vat_number(full_vat[:2], full_vat[2:])
+                latencies.append(time.perf_counter() - start)
+
+                if not result['success']:
+                    errors += 1
+
+                if automation.driver:
+                    peak_rss = max(peak_rss, process_tree_rss(automation.driver.service.process.pid))
+    finally:
+        automation.cleanup()
+
+    return {
+        'profile': profile,
+        'lookups': len(latencies),
+        'errors': errors,
+        'p50_s': statistics.median(latencies) if latencies else 0,
+        'mean_s': statistics.mean(latencies) if latencies else 0,
+        'max_s': max(latencies) if latencies else 0,
+        'peak_rss_mb': peak_rss / 1024 / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark des profils navigateur VIES')
+    parser.add_argument('vat_numbers', nargs='+', help='Numéros de TVA complets (avec code pays)')
+    parser.add_argument('--runs', type=int, default=3, help='Nombre de passes par profil')
+    parser.add_argument('--url', default=None, help='URL VIES alternative')
+    parser.add_argument('--profiles', default='standard,lean', help='Profils à comparer')
+    args = parser.parse_args()
+
+    print(f"{'profil':<10} {'lookups':>8} {'erreurs':>8} {'p50 (s)':>9} {'moy (s)':>9} {'max (s)':>9} {'RSS max (MB)':>13}")
+
+    for profile in args.profiles.split(','):
+        stats = run_profile(profile.strip(), args.vat_numbers, args.runs, args.url)
+        print(f"{stats['profile']:<10} {stats['lookups']:>8} {stats['errors']:>8} "
+              f"{stats['p50_s']:>9.2f} {stats['mean_s']:>9.2f} {stats['max_s']:>9.2f} "
+              f"{stats['peak_rss_mb']:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Outils communs aux benchmarks VATProof
+Mesure de la mémoire (RSS) et calcul des percentiles
+"""
+import os
+import time
+import resource
+import threading
+
+
+def read_rss(pid='self'):
+    """
+    Lit la mémoire résidente courante d'un processus
+
+    Args:
+        pid (int|str): PID ou 'self'
+
+    Returns:
+        int: RSS en octets (0 si /proc indisponible)
+    """
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def process_tree_rss(root_pid):
+    """
+    Calcule la mémoire résidente (RSS) d'un processus et de ses descendants
+
+    Args:
+        root_pid (int): PID racine (chromedriver, pool de workers...)
+
+    Returns:
+        int: RSS total en octets (0 si /proc indisponible)
+    """
+    children = {}
+    rss = {}
+
+    for entry in os.listdir('/proc') if os.path.isdir('/proc') else []:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/status') as f:
+                ppid, vmrss = None, 0
+                for line in f:
+                    if line.startswith('PPid:'):
+                        ppid = int(line.split()[1])
+                    elif line.startswith('VmRSS:'):
+                        vmrss = int(line.split()[1]) * 1024
+            children.setdefault(ppid, []).append(int(entry))
+            rss[int(entry)] = vmrss
+        except (OSError, ValueError):
+            continue
+
+    total = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, []))
+
+    return total
+
+
+def percentile(values, pct):
+    """
+    Percentile par interpolation linéaire
+
+    Args:
+        values (list): Valeurs mesurées
+        pct (float): Percentile (0-100)
+
+    Returns:
+        float: Valeur du percentile (0 si aucune mesure)
+    """
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class PeakRSSSampler:
+    """
+    Échantillonne la RSS du processus (et de ses enfants) pendant une étape
+
+    Usage:
+        with PeakRSSSampler() as sampler:
+            ...
+        print(sampler.peak)
+    """
+
+    def __init__(self, interval=0.05, include_children=True):
+        self.interval = interval
+        self.include_children = include_children
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        pid = os.getpid()
+        while not self._stop.is_set():
+            rss = process_tree_rss(pid) if self.include_children else read_rss()
+            self.peak = max(self.peak, rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = read_rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        if not self.peak:
+            # Repli : pic du processus depuis son démarrage (ko sous Linux)
+            self.peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return False
+
+
+class StageTimer:
+    """Mesure la durée, le débit et le pic mémoire d'une étape du pipeline"""
+
+    def __init__(self, name, items=0):
+        self.name = name
+        self.items = items
+        self.latencies = []
+        self.elapsed = 0.0
+        self.peak_rss = 0
+        self._sampler = PeakRSSSampler()
+
+    def __enter__(self):
+        self._sampler.__enter__()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self._start
+        self._sampler.__exit__(*exc)
+        self.peak_rss = self._sampler.peak
+        return False
+
+    def report(self):
+        """Ligne de rapport de l'étape"""
+        rate = self.items / self.elapsed if self.elapsed else 0
+        p50 = percentile(self.latencies, 50) * 1000
+        p99 = percentile(self.latencies, 99) * 1000
+        return (f"{self.name:<10} {self.items:>8} {self.elapsed:>9.2f} {rate:>10.1f} "
+                f"{p50:>9.1f} {p99:>9.1f} {self.peak_rss / 1024 / 1024:>10.1f}")
+
+    @staticmethod
+    def header():
+        """En-tête du rapport"""
+        return (f"{'étape':<10} {'éléments':>8} {'durée (s)':>9} {'num./s':>10} "
+                f"{'p50 (ms)':>9} {'p99 (ms)':>9} {'RSS (MB)':>10}")
@@ -0,0 +1,241 @@
+"""
+Benchmark de bout en bout du pipeline VATProof
+upload (parsing + validation) -> lancement -> vérification -> ZIP,
+contre le simulateur VIES local
+
+Usage:
+    python benchmarks/pipeline.py --count 1000 --workers 16
+    python benchmarks/pipeline.py --count 10000 --workers 32 --latency 0.2:0.4 --fail IT=0.05
+    python benchmarks/pipeline.py --count 200 --mode browser --workers 4
+"""
+import os
+import sys
+import json
+import random
+import argparse
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Ajout du dossier racine au PATH Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# En premier : le paquet benchmarks charge app sans ses routes Flask
+from benchmarks.common import StageTimer
+from app.services.file_service import FileService
+from app.services.vat_service import VATService
+from app.services.zip_service import ZipService
+from benchmarks.vies_simulator import SimulatorConfig, create_server, parse_mapping
+
+# Générateurs de numéros conformes aux motifs de VATService.VAT_PATTERNS
+NUMBER_SHAPES = {
+    'AT': lambda: 'U' + _digits(8), 'BE': lambda: '0' + _digits(9), 'DE': lambda: _digits(9),
+    'DK': lambda: _digits(8), 'ES': lambda: 'B' + _digits(8), 'FI': lambda: _digits(8),
+    'FR': lambda: _digits(11), 'IT': lambda: _digits(11), 'LU': lambda: _digits(8),
+    'NL': lambda: _digits(9) + 'B01', 'PL': lambda: _digits(10), 'PT': lambda: _digits(9),
+    'SE': lambda: _digits(10) + '01',
+}
+
+
+def _digits(count):
+    return ''.join(random.choice('0123456789') for _ in range(count))
+
+
+def generate_input(count, invalid_ratio=0.03, duplicate_ratio=0.02):
+    """
+    Génère un contenu de type copier-coller réaliste
+
+    Args:
+        count (int): Nombre de lignes
+        invalid_ratio (float): Part de numéros au format invalide
+        duplicate_ratio (float): Part de doublons
+
+    Returns:
+        str: Une ligne par numéro (séparateurs variés)
+    """
+    lines = []
+    countries = list(NUMBER_SHAPES)
+
+    for _ in range(count):
+        roll = random.random()
+        if lines and roll < duplicate_ratio:
+            lines.append(random.choice(lines))
+        elif roll < duplicate_ratio + invalid_ratio:
+            lines.append(random.choice(countries) + _digits(random.randint(2, 5)))
+        else:
+            country_code = random.choice(countries)
+            number = NUMBER_SHAPES[country_code]()
+            lines.append(random.choice(['{}{}', '{} {}', '{}-{}']).format(country_code, number))
+
+    return '\n'.join(lines)
+
+
+class RestVerifier:
+    """Vérification via l'API REST du simulateur, téléchargement du PDF si valide"""
+
+    def __init__(self, base_url, pdf_dir):
+        self.base_url = base_url.rstrip('/')
+        self.pdf_dir = pdf_dir
+
+    def verify(self, job):
+        url = f"{self.base_url}/rest-api/ms/{job['country_code']}/vat/{job['vat_number']}"
+        with urllib.request.urlopen(url, timeout=30) as response:
+            data = json.loads(response.read())
+
+        result = {
+            'success': data['userError'] in ('VALID', 'INVALID'),
+            'is_valid': data['valid'],
+            'company_name': data['name'],
+            'company_address': data['address'],
+            'verification_date': data['requestDate'],
+            'pdf_path': None
+        }
+
+        if result['is_valid']:
+            pdf_url = (f"{self.base_url}/print.pdf?cc={job['country_code']}"
+                       f"&number={job['vat_number']}&id={data['requestIdentifier']}")
+            pdf_path = os.path.join(self.pdf_dir, f"{job['country_code']}{job['vat_number']}.pdf")
+            with urllib.request.urlopen(pdf_url, timeout=30) as response, open(pdf_path, 'wb') as f:
+                f.write(response.read())
+            result['pdf_path'] = pdf_path
+
+        return result
+
+    def close(self):
+        pass
+
+
+class BrowserVerifier:
+    """Vérification via VIESAutomation (un navigateur par thread) sur le formulaire simulé"""
+
+    def __init__(self, base_url, profile):
+        from app.tasks.vies_verification import VIESAutomation
+
+        self._factory = lambda: VIESAutomation(headless=True, profile=profile)
+        self._url = base_url.rstrip('/') + '/taxation_customs/vies/'
+        self._local = threading.local()
+        self._instances = []
+        self._lock = threading.Lock()
+
+    def verify(self, job):
+        automation = getattr(self._local, 'automation', None)
+        if automation is None:
+            automation = self._factory()
+            automation.VIES_URL = self._url
+            self._local.automation = automation
+            with self._lock:
+                self._instances.append(automation)
+
+        return automation.verify_vat_number(job['country_code'], job['vat_number'])
+
+    def close(self):
+        for automation in self._instances:
+            automation.cleanup()
+
+
+def run_pipeline(count, workers, verifier, zip_dir):
+    """
+    Exécute le pipeline complet et mesure chaque étape
+
+    Returns:
+        list: StageTimer de chaque étape
+    """
+    content = generate_input(count)
+    stages = []
+
+    # Upload : parsing du contenu et validation de format
+    with StageTimer('upload', count) as stage:
+        vat_numbers = FileService.parse_text_content(content)
+        validation_results = VATService.validate_vat_list(vat_numbers)
+    stages.append(stage)
+
+    # Lancement : préparation des jobs et mise en file
+    jobs = VATService.prepare_for_vies_verification(validation_results)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    submitted = []
+
+    def timed_verify(job):
+        start = time.perf_counter()
+        try:
+            return job, verifier.verify(job), time.perf_counter() - start
+        except Exception as e:
+            return job, {'success': False, 'is_valid': False, 'error': str(e)}, time.perf_counter() - start
+
+    with StageTimer('launch', len(jobs)) as stage:
+        for job in jobs:
+            start = time.perf_counter()
+            submitted.append(executor.submit(timed_verify, job))
+            stage.latencies.append(time.perf_counter() - start)
+    stages.append(stage)
+
+    # Vérification : attente de tous les résultats
+    completed = []
+    with StageTimer('verify', len(jobs)) as stage:
+        for future in submitted:
+            job, result, latency = future.result()
+            stage.latencies.append(latency)
+            completed.append(dict(job, result=result))
+    stages.append(stage)
+    executor.shutdown()
+    verifier.close()
+
+    # ZIP : archive des justificatifs des numéros valides
+    pdf_jobs = [job for job in completed if job['result'].get('pdf_path')]
+    with StageTimer('zip', len(pdf_jobs)) as stage:
+        zip_result = ZipService(temp_dir=zip_dir).create_batch_zip('benchmark', pdf_jobs)
+    stages.append(stage)
+
+    errors = len([job for job in completed if not job['result'].get('success')])
+    print(f"\n{count} lignes, {len(jobs)} vérifications, {errors} erreurs, "
+          f"{len(pdf_jobs)} PDF, ZIP: {zip_result.get('zip_path') or zip_result.get('error')}\n")
+
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de bout en bout du pipeline VATProof')
+    parser.add_argument('--count', type=int, default=1000, help='Nombre de lignes (ex: 1000, 10000)')
+    parser.add_argument('--workers', type=int, default=16, help='Vérifications concurrentes')
+    parser.add_argument('--mode', choices=['rest', 'browser'], default='rest')
+    parser.add_argument('--profile', default='lean', help='Profil navigateur (mode browser)')
+    parser.add_argument('--simulator-url', default=None, help='Simulateur externe (sinon démarré localement)')
+    parser.add_argument('--latency', default='0.3:0.5', help='Latence simulée médiane:sigma')
+    parser.add_argument('--fail', default='', help="Taux d'échec par pays, ex: DE=0.2")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    server = None
+    base_url = args.simulator_url
+
+    if not base_url:
+        median, _, sigma = args.latency.partition(':')
+        server = create_server(port=0, config=SimulatorConfig(
+            latency_median=float(median),
+            latency_sigma=float(sigma or 0.5),
+            failure_rates=parse_mapping(args.fail)
+        ))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+    work_dir = tempfile.mkdtemp(prefix='vatproof_bench_')
+    if args.mode == 'browser':
+        verifier = BrowserVerifier(base_url, args.profile)
+    else:
+        verifier = RestVerifier(base_url, work_dir)
+
+    try:
+        stages = run_pipeline(args.count, args.workers, verifier, work_dir)
+    finally:
+        if server:
+            server.shutdown()
+
+    print(StageTimer.header())
+    for stage in stages:
+        print(stage.report())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark du stockage des réponses brutes VIES
+Compare la table verification_jobs avec la page HTML en ligne (avant)
+et avec une simple référence vers le magasin compressé (après)
+
+Usage:
+    python benchmarks/response_storage.py --jobs 20000 --batches 200
+    python benchmarks/response_storage.py --jobs 50000 --html-kb 60
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import sqlite3
+import argparse
+import tempfile
+
+# Ajout du dossier racine au PATH Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# En premier : le paquet benchmarks charge app sans ses routes Flask
+from benchmarks.common import percentile
+from app.services.response_store import ResponseStore
+
+SCHEMA = """
+CREATE TABLE verification_jobs (
+    id TEXT PRIMARY KEY,
+    batch_id TEXT,
+    user_id TEXT,
+    country_code TEXT,
+    vat_number TEXT,
+    status TEXT,
+    is_valid INTEGER,
+    vies_company_name TEXT,
+    {response_column} TEXT,
+    created_at TEXT
+);
+CREATE INDEX idx_batch_status ON verification_jobs (batch_id, status);
+CREATE INDEX idx_user_status ON verification_jobs (user_id, status);
+"""
+
+# Requêtes chaudes : détail d'un batch (statut) et compteurs du tableau de bord
+QUERIES = {
+    'batch_detail': "SELECT id, country_code, vat_number, status, is_valid, vies_company_name "
+                    "FROM verification_jobs WHERE batch_id = ?",
+    'dashboard_counts': "SELECT COUNT(*), SUM(is_valid) FROM verification_jobs "
+                        "WHERE user_id = ? AND created_at >= '2024-01-01'",
+}
+
+
+def fake_vies_page(size_kb):
+    """Page de résultat VIES réaliste (balisage répétitif, bien compressible)"""
+    block = ('<div class="ecl-row"><div class="ecl-col-4">{}</div>'
+             '<div class="ecl-col-8"><span class="value">{}</span></div></div>\n')
+    parts = ['<!DOCTYPE html><html lang="fr"><head><title>VIES - Résultat</title>'
+             '<script src="/assets/vies.{}.js"></script></head><body>'.format(uuid.uuid4().hex)]
+    while sum(len(p) for p in parts) < size_kb * 1024:
+        parts.append(block.format(random.choice(['Nom', 'Adresse', 'Identifiant', 'Date']), uuid.uuid4().hex))
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+def build_table(path, jobs, batches, users, html_kb, inline, store):
+    """
+    Remplit une base SQLite avec les jobs simulés
+
+    Returns:
+        tuple: Durée d'écriture des réponses (s), IDs de batches, IDs d'utilisateurs
+    """
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA.format(response_column='vies_response' if inline else 'vies_response_ref'))
+
+    batch_ids = [str(uuid.uuid4()) for _ in range(batches)]
+    user_ids = [str(uuid.uuid4()) for _ in range(users)]
+    write_time = 0.0
+    rows = []
+
+    for i in range(jobs):
+        html = fake_vies_page(html_kb)
+        start = time.perf_counter()
+        response = html if inline else store.save(f'FR{i:011d}_{uuid.uuid4().hex[:8]}', html)
+        write_time += time.perf_counter() - start
+
+        rows.append((str(uuid.uuid4()), random.choice(batch_ids), random.choice(user_ids), 'FR', f'{i:011d}',
+                     'completed', random.random() < 0.9, f'SOCIETE {i}', response, '2024-06-01'))
+
+        if len(rows) >= 1000:
+            connection.executemany('INSERT INTO verification_jobs VALUES (?,?,?,?,?,?,?,?,?,?)', rows)
+            rows = []
+
+    if rows:
+        connection.executemany('INSERT INTO verification_jobs VALUES (?,?,?,?,?,?,?,?,?,?)', rows)
+    connection.commit()
+    connection.execute('VACUUM')
+    connection.close()
+
+    return write_time, batch_ids, user_ids
+
+
+def time_queries(path, batch_ids, user_ids, repeat):
+    """Latence des requêtes chaudes (cache de pages SQLite froid à chaque connexion)"""
+    latencies = {name: [] for name in QUERIES}
+
+    for _ in range(repeat):
+        connection = sqlite3.connect(path)
+        for name, sql in QUERIES.items():
+            param = random.choice(batch_ids if name == 'batch_detail' else user_ids)
+            start = time.perf_counter()
+            connection.execute(sql, (param,)).fetchall()
+            latencies[name].append(time.perf_counter() - start)
+        connection.close()
+
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark du stockage des réponses VIES')
+    parser.add_argument('--jobs', type=int, default=20000)
+    parser.add_argument('--batches', type=int, default=200)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--html-kb', type=int, default=40, help='Taille moyenne des pages VIES')
+    parser.add_argument('--repeat', type=int, default=50, help='Exécutions de chaque requête')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    work_dir = tempfile.mkdtemp(prefix='vatproof_responses_')
+    store = ResponseStore(os.path.join(work_dir, 'store'))
+
+    print(f"{'variante':<10} {'table (MB)':>11} {'magasin (MB)':>13} {'écriture (ms/job)':>18} "
+          f"{'requête':<17} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+
+    for label, inline in (('avant', True), ('après', False)):
+        db_path = os.path.join(work_dir, f'{label}.db')
+        write_time, batch_ids, user_ids = build_table(
+            db_path, args.jobs, args.batches, args.users, args.html_kb, inline, store
+        )
+        latencies = time_queries(db_path, batch_ids, user_ids, args.repeat)
+
+        store_size = 0
+        if not inline:
+            for root, _, files in os.walk(store.base_dir):
+                store_size += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+
+        for name, values in latencies.items():
+            print(f"{label:<10} {os.path.getsize(db_path) / 1024 / 1024:>11.1f} {store_size / 1024 / 1024:>13.1f} "
+                  f"{write_time / args.jobs * 1000:>18.3f} {name:<17} "
+                  f"{percentile(values, 50) * 1000:>9.2f} {percentile(values, 99) * 1000:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark des corrections suggérées pour les numéros de TVA invalides
+Génère des numéros à la clé de contrôle correcte, leur applique une faute
+de saisie (chiffres inversés, chiffre manquant ou en trop, O/0 - I/1, code
+pays absent), puis mesure le débit, le rappel (numéro d'origine parmi les
+suggestions) et la justesse de la première suggestion par type de faute
+
+Usage:
+    python benchmarks/vat_corrections.py --rows 100000
+    python benchmarks/vat_corrections.py --rows 20000 --distinct 2000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from collections import Counter, defaultdict
+
+# Ajout du dossier racine au PATH Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# En premier : le paquet benchmarks charge app sans ses routes Flask
+from benchmarks.common import PeakRSSSampler
+from app.services import vat_correction
+from app.services.vat_checksum import verify_checksum
+from benchmarks.vat_extraction import SHAPES
+
+
+def valid_number(country_code):
+    """Numéro au format du pays dont la clé de contrôle est vérifiée"""
+    while True:
+        number = SHAPES[country_code]()
+        if verify_checksum(country_code, number):
+            return number
+
+
+def corrupt(country_code, number):
+    """
+    Applique une faute de saisie
+
+    Returns:
+        tuple: (numéro fautif, type de correction attendu) ou None si la faute ne s'applique pas
+    """
+    kind = random.choice(list(vat_correction.CORRECTION_LABELS))
+    position = random.randrange(len(number))
+
+    if kind == vat_correction.CORRECTION_CONFUSION:
+        positions = [i for i, c in enumerate(number) if c in '01']
+        if not positions:
+            return None
+        i = random.choice(positions)
+        number = number[:i] + {'0': 'O', '1': 'I'}[number[i]] + number[i + 1:]
+    elif kind == vat_correction.CORRECTION_TRANSPOSITION:
+        i = min(position, len(number) - 2)
+        if number[i] == number[i + 1]:
+            return None
+        number = number[:i] + number[i + 1] + number[i] + number[i + 2:]
+    elif kind == vat_correction.CORRECTION_MISSING_PREFIX:
+        return number, kind
+    elif kind == vat_correction.CORRECTION_EXTRA_DIGIT:
+        number = number[:position] + random.choice('0123456789') + number[position:]
+    else:
+        number = number[:position] + number[position + 1:]
+
+    return f'{country_code}{number}', kind
+
+
+def make_rows(count, distinct):
+    """
+    Lignes fautives (les mêmes fautes reviennent d'un import à l'autre)
+
+    Returns:
+        list: (numéro fautif, numéro d'origine, type de faute)
+    """
+    pool = []
+    while len(pool) < distinct:
+        country_code = random.choice(list(SHAPES))
+        number = valid_number(country_code)
+        corrupted = corrupt(country_code, number)
+        # Faute sans effet (ex: chiffre supprimé puis réinséré à l'identique)
+        if corrupted and corrupted[0] != f'{country_code}{number}':
+            pool.append((corrupted[0], f'{country_code}{number}', corrupted[1]))
+
+    return [random.choice(pool) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark des corrections suggérées')
+    parser.add_argument('--rows', type=int, default=100000, help='Lignes invalides')
+    parser.add_argument('--distinct', type=int, default=20000, help='Numéros fautifs distincts')
+    parser.add_argument('--limit', type=int, default=3, help='Suggestions par ligne')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    rows = make_rows(args.rows, args.distinct)
+    print(f"{len(rows)} lignes, {len(set(rows))} fautes distinctes, {len(SHAPES)} pays\n")
+
+    vat_correction.get_format_index()  # Construction de l'index hors mesure
+    values = [corrupted for corrupted, _, _ in rows]
+
+    print(f"{'passe':<8} {'durée (s)':>9} {'lignes/s':>10} {'RSS (MB)':>9}")
+    for label in ('froide', 'chaude'):
+        if label == 'froide':
+            vat_correction._candidates.cache_clear()
+        with PeakRSSSampler(include_children=False) as sampler:
+            start = time.perf_counter()
+            suggestions = vat_correction.suggest_for_rows(values, limit=args.limit)
+            elapsed = time.perf_counter() - start
+        print(f"{label:<8} {elapsed:>9.2f} {len(values) / elapsed:>10.0f} {sampler.peak / 1024 / 1024:>9.1f}")
+
+    found = defaultdict(Counter)
+    for (_, original, kind), row in zip(rows, suggestions):
+        vats = [suggestion['vat'] for suggestion in row]
+        found[kind]['lignes'] += 1
+        found[kind]['rappel'] += original in vats
+        found[kind]['top 1'] += bool(vats) and vats[0] == original
+        found[kind]['sans suggestion'] += not vats
+
+    print(f"\n{'faute':<16} {'lignes':>8} {'rappel':>8} {'top 1':>8} {'sans sugg.':>10}")
+    for kind in vat_correction.CORRECTION_LABELS:
+        counts = found[kind]
+        total = max(counts['lignes'], 1)
+        print(f"{kind:<16} {counts['lignes']:>8} {counts['rappel'] / total * 100:>7.1f}% "
+              f"{counts['top 1'] / total * 100:>7.1f}% {counts['sans suggestion'] / total * 100:>9.1f}%")
+
+
+if __name__ == '__main__':
+    main()
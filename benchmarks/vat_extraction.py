@@ -0,0 +1,187 @@
+"""
+Benchmark de l'extraction des numéros de TVA en texte libre
+Génère un corpus de factures et d'e-mails (numéros connus et leurres :
+IBAN, SIRET, téléphones, "de 123456789"...), puis mesure le débit, le
+rappel et les faux positifs de VATService.extract_vat_from_mixed_content,
+de la lecture en flux (VATService.iter_vat_in_stream) et de l'ancienne
+expression générique
+
+Usage:
+    python benchmarks/vat_extraction.py --size-mb 100
+    python benchmarks/vat_extraction.py --size-mb 20 --chunk-kb 64 --skip-legacy
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+import tempfile
+from collections import Counter
+
+# Ajout du dossier racine au PATH Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# En premier : le paquet benchmarks charge app sans ses routes Flask
+from benchmarks.common import PeakRSSSampler, read_rss
+from app.services.vat_service import VATService
+from benchmarks.pipeline import NUMBER_SHAPES, _digits
+
+# Numéros courts absents du générateur du pipeline
+SHAPES = dict(NUMBER_SHAPES, **{
+    'CY': lambda: _digits(8) + random.choice('ABCLMX'), 'HU': lambda: _digits(8),
+    'MT': lambda: _digits(8), 'SI': lambda: _digits(8), 'EL': lambda: _digits(9),
+    'IE': lambda: _digits(7) + 'WA',
+})
+
+COMPANIES = ['Dupont SARL', 'Müller GmbH', 'Rossi S.p.A.', 'Van Dijk B.V.', 'García S.L.', 'Nordic AB']
+CITIES = ['Paris', 'Lyon', 'Berlin', 'Milano', 'Rotterdam', 'Madrid', 'Stockholm', 'Wien']
+
+# Paragraphes distincts générés (le corpus les répète dans un ordre aléatoire)
+POOL_SIZE = 5000
+
+
+def legacy_extract(content):
+    """Implémentation précédente (référence) : expression générique puis filtre sur le pays"""
+    matches = re.findall(r'\b([A-Z]{2})[\s\-\.]?([A-Z0-9]{8,12})\b', content.upper())
+    return [f"{country}{number}" for country, number in matches if country in VATService.VAT_PATTERNS]
+
+
+def format_vat(country_code, number):
+    """Écritures rencontrées dans les documents : compacte, espacée, groupée, pointée"""
+    style = random.random()
+    if style < 0.4:
+        return f'{country_code}{number}'
+    if style < 0.6:
+        return f'{country_code} {number}'
+    if style < 0.85:
+        return f'{country_code} ' + ' '.join(number[i:i + 3] for i in range(0, len(number), 3))
+    return f'{country_code}' + '.'.join(number[i:i + 4] for i in range(0, len(number), 4))
+
+
+def _amount():
+    return f"{random.randint(10, 99999)},{random.randint(0, 99):02d}"
+
+
+def _date():
+    return f"{random.randint(1, 28):02d}/{random.randint(1, 12):02d}/20{random.randint(18, 25)}"
+
+
+def make_paragraph():
+    """
+    Paragraphe de facture ou d'e-mail
+
+    Returns:
+        tuple: (texte, numéros de TVA attendus, nettoyés)
+    """
+    country_code = random.choice(list(SHAPES))
+    number = SHAPES[country_code]()
+    vat = format_vat(country_code, number)
+    iban = f"FR76 {_digits(4)} {_digits(4)} {_digits(4)} {_digits(4)} {_digits(4)} {_digits(3)}"
+    phone = f"+33 {random.randint(1, 9)} {_digits(2)} {_digits(2)} {_digits(2)} {_digits(2)}"
+
+    kind = random.random()
+    if kind < 0.35:
+        text = (f"Facture n° {_digits(6)} du {_date()}\n"
+                f"Client : {random.choice(COMPANIES)}, {random.randint(1, 200)} rue de la Paix, "
+                f"{random.choice(CITIES)}\nN° TVA intracommunautaire : {vat}\n"
+                f"SIRET : {_digits(3)} {_digits(3)} {_digits(3)} {_digits(5)}\n"
+                f"Montant HT : {_amount()} € - TVA 20 % : {_amount()} € - règlement sous 30 jours\n\n")
+    elif kind < 0.6:
+        text = (f"Bonjour,\nVeuillez trouver ci-joint la facture {_digits(6)} pour un montant de "
+                f"{_digits(9)} centimes. Notre numéro de TVA est {vat}.\nIBAN : {iban}\n"
+                f"Tél : {phone}\nCordialement,\n{random.choice(COMPANIES)}\n\n")
+    elif kind < 0.85:
+        text = (f"Invoice {_digits(6)} dated {_date()} - VAT reg. no. {vat} - amount due "
+                f"{_amount()} EUR - order ref FR-{random.randint(2018, 2025)}-{_digits(6)} "
+                f"- please quote it in all correspondence.\n")
+    else:
+        # Leurres uniquement : aucun numéro de TVA attendu
+        return (f"Livraison de {_digits(9)} unités prévue le {_date()}, commande DE {_digits(3)}-{_digits(4)}, "
+                f"IBAN DE89 {_digits(4)} {_digits(4)} {_digits(4)} {_digits(4)} {_digits(2)}, "
+                f"contact {phone}, TVA due à réception.\n\n"), []
+
+    return text, [f'{country_code}{number}']
+
+
+def write_corpus(path, size_mb):
+    """
+    Écrit le corpus sur disque
+
+    Returns:
+        Counter: Numéros attendus (avec leurs répétitions)
+    """
+    pool = [make_paragraph() for _ in range(POOL_SIZE)]
+    expected = Counter()
+    target = size_mb * 1024 * 1024
+    written = 0
+
+    with open(path, 'w', encoding='utf-8') as f:
+        while written < target:
+            batch = random.choices(pool, k=1000)
+            content = ''.join(text for text, _ in batch)
+            f.write(content)
+            written += len(content.encode('utf-8'))
+            for _, numbers in batch:
+                expected.update(numbers)
+
+    return expected
+
+
+def score(found, expected):
+    """Rappel et faux positifs par rapport aux numéros attendus"""
+    found = Counter(found)
+    hits = sum((found & expected).values())
+    return hits / max(sum(expected.values()), 1), sum((found - expected).values())
+
+
+def run_variant(label, function, size_bytes, expected):
+    """Exécute une variante et affiche sa ligne de résultats"""
+    with PeakRSSSampler(include_children=False) as sampler:
+        start = time.perf_counter()
+        found = function()
+        elapsed = time.perf_counter() - start
+
+    recall, false_positives = score(found, expected)
+    print(f"{label:<10} {elapsed:>9.2f} {size_bytes / 1024 / 1024 / elapsed:>9.1f} {len(found):>10} "
+          f"{recall * 100:>8.2f}% {false_positives:>9} {sampler.peak / 1024 / 1024:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'extraction des numéros de TVA en texte libre")
+    parser.add_argument('--size-mb', type=int, default=100, help='Taille du corpus en MB')
+    parser.add_argument('--chunk-kb', type=int, default=1024, help='Taille des morceaux lus en flux')
+    parser.add_argument('--skip-legacy', action='store_true', help="Ne pas mesurer l'ancienne expression")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    path = os.path.join(tempfile.mkdtemp(prefix='vatproof_extract_'), 'corpus.txt')
+    expected = write_corpus(path, args.size_mb)
+    size_bytes = os.path.getsize(path)
+    VATService._mixed_content_pattern()  # Compilation hors mesure
+    print(f"corpus: {size_bytes / 1024 / 1024:.0f} MB, {sum(expected.values())} numéros attendus, "
+          f"RSS de départ {read_rss() / 1024 / 1024:.0f} MB\n")
+
+    def read_chunks():
+        with open(path, encoding='utf-8') as f:
+            yield from iter(lambda: f.read(args.chunk_kb * 1024), '')
+
+    def read_all():
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+
+    print(f"{'variante':<10} {'durée (s)':>9} {'MB/s':>9} {'trouvés':>10} {'rappel':>9} "
+          f"{'faux pos.':>9} {'RSS (MB)':>10}")
+
+    run_variant('flux', lambda: list(VATService.iter_vat_in_stream(read_chunks())), size_bytes, expected)
+    run_variant('complet', lambda: VATService.extract_vat_from_mixed_content(read_all()), size_bytes, expected)
+    if not args.skip_legacy:
+        run_variant('ancienne', lambda: legacy_extract(read_all()), size_bytes, expected)
+
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+
+
+if __name__ == '__main__':
+    main()
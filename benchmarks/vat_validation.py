@@ -0,0 +1,104 @@
+"""
+Benchmark de la validation des listes de numéros de TVA
+Compare le parcours ligne à ligne (VATListValidator.add), la validation
+par colonne (VATService.validate_vat_column), par blocs
+(VATListValidator.extend) et multi-processus
+(VATService.validate_vat_list_parallel), et vérifie que les résultats
+sont identiques
+
+Usage:
+    python benchmarks/vat_validation.py --count 1000000
+    python benchmarks/vat_validation.py --count 200000 --repeat 5 --invalid-ratio 0.1
+    python benchmarks/vat_validation.py --count 5000000 --repeat 1 --workers 8
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+# Ajout du dossier racine au PATH Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# En premier : le paquet benchmarks charge app sans ses routes Flask
+from benchmarks.common import percentile
+from app.services.vat_service import VATService, VATListValidator
+from benchmarks.pipeline import generate_input
+
+
+def validate_scalar(vat_list):
+    """Parcours ligne à ligne (chemin historique de validate_vat_list)"""
+    validator = VATListValidator()
+    for vat_input in vat_list:
+        validator.add(vat_input)
+    return validator.results()
+
+
+def validate_chunked(vat_list, chunk_rows=20000):
+    """Blocs validés par colonne (analyse des fichiers importés)"""
+    validator = VATListValidator()
+    for start in range(0, len(vat_list), chunk_rows):
+        validator.extend(vat_list[start:start + chunk_rows])
+    return validator.results()
+
+
+def validate_parallel(vat_list, workers=None):
+    """Lots répartis sur un pool de processus (imports hors ligne)"""
+    return VATService.validate_vat_list_parallel(vat_list, workers=workers)
+
+
+def time_variant(function, vat_list, repeat):
+    """
+    Exécute une variante `repeat` fois
+
+    Returns:
+        tuple: Durées (s) et résultat de la dernière exécution
+    """
+    durations = []
+    result = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(vat_list)
+        durations.append(time.perf_counter() - start)
+
+    return durations, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la validation des listes de TVA')
+    parser.add_argument('--count', type=int, default=1000000, help='Nombre de lignes')
+    parser.add_argument('--repeat', type=int, default=3, help='Exécutions de chaque variante')
+    parser.add_argument('--invalid-ratio', type=float, default=0.03)
+    parser.add_argument('--duplicate-ratio', type=float, default=0.02)
+    parser.add_argument('--workers', type=int, default=None, help='Processus de la variante parallèle')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    vat_list = generate_input(args.count, args.invalid_ratio, args.duplicate_ratio).split('\n')
+
+    print(f"{'variante':<10} {'lignes':>10} {'p50 (s)':>9} {'max (s)':>9} {'lignes/s':>12}")
+
+    results = {}
+    variants = (
+        ('ligne', validate_scalar),
+        ('colonne', VATService.validate_vat_column),
+        ('blocs', validate_chunked),
+        ('parallèle', lambda values: validate_parallel(values, args.workers)),
+    )
+    for label, function in variants:
+        durations, results[label] = time_variant(function, vat_list, args.repeat)
+        median = percentile(durations, 50)
+        print(f"{label:<10} {len(vat_list):>10} {median:>9.2f} {max(durations):>9.2f} "
+              f"{len(vat_list) / median:>12,.0f}")
+
+    identical = all(result == results['ligne'] for result in results.values())
+    print(f"\nrésultats identiques: {'oui' if identical else 'NON'}")
+    print(f"résumé: {results['colonne']['summary']}")
+
+    sys.exit(0 if identical else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+"""
+Simulateur local du service VIES
+Reproduit le formulaire HTML, l'API REST et le service SOAP checkVat,
+avec latences configurables, taux d'échec par pays et justificatifs PDF
+
+Usage:
+    python benchmarks/vies_simulator.py --port 8080 --latency 0.3:0.5 --fail DE=0.2,IT=0.05
+
+Conventions (identiques à simulate_vies_verification):
+    - numéro se terminant par '000' : numéro invalide
+    - numéro se terminant par '999' : erreur MS_UNAVAILABLE
+"""
+import re
+import sys
+import json
+import time
+import math
+import random
+import argparse
+from datetime import datetime
+from html import escape
+from urllib.parse import parse_qs, urlparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+MEMBER_STATES = [
+    'AT', 'BE', 'BG', 'CY', 'CZ', 'DE', 'DK', 'EE', 'EL', 'ES', 'FI', 'FR', 'HR', 'HU',
+    'IE', 'IT', 'LT', 'LU', 'LV', 'MT', 'NL', 'PL', 'PT', 'RO', 'SE', 'SI', 'SK'
+]
+
+# États membres qui ne publient ni nom ni adresse
+ANONYMOUS_STATES = {'DE', 'ES'}
+
+
+class SimulatorConfig:
+    """Paramètres du simulateur (latences et taux d'échec)"""
+
+    def __init__(self, latency_median=0.3, latency_sigma=0.5, failure_rates=None,
+                 country_latency=None):
+        """
+        Args:
+            latency_median (float): Latence médiane en secondes (loi log-normale)
+            latency_sigma (float): Écart-type du log de la latence
+            failure_rates (dict): {pays: probabilité MS_UNAVAILABLE}
+            country_latency (dict): {pays: latence médiane spécifique}
+        """
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.failure_rates = failure_rates or {}
+        self.country_latency = country_latency or {}
+
+    def sample_latency(self, country_code):
+        """Tire une latence selon une loi log-normale"""
+        median = self.country_latency.get(country_code, self.latency_median)
+        if median <= 0:
+            return 0.0
+        return random.lognormvariate(math.log(median), self.latency_sigma)
+
+    def lookup(self, country_code, vat_number):
+        """
+        Simule la consultation d'un registre national
+
+        Returns:
+            dict: {valid, name, address, error}
+        """
+        time.sleep(self.sample_latency(country_code))
+
+        if country_code not in MEMBER_STATES:
+            return {'error': 'INVALID_INPUT'}
+        if vat_number.endswith('999') or random.random() < self.failure_rates.get(country_code, 0):
+            return {'error': 'MS_UNAVAILABLE'}
+        if vat_number.endswith('000'):
+            return {'valid': False, 'name': None, 'address': None, 'error': None}
+
+        anonymous = country_code in ANONYMOUS_STATES
+        return {
+            'valid': True,
+            'name': None if anonymous else f'ENTREPRISE {vat_number[-4:]}',
+            'address': None if anonymous else f'{vat_number[-3:]} RUE DE LA SIMULATION, {country_code}',
+            'error': None
+        }
+
+
+def build_pdf(lines):
+    """
+    Génère un PDF minimal (une page, texte Helvetica)
+
+    Args:
+        lines (list): Lignes de texte
+
+    Returns:
+        bytes: Contenu du PDF
+    """
+    text_ops = ['BT', '/F1 11 Tf', '50 780 Td', '14 TL']
+    for line in lines:
+        safe = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+        text_ops.append(f'({safe}) Tj T*')
+    text_ops.append('ET')
+    stream = '\n'.join(text_ops).encode('latin-1', 'replace')
+
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+        b'/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+        b'<< /Length ' + str(len(stream)).encode() + b' >>\nstream\n' + stream + b'\nendstream',
+    ]
+
+    pdf = b'%PDF-1.4\n'
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += f'{number} 0 obj\n'.encode() + body + b'\nendobj\n'
+
+    xref = len(pdf)
+    pdf += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    for offset in offsets:
+        pdf += f'{offset:010d} 00000 n \n'.encode()
+    pdf += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+    return pdf
+
+
+class VIESSimulatorHandler(BaseHTTPRequestHandler):
+    """Gestionnaire HTTP du simulateur"""
+
+    config = SimulatorConfig()
+    protocol_version = 'HTTP/1.1'
+
+    # Pages HTML du formulaire et du résultat
+
+    FORM_PAGE = """<!DOCTYPE html><html><head><title>VIES VAT number validation</title></head>
+<body><form method="post" action="/taxation_customs/vies/">
+<select name="memberStateCode">{options}</select>
+<input type="text" name="number" value="">
+<input type="submit" value="Verify">
+</form></body></html>"""
+
+    RESULT_PAGE = """<!DOCTYPE html><html><head><title>VIES result</title></head>
+<body>{status}
+<table>
+<tr><td>Member State</td><td>{country_code}</td></tr>
+<tr><td>VAT Number</td><td>{country_code} {vat_number}</td></tr>
+<tr><td>Date when request received</td><td>{request_date}</td></tr>
+<tr><td>Name</td><td>{name}</td></tr>
+<tr><td>Address</td><td>{address}</td></tr>
+<tr><td>Consultation Number</td><td>{request_identifier}</td></tr>
+</table>
+{print_link}
+</body></html>"""
+
+    def log_message(self, format, *args):
+        # Pas de log par requête (bruit pendant les benchmarks)
+        pass
+
+    def _send(self, status, body, content_type, headers=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length).decode('utf-8') if length else ''
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        rest = re.match(r'^/rest-api/ms/([A-Z]{2})/vat/([A-Z0-9]+)$', url.path)
+
+        if rest:
+            return self._rest_response(rest.group(1), rest.group(2))
+        if url.path.startswith('/print'):
+            return self._pdf_response(parse_qs(url.query))
+        if url.path in ('/', '/taxation_customs/vies/'):
+            options = ''.join(f'<option value="{cc}">{cc}</option>' for cc in MEMBER_STATES)
+            return self._send(200, self.FORM_PAGE.format(options=options), 'text/html; charset=utf-8')
+
+        self._send(404, 'Not found', 'text/plain')
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self._read_body()
+
+        if url.path == '/rest-api/check-vat-number':
+            data = json.loads(body or '{}')
+            return self._rest_response(data.get('countryCode', ''), data.get('vatNumber', ''))
+        if url.path.endswith('/checkVatService'):
+            return self._soap_response(body)
+        if url.path in ('/', '/taxation_customs/vies/'):
+            form = parse_qs(body)
+            return self._form_result(form.get('memberStateCode', [''])[0], form.get('number', [''])[0])
+
+        self._send(404, 'Not found', 'text/plain')
+
+    def _form_result(self, country_code, vat_number):
+        result = self.config.lookup(country_code, vat_number)
+        request_date = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        request_identifier = f'WAPI{random.getrandbits(40):012X}'
+
+        if result.get('error'):
+            page = (f'<html><body><div class="errorStyle">Service unavailable: {result["error"]}</div>'
+                    f'</body></html>')
+            return self._send(200, page, 'text/html; charset=utf-8')
+
+        if result['valid']:
+            status = '<div class="validStyle">Yes, valid VAT number</div>'
+            print_link = (f'<a href="/print.pdf?cc={country_code}&number={vat_number}'
+                          f'&id={request_identifier}" download>Print</a>')
+        else:
+            status = '<div class="invalidStyle">No, invalid VAT number for cross border transactions within the EU</div>'
+            print_link = ''
+
+        page = self.RESULT_PAGE.format(
+            status=status,
+            country_code=escape(country_code),
+            vat_number=escape(vat_number),
+            request_date=request_date,
+            name=escape(result['name'] or '---'),
+            address=escape(result['address'] or '---'),
+            request_identifier=request_identifier,
+            print_link=print_link
+        )
+        self._send(200, page, 'text/html; charset=utf-8')
+
+    def _rest_response(self, country_code, vat_number):
+        result = self.config.lookup(country_code, vat_number)
+        payload = {
+            'countryCode': country_code,
+            'vatNumber': vat_number,
+            'requestDate': datetime.utcnow().isoformat() + 'Z',
+            'valid': bool(result.get('valid')),
+            'requestIdentifier': f'WAPI{random.getrandbits(40):012X}',
+            'name': result.get('name') or '---',
+            'address': result.get('address') or '---',
+            'userError': result.get('error') or ('VALID' if result.get('valid') else 'INVALID')
+        }
+        self._send(200, json.dumps(payload), 'application/json')
+
+    def _soap_response(self, body):
+        country_code = (re.search(r'<[\w:]*countryCode>([^<]*)<', body) or [None, ''])[1]
+        vat_number = (re.search(r'<[\w:]*vatNumber>([^<]*)<', body) or [None, ''])[1]
+        result = self.config.lookup(country_code, vat_number)
+
+        if result.get('error'):
+            envelope = ('<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+                        f'<soap:Fault><faultcode>soap:Server</faultcode><faultstring>{result["error"]}'
+                        '</faultstring></soap:Fault></soap:Body></soap:Envelope>')
+            return self._send(500, envelope, 'text/xml; charset=utf-8')
+
+        envelope = (
+            '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+            '<checkVatResponse xmlns="urn:ec.europa.eu:taxud:vies:services:checkVat:types">'
+            f'<countryCode>{escape(country_code)}</countryCode><vatNumber>{escape(vat_number)}</vatNumber>'
+            f'<requestDate>{datetime.utcnow().date().isoformat()}+00:00</requestDate>'
+            f'<valid>{"true" if result["valid"] else "false"}</valid>'
+            f'<name>{escape(result["name"] or "---")}</name><address>{escape(result["address"] or "---")}</address>'
+            '</checkVatResponse></soap:Body></soap:Envelope>'
+        )
+        self._send(200, envelope, 'text/xml; charset=utf-8')
+
+    def _pdf_response(self, query):
+        country_code = query.get('cc', [''])[0]
+        vat_number = query.get('number', [''])[0]
+        request_identifier = query.get('id', [''])[0]
+
+        pdf = build_pdf([
+            'VIES VAT number validation (simulateur VATProof)',
+            f'Member State: {country_code}',
+            f'VAT Number: {country_code}{vat_number}',
+            'Yes, valid VAT number',
+            f'Consultation Number: {request_identifier}',
+            f'Date: {datetime.utcnow().isoformat()}'
+        ])
+        filename = f'VIES_{country_code}{vat_number}.pdf'
+        self._send(200, pdf, 'application/pdf',
+                   {'Content-Disposition': f'attachment; filename="{filename}"'})
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    """Serveur multi-thread avec une file d'attente large (benchmarks concurrents)"""
+
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def parse_mapping(value, cast=float):
+    """Analyse 'DE=0.2,IT=0.05' en {'DE': 0.2, 'IT': 0.05}"""
+    mapping = {}
+    for item in filter(None, (value or '').split(',')):
+        key, _, raw = item.partition('=')
+        mapping[key.strip().upper()] = cast(raw)
+    return mapping
+
+
+def create_server(host='127.0.0.1', port=8080, config=None):
+    """
+    Crée le serveur du simulateur (utilisable depuis un benchmark)
+
+    Args:
+        host (str): Adresse d'écoute
+        port (int): Port d'écoute (0 = port libre)
+        config (SimulatorConfig): Paramètres du simulateur
+
+    Returns:
+        ThreadingHTTPServer: Serveur prêt à servir (serve_forever)
+    """
+    handler = type('ConfiguredHandler', (VIESSimulatorHandler,), {'config': config or SimulatorConfig()})
+    return SimulatorServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulateur local du service VIES')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', default='0.3:0.5',
+                        help='Latence médiane (s) et sigma log-normal, ex: 0.3:0.5')
+    parser.add_argument('--country-latency', default='', help='Latence médiane par pays, ex: IT=1.5,DE=0.8')
+    parser.add_argument('--fail', default='', help="Taux d'échec MS_UNAVAILABLE par pays, ex: DE=0.2")
+    args = parser.parse_args()
+
+    median, _, sigma = args.latency.partition(':')
+    config = SimulatorConfig(
+        latency_median=float(median),
+        latency_sigma=float(sigma or 0.5),
+        failure_rates=parse_mapping(args.fail),
+        country_latency=parse_mapping(args.country_latency)
+    )
+
+    server = create_server(args.host, args.port, config)
+    print(f"Simulateur VIES sur http://{args.host}:{server.server_port}/taxation_customs/vies/")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+        sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,9 @@ from dotenv import load_dotenv
 # Chargement du fichier .env
 load_dotenv()
 
+# Racine du projet : les dossiers de stockage par défaut ne dépendent pas du répertoire de lancement
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
 class Config:
     """Configuration de base pour l'application Flask"""
     
@@ -26,8 +29,21 @@ class Config:
     CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND') or 'redis://localhost:6379/0'
     
     # Configuration des uploads
-    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or 'temp_uploads'
+    # Reçus par le serveur web, analysés et purgés par les workers `uploads` : volume partagé entre les machines
+    UPLOAD_FOLDER = os.path.abspath(os.environ.get('UPLOAD_FOLDER') or os.path.join(BASE_DIR, 'temp_uploads'))
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
+    BATCH_STAGING_TTL = int(os.environ.get('BATCH_STAGING_TTL', '86400'))  # Lignes validées en attente de lancement
+    
+    # Upload par morceaux (fichiers volumineux, analyse en tâche de fond)
+    UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', str(8 * 1024 * 1024)))  # < MAX_CONTENT_LENGTH
+    UPLOAD_MAX_SIZE = int(os.environ.get('UPLOAD_MAX_SIZE', str(1024 * 1024 * 1024)))  # 1GB
+    UPLOAD_SESSION_TTL = int(os.environ.get('UPLOAD_SESSION_TTL', '86400'))  # Reprise possible pendant 24h
+    UPLOAD_PURGE_INTERVAL = int(os.environ.get('UPLOAD_PURGE_INTERVAL', '3600'))
+    UPLOAD_QUEUE = os.environ.get('UPLOAD_QUEUE', 'uploads')  # File dédiée : l'aperçu n'attend pas derrière VIES
+    
+    # Corrections suggérées pour les numéros invalides (import et saisie)
+    VAT_CORRECTION_SUGGESTIONS = os.environ.get('VAT_CORRECTION_SUGGESTIONS', 'true').lower() == 'true'
+    VERIFICATION_CACHE_PATH = os.environ.get('VERIFICATION_CACHE_PATH')  # Cache SQLite des verdicts (CLI), optionnel
     
     # Configuration de sécurité
     WTF_CSRF_ENABLED = True
@@ -39,6 +55,74 @@ class Config:
     # Configuration VIES
     VIES_REQUEST_TIMEOUT = int(os.environ.get('VIES_REQUEST_TIMEOUT', '30'))
     VIES_DELAY_BETWEEN_REQUESTS = int(os.environ.get('VIES_DELAY_BETWEEN_REQUESTS', '5'))
+    
+    # Profil navigateur VIES : 'lean' (ressources bloquées, chargement eager) ou 'standard'
+    VIES_BROWSER_PROFILE = os.environ.get('VIES_BROWSER_PROFILE', 'lean')
+    
+    # Binaires navigateur épinglés (workers sans accès réseau)
+    CHROMEDRIVER_PATH = os.environ.get('CHROMEDRIVER_PATH')
+    CHROME_BINARY_PATH = os.environ.get('CHROME_BINARY_PATH')
+    CHROMEDRIVER_AUTO_INSTALL = os.environ.get('CHROMEDRIVER_AUTO_INSTALL', 'true').lower() == 'true'
+    CHROME_PREFLIGHT_TIMEOUT = int(os.environ.get('CHROME_PREFLIGHT_TIMEOUT', '10'))
+    
+    # Cadencement adaptatif des délais VIES (état partagé dans Redis)
+    VIES_ADAPTIVE_PACING = os.environ.get('VIES_ADAPTIVE_PACING', 'true').lower() == 'true'
+    VIES_PACING_MAX_FACTOR = float(os.environ.get('VIES_PACING_MAX_FACTOR', '4.0'))
+    
+    # Disjoncteurs par État membre (indisponibilités VIES nationales)
+    VIES_CIRCUIT_BREAKER = os.environ.get('VIES_CIRCUIT_BREAKER', 'true').lower() == 'true'
+    VIES_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('VIES_CIRCUIT_FAILURE_THRESHOLD', '5'))
+    VIES_CIRCUIT_COOLDOWN_SECONDS = int(os.environ.get('VIES_CIRCUIT_COOLDOWN_SECONDS', '60'))
+    VIES_CIRCUIT_PROBE_INTERVAL = int(os.environ.get('VIES_CIRCUIT_PROBE_INTERVAL', '30'))
+    
+    # Métriques Prometheus (PROMETHEUS_MULTIPROC_DIR pour l'agrégation multi-processus)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    WORKER_METRICS_PORT = int(os.environ.get('WORKER_METRICS_PORT', '0'))
+    CELERY_MONITORED_QUEUES = os.environ.get('CELERY_MONITORED_QUEUES', 'celery,express,uploads').split(',')
+    
+    # Supervision /api/status (sondes en arrière-plan, instantané partagé dans Redis)
+    HEALTH_REFRESH_INTERVAL = int(os.environ.get('HEALTH_REFRESH_INTERVAL', '15'))
+    HEALTH_CELERY_PING_TIMEOUT = float(os.environ.get('HEALTH_CELERY_PING_TIMEOUT', '2.0'))
+    
+    # Logs système tamponnés (insertion par lots hors de la session de la requête)
+    SYSTEM_LOG_BUFFERED = os.environ.get('SYSTEM_LOG_BUFFERED', 'true').lower() == 'true'
+    SYSTEM_LOG_QUEUE_SIZE = int(os.environ.get('SYSTEM_LOG_QUEUE_SIZE', '10000'))
+    SYSTEM_LOG_BATCH_SIZE = int(os.environ.get('SYSTEM_LOG_BATCH_SIZE', '200'))
+    SYSTEM_LOG_FLUSH_INTERVAL = float(os.environ.get('SYSTEM_LOG_FLUSH_INTERVAL', '1.0'))
+    
+    # Réponses brutes VIES (HTML compressé hors de la table verification_jobs)
+    # Écrites par les workers, relues par le serveur web : volume partagé entre les machines
+    VIES_RESPONSE_STORE_DIR = os.path.abspath(os.environ.get('VIES_RESPONSE_STORE_DIR') or os.path.join(BASE_DIR, 'vies_responses'))
+    VIES_RESPONSE_RETENTION_DAYS = int(os.environ.get('VIES_RESPONSE_RETENTION_DAYS', '365'))  # 0 = conservation illimitée
+    VIES_RESPONSE_PURGE_INTERVAL = int(os.environ.get('VIES_RESPONSE_PURGE_INTERVAL', '86400'))
+    
+    # Ordonnancement équitable entre clients (files par utilisateur dans Redis)
+    FAIR_SHARE_SCHEDULER = os.environ.get('FAIR_SHARE_SCHEDULER', 'true').lower() == 'true'
+    FAIR_SHARE_WEIGHTS = os.environ.get('FAIR_SHARE_WEIGHTS', 'free:1,premium:4')
+    FAIR_SHARE_INTERACTIVE_THRESHOLD = int(os.environ.get('FAIR_SHARE_INTERACTIVE_THRESHOLD', '50'))
+    FAIR_SHARE_INTERACTIVE_SHARE = float(os.environ.get('FAIR_SHARE_INTERACTIVE_SHARE', '0.5'))
+    FAIR_SHARE_TARGET_DEPTH = int(os.environ.get('FAIR_SHARE_TARGET_DEPTH', '20'))
+    FAIR_SHARE_DISPATCH_INTERVAL = float(os.environ.get('FAIR_SHARE_DISPATCH_INTERVAL', '2.0'))
+    
+    # Voie express : petites vérifications interactives sur une file dédiée
+    EXPRESS_QUEUE = os.environ.get('EXPRESS_QUEUE', 'express')
+    EXPRESS_MAX_NUMBERS = int(os.environ.get('EXPRESS_MAX_NUMBERS', '3'))
+    EXPRESS_SYNC_TIMEOUT = float(os.environ.get('EXPRESS_SYNC_TIMEOUT', '10'))
+    EXPRESS_WORKER = os.environ.get('EXPRESS_WORKER', 'false').lower() == 'true'  # Worker réservé (navigateur chaud)
+    
+    # Baux de traitement des jobs (reprise automatique après perte d'un worker)
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', '30'))
+    JOB_REAPER_INTERVAL = int(os.environ.get('JOB_REAPER_INTERVAL', '10'))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '3'))
+    JOB_DISPATCH_TIMEOUT = int(os.environ.get('JOB_DISPATCH_TIMEOUT', '600'))  # Message jamais pris : relancé
+    
+    # Cache négatif des numéros confirmés invalides par VIES (filtre de Bloom dans Redis)
+    INVALID_FILTER_ENABLED = os.environ.get('INVALID_FILTER_ENABLED', 'true').lower() == 'true'
+    INVALID_FILTER_ERROR_RATE = float(os.environ.get('INVALID_FILTER_ERROR_RATE', '0.001'))  # Faux positifs
+    INVALID_FILTER_CAPACITY = int(os.environ.get('INVALID_FILTER_CAPACITY', '100000'))  # Première tranche
+    INVALID_FILTER_WINDOW_DAYS = int(os.environ.get('INVALID_FILTER_WINDOW_DAYS', '30'))  # Ancienneté des verdicts
+    INVALID_FILTER_REBUILD_INTERVAL = int(os.environ.get('INVALID_FILTER_REBUILD_INTERVAL', '86400'))
+    INVALID_FILTER_SKIP_DISPATCH = os.environ.get('INVALID_FILTER_SKIP_DISPATCH', 'false').lower() == 'true'
 
 class DevelopmentConfig(Config):
     """Configuration pour l'environnement de développement"""
@@ -56,6 +140,7 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    SYSTEM_LOG_BUFFERED = False  # Base en mémoire : pas de connexion séparée
 
 # Dictionnaire des configurations disponibles
 config = {
@@ -0,0 +1,62 @@
+"""
+Configuration des tests : les services sont importés sans les routes Flask
+"""
+import os
+import sys
+import types
+
+import pytest
+
+from vatproof import load_services_package
+
+load_services_package()
+
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    """
+    Redis en mémoire partagé par tous les clients créés pendant le test
+    (fakeredis avec moteur Lua pour les scripts atomiques des services)
+    """
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr('redis.from_url', lambda url, **kwargs: fakeredis.FakeRedis(server=server))
+    return fakeredis.FakeRedis(server=server)
+
+
+@pytest.fixture(scope='session')
+def models():
+    """
+    Modèles SQLAlchemy sans les routes Flask : app.models est chargé sans
+    son __init__ et reçoit l'instance db que lui fournirait l'application
+    """
+    pytest.importorskip('flask')
+    flask_sqlalchemy = pytest.importorskip('flask_sqlalchemy')
+
+    package = sys.modules['app']
+    if 'app.models' not in sys.modules:
+        models_package = types.ModuleType('app.models')
+        models_package.__path__ = [os.path.join(package.__path__[0], 'models')]
+        sys.modules['app.models'] = models_package
+    if not hasattr(package, 'db'):
+        package.db = flask_sqlalchemy.SQLAlchemy()
+
+    from app.models import user
+    return user
+
+
+@pytest.fixture
+def database(models):
+    """Base SQLite en mémoire, tables créées, contexte d'application actif"""
+    from flask import Flask
+
+    flask_app = Flask(__name__)
+    flask_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    models.db.init_app(flask_app)
+
+    with flask_app.app_context():
+        models.db.create_all()
+        yield models.db
+        models.db.session.remove()
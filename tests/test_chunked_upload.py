@@ -0,0 +1,75 @@
+"""
+Tests des sessions d'upload par morceaux
+"""
+import os
+
+import pytest
+
+from app.services.chunked_upload import ChunkedUploadService
+
+
+@pytest.fixture
+def uploads(redis_server, tmp_path):
+    return ChunkedUploadService(str(tmp_path), chunk_size=4, max_size=64)
+
+
+def test_chunks_assembled_in_any_order_and_resent_safely(uploads):
+    content = b'FR40303265045\n'
+    upload = uploads.init('u1', 'clients.csv', 'csv', len(content))
+    session = uploads.get(upload['upload_id'])
+    chunks = [content[i:i + 4] for i in range(0, len(content), 4)]
+
+    assert upload['total_chunks'] == 4
+    for index in (3, 1, 0, 1):
+        uploads.write_chunk(upload['upload_id'], session, index, chunks[index])
+
+    assert uploads.missing_chunks(upload['upload_id'], session) == [2]
+    assert uploads.complete(upload['upload_id'], session) is False
+
+    assert uploads.write_chunk(upload['upload_id'], session, 2, chunks[2]) == 4
+    assert uploads.complete(upload['upload_id'], session) is True
+    assert uploads.complete(upload['upload_id'], session) is False
+    assert uploads.get(upload['upload_id'])['status'] == ChunkedUploadService.STATUS_PARSING
+
+    with open(session['path'], 'rb') as f:
+        assert f.read() == content
+
+
+def test_rejects_wrong_chunk_size_and_index(uploads):
+    upload = uploads.init('u1', 'clients.csv', 'csv', 10)
+    session = uploads.get(upload['upload_id'])
+
+    with pytest.raises(ValueError):
+        uploads.write_chunk(upload['upload_id'], session, 0, b'abc')
+    with pytest.raises(ValueError):
+        uploads.write_chunk(upload['upload_id'], session, 3, b'ab')
+    uploads.write_chunk(upload['upload_id'], session, 2, b'ab')
+
+
+def test_rejects_oversized_or_empty_files(uploads):
+    with pytest.raises(ValueError):
+        uploads.init('u1', 'clients.csv', 'csv', 65)
+    with pytest.raises(ValueError):
+        uploads.init('u1', 'clients.csv', 'csv', 0)
+
+
+def test_progress_published_to_session(uploads):
+    upload = uploads.init('u1', 'clients.csv', 'csv', 4)
+
+    uploads.update_progress(upload['upload_id'], rows_read=3, preview=[{'vat': 'FR40303265045'}], batch_id=None)
+
+    session = uploads.get(upload['upload_id'])
+    assert session['rows_read'] == 3
+    assert session['preview'] == [{'vat': 'FR40303265045'}]
+    assert 'batch_id' not in session
+
+
+def test_purge_removes_only_files_of_expired_sessions(uploads, redis_server):
+    live = uploads.init('u1', 'clients.csv', 'csv', 4)
+    expired = uploads.init('u1', 'ancien.csv', 'csv', 4)
+    expired_path = uploads.get(expired['upload_id'])['path']
+    redis_server.delete(uploads._key(expired['upload_id']))
+
+    assert uploads.purge_stale_files() == 1
+    assert not os.path.exists(expired_path)
+    assert os.path.exists(uploads.get(live['upload_id'])['path'])
@@ -0,0 +1,84 @@
+"""
+Tests des disjoncteurs par État membre
+"""
+import time
+
+from app.services.circuit_breaker import CountryCircuitBreaker
+
+
+def open_breaker(breaker, country_code='DE'):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(country_code)
+
+
+def test_opens_after_consecutive_failures(redis_server):
+    breaker = CountryCircuitBreaker(failure_threshold=3)
+
+    assert breaker.record_failure('DE') == CountryCircuitBreaker.STATE_CLOSED
+    assert breaker.record_failure('DE') == CountryCircuitBreaker.STATE_CLOSED
+    assert breaker.record_failure('DE') == CountryCircuitBreaker.STATE_OPEN
+    assert breaker.allow_request('DE') == CountryCircuitBreaker.PARK
+    assert breaker.allow_request('FR') == CountryCircuitBreaker.ALLOW
+
+
+def test_success_resets_failure_count(redis_server):
+    breaker = CountryCircuitBreaker(failure_threshold=2)
+
+    breaker.record_failure('DE')
+    assert breaker.record_success('DE') is False
+    assert breaker.record_failure('DE') == CountryCircuitBreaker.STATE_CLOSED
+
+
+def test_single_probe_after_cooldown(redis_server):
+    breaker = CountryCircuitBreaker(failure_threshold=1, cooldown_seconds=0)
+    open_breaker(breaker)
+
+    assert breaker.allow_request('DE') == CountryCircuitBreaker.PROBE
+    assert breaker.get_state('DE')['state'] == CountryCircuitBreaker.STATE_HALF_OPEN
+    assert breaker.allow_request('DE') == CountryCircuitBreaker.PARK
+    assert breaker.allow_request('DE', is_probe=True) == CountryCircuitBreaker.PROBE
+
+
+def test_probe_success_closes_and_failure_reopens(redis_server):
+    breaker = CountryCircuitBreaker(failure_threshold=1, cooldown_seconds=0)
+    open_breaker(breaker)
+
+    breaker.allow_request('DE')
+    assert breaker.record_failure('DE') == CountryCircuitBreaker.STATE_OPEN
+
+    breaker.allow_request('DE')
+    assert breaker.record_success('DE') is True
+    assert breaker.allow_request('DE') == CountryCircuitBreaker.ALLOW
+
+
+def test_released_probe_lets_next_request_probe(redis_server):
+    breaker = CountryCircuitBreaker(failure_threshold=1, cooldown_seconds=0)
+    open_breaker(breaker)
+
+    assert breaker.allow_request('DE') == CountryCircuitBreaker.PROBE
+    breaker.release_probe('DE')
+
+    assert breaker.allow_request('DE') == CountryCircuitBreaker.PROBE
+
+
+def test_parked_jobs_released_in_arrival_order(redis_server):
+    breaker = CountryCircuitBreaker(failure_threshold=1, cooldown_seconds=60)
+    open_breaker(breaker)
+
+    for vat_number in ('111111111', '222222222', '333333333'):
+        breaker.park('DE', {'country_code': 'DE', 'vat_number': vat_number})
+        time.sleep(0.001)
+
+    assert breaker.get_state('DE')['parked'] == 3
+    assert breaker.pop_probe_candidate('DE')[0]['vat_number'] == '111111111'
+    assert [job['vat_number'] for job in breaker.release_parked('DE')] == ['222222222', '333333333']
+    assert breaker.get_state('DE')['parked'] == 0
+
+
+def test_open_countries_listed(redis_server):
+    breaker = CountryCircuitBreaker(failure_threshold=1)
+    open_breaker(breaker, 'DE')
+    open_breaker(breaker, 'IT')
+    breaker.record_success('FR')
+
+    assert sorted(breaker.get_open_countries()) == ['DE', 'IT']
@@ -0,0 +1,100 @@
+"""
+Tests de l'ordonnanceur équitable entre clients
+"""
+from collections import Counter
+
+from app.services.fair_scheduler import FairShareScheduler
+
+
+def drain(scheduler, rounds, slots):
+    served = Counter()
+    for _ in range(rounds):
+        items = scheduler.dispatch(slots)
+        scheduler.ack(items)
+        served.update(item['user_id'] for item in items)
+    return served
+
+
+def test_bulk_shares_follow_subscription_weights(redis_server):
+    scheduler = FairShareScheduler(weights={'free': 1, 'premium': 3})
+    scheduler.enqueue('a', 'free', [{'n': i} for i in range(200)])
+    scheduler.enqueue('b', 'premium', [{'n': i} for i in range(200)])
+
+    served = drain(scheduler, rounds=5, slots=20)
+
+    assert served == {'b': 75, 'a': 25}
+
+
+def test_many_small_batches_do_not_bypass_weights(redis_server):
+    scheduler = FairShareScheduler(weights={'free': 1})
+    for _ in range(30):
+        scheduler.enqueue('spam', 'free', [{}] * 10)
+    scheduler.enqueue('a', 'free', [{}] * 300)
+    scheduler.enqueue('b', 'free', [{}] * 300)
+
+    served = drain(scheduler, rounds=6, slots=30)
+
+    assert max(served.values()) - min(served.values()) <= 2
+
+
+def test_small_batch_served_ahead_of_a_running_bulk(redis_server):
+    scheduler = FairShareScheduler()
+    scheduler.enqueue('big', 'free', [{}] * 500)
+    scheduler.ack(scheduler.dispatch(10))
+
+    result = scheduler.enqueue('small', 'free', [{}] * 3)
+    items = scheduler.dispatch(10)
+
+    assert result['lane'] == FairShareScheduler.LANE_INTERACTIVE
+    assert [item['user_id'] for item in items[:6]] == ['small', 'big'] * 3
+
+
+def test_tenant_unknown_to_dispatch_is_skipped(redis_server):
+    scheduler = FairShareScheduler()
+    scheduler.enqueue('a', 'free', [{}] * 100)
+    # Client arrivé entre la lecture des clients actifs et le script
+    redis_server.zadd(scheduler.tenants_key, {'late': -1})
+
+    items = scheduler._dispatch(
+        keys=[scheduler.tenants_key, scheduler.interactive_tenants_key, scheduler.weights_key,
+              scheduler.clock_key, scheduler.inflight_key, f'{scheduler.queue_prefix}a'],
+        args=[10, 5, 0, 1, 'a']
+    )
+
+    assert len(items) == 10
+    assert redis_server.zscore(scheduler.tenants_key, 'late') == -1
+
+
+def test_unacked_items_are_recovered(redis_server):
+    scheduler = FairShareScheduler()
+    enqueued = scheduler.enqueue('a', 'free', [{'vat_number': '1'}, {'vat_number': '2'}])
+
+    items = scheduler.dispatch(10)
+    assert scheduler.recover_inflight(older_than=60) == []
+
+    recovered = scheduler.recover_inflight(older_than=-1)
+    assert sorted(item['task_id'] for item in recovered) == sorted(enqueued['task_ids'])
+
+    scheduler.ack(items)
+    assert scheduler.recover_inflight(older_than=-1) == []
+
+
+def test_dispatch_lock_released_only_by_owner(redis_server):
+    scheduler = FairShareScheduler()
+    token = scheduler.acquire_dispatch_lock()
+
+    assert token and scheduler.acquire_dispatch_lock() is None
+    scheduler.release_dispatch_lock('autre')
+    assert scheduler.acquire_dispatch_lock() is None
+    scheduler.release_dispatch_lock(token)
+    assert scheduler.acquire_dispatch_lock()
+
+
+def test_pending_counts_and_tenant_stats(redis_server):
+    scheduler = FairShareScheduler()
+    scheduler.enqueue('a', 'free', [{}] * 60)
+    scheduler.enqueue('a', 'free', [{}] * 5)
+    scheduler.enqueue('b', 'free', [{}] * 2)
+
+    assert scheduler.pending_counts() == {'interactive': 7, 'bulk': 60, 'tenants': 2}
+    assert scheduler.get_tenant_stats('a')['pending'] == 65
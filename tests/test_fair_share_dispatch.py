@@ -0,0 +1,61 @@
+"""
+Tests de la distribution des files équitables vers Celery
+"""
+import pytest
+
+from app.services.fair_scheduler import FairShareScheduler
+from app.tasks import vies_verification
+
+
+@pytest.fixture
+def scheduler(redis_server, monkeypatch):
+    scheduler = FairShareScheduler()
+    monkeypatch.setattr(vies_verification, 'get_fair_scheduler', lambda: scheduler)
+    monkeypatch.setattr(vies_verification, '_broker_queue_depth', lambda queue='celery': 0)
+    return scheduler
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    messages = []
+    monkeypatch.setattr(vies_verification.verify_single_vat, 'apply_async',
+                        lambda kwargs, task_id: messages.append(task_id))
+    return messages
+
+
+def test_sent_jobs_are_acked(scheduler, sent):
+    queued = scheduler.enqueue('a', 'free', [{'vat_number': str(i)} for i in range(3)])
+
+    assert vies_verification.dispatch_fair_share() == {'dispatched': 3}
+    assert sent == queued['task_ids']
+    assert scheduler.recover_inflight(older_than=-1) == []
+
+
+def test_jobs_not_marked_in_database_stay_in_flight(scheduler, sent, monkeypatch):
+    queued = scheduler.enqueue('a', 'free', [{'vat_number': '1'}])
+    monkeypatch.setattr(vies_verification, '_mark_dispatched', lambda payloads: False)
+
+    vies_verification.dispatch_fair_share()
+
+    recovered = scheduler.recover_inflight(older_than=-1)
+    assert [item['task_id'] for item in recovered] == queued['task_ids']
+
+
+def test_recovered_jobs_resent_with_same_task_id(scheduler, sent, monkeypatch):
+    queued = scheduler.enqueue('a', 'free', [{'vat_number': '1'}])
+    # Distributeur arrêté entre le retrait et l'envoi
+    scheduler.dispatch(10)
+    monkeypatch.setattr(scheduler, 'recover_inflight',
+                        lambda older_than=60: FairShareScheduler.recover_inflight(scheduler, older_than=-1))
+
+    assert vies_verification.dispatch_fair_share() == {'dispatched': 1}
+    assert sent == queued['task_ids']
+
+
+def test_single_dispatcher_at_a_time(scheduler, sent):
+    scheduler.enqueue('a', 'free', [{'vat_number': '1'}])
+    token = scheduler.acquire_dispatch_lock()
+
+    assert vies_verification.dispatch_fair_share()['dispatched'] == 0
+    scheduler.release_dispatch_lock(token)
+    assert vies_verification.dispatch_fair_share()['dispatched'] == 1
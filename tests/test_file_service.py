@@ -0,0 +1,58 @@
+"""
+Tests de la lecture en flux des fichiers d'import
+"""
+import json
+
+from app.services.file_service import FileService
+
+
+def values(path, extension):
+    return [value for value, _ in FileService.iter_file_values(str(path), extension)]
+
+
+def test_xlsx_vat_column_from_header(tmp_path):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(['Société', 'N° TVA', 'Ville'])
+    sheet.append(['SA SODIMAS', 'FR40303265045', 'Pont de l\'Isère'])
+    sheet.append(['Beispiel GmbH', None, 'Berlin'])
+    sheet.append(['Esempio SRL', 'IT00743110157', 'Roma'])
+    path = tmp_path / 'clients.xlsx'
+    workbook.save(path)
+
+    assert values(path, 'xlsx') == ['FR40303265045', 'IT00743110157']
+
+
+def test_xlsx_without_header_reads_first_column(tmp_path):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    workbook.active.append(['DE136695976'])
+    workbook.active.append(['BE0403170701'])
+    path = tmp_path / 'numeros.xlsx'
+    workbook.save(path)
+
+    assert values(path, 'xlsx') == ['DE136695976', 'BE0403170701']
+
+
+def test_csv_vat_column_from_header(tmp_path):
+    path = tmp_path / 'clients.csv'
+    path.write_text('nom;tva_intra\nSODIMAS;FR40303265045\nVIDE;\n', encoding='utf-8')
+
+    assert values(path, 'csv') == ['FR40303265045']
+
+
+def test_jsonl_skips_unreadable_lines_and_picks_field_per_record(tmp_path):
+    path = tmp_path / 'clients.jsonl'
+    lines = [
+        json.dumps({'name': 'A', 'vat': 'FR40303265045'}),
+        '{ligne tronquée',
+        json.dumps({'company': 'C', 'tva_intra': 'IT00743110157'}),
+        json.dumps({'name': 'Sans numéro'}),
+        json.dumps('BE0403170701'),
+    ]
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+    assert values(path, 'jsonl') == ['FR40303265045', 'IT00743110157', 'BE0403170701']
@@ -0,0 +1,69 @@
+"""
+Tests du cache négatif des numéros confirmés invalides
+"""
+from app.services.invalid_filter import InvalidVATFilter
+
+
+def numbers(count, prefix='DE'):
+    return [f'{prefix}{i:09d}' for i in range(count)]
+
+
+def test_added_numbers_are_found(redis_server):
+    invalid_filter = InvalidVATFilter()
+
+    assert invalid_filter.contains('DE', '123456789') is False
+    assert invalid_filter.add('DE', '123456789') is True
+    assert invalid_filter.add('DE', '123456789') is False
+    assert invalid_filter.contains('DE', '123456789') is True
+    assert invalid_filter.contains('FR', '123456789') is False
+
+
+def test_grows_new_slices_with_bounded_false_positives(redis_server):
+    invalid_filter = InvalidVATFilter(capacity=500, error_rate=0.01)
+
+    # Un faux positif à l'ajout compte comme « déjà signalé »
+    assert invalid_filter.add_many(numbers(3000)) >= 3000 * 0.98
+    assert all(invalid_filter.contains_many(numbers(3000)))
+
+    stats = invalid_filter.get_stats()
+    assert stats['slices'] >= 3
+    false_positives = sum(invalid_filter.contains_many(numbers(5000, prefix='IT')))
+    assert false_positives / 5000 < 0.02
+
+
+def test_rebuild_replaces_previous_verdicts(redis_server):
+    invalid_filter = InvalidVATFilter(capacity=100)
+    invalid_filter.add_many(['DE111111111', 'DE222222222'])
+
+    assert invalid_filter.rebuild(['DE222222222', 'FR40303265045'], expected=2) == 2
+
+    assert invalid_filter.contains_many(['DE111111111', 'DE222222222', 'FR40303265045']) == [False, True, True]
+    assert invalid_filter.get_stats()['numbers'] == 2
+
+
+def test_old_generation_expires_after_rebuild(redis_server):
+    invalid_filter = InvalidVATFilter(capacity=100)
+    invalid_filter.add_many(numbers(10))
+    previous, count = invalid_filter._layout(invalid_filter.meta_key)
+
+    invalid_filter.rebuild(numbers(5))
+
+    for key in invalid_filter._slice_keys(previous, count):
+        assert 0 < redis_server.ttl(key) <= 60
+
+
+def test_stale_layout_is_retried(redis_server, monkeypatch):
+    invalid_filter = InvalidVATFilter(capacity=100)
+    invalid_filter.add_many(['DE123456789'])
+    layout = invalid_filter._layout
+    calls = []
+
+    def stale_once(meta_key):
+        calls.append(meta_key)
+        # Première lecture : génération d'avant une reconstruction
+        return ('ancienne', 1) if len(calls) == 1 else layout(meta_key)
+
+    monkeypatch.setattr(invalid_filter, '_layout', stale_once)
+
+    assert invalid_filter.contains('DE', '123456789') is True
+    assert len(calls) == 2
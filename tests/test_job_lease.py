@@ -0,0 +1,151 @@
+"""
+Tests des baux de jobs : prise, fin conditionnelle, reprise par le reaper
+"""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.job_lease import LeaseHeartbeat
+
+
+@pytest.fixture
+def job(database, models):
+    user = models.User('client@example.com', 'secret')
+    database.session.add(user)
+    database.session.flush()
+
+    batch = models.VerificationBatch(user_id=user.id, total_jobs=2)
+    database.session.add(batch)
+    database.session.flush()
+
+    job = models.VerificationJob(user_id=user.id, batch_id=batch.id, country_code='FR', vat_number='40303265045')
+    database.session.add(job)
+    database.session.commit()
+    return job
+
+
+def reload(database, job):
+    database.session.expire_all()
+    return database.session.get(type(job), job.id)
+
+
+def test_claim_is_exclusive_while_lease_is_live(database, models, job):
+    VerificationJob = models.VerificationJob
+
+    assert VerificationJob.claim(job.id, 'worker-a', 60) is True
+    assert VerificationJob.claim(job.id, 'worker-b', 60) is False
+    assert VerificationJob.claim(job.id, 'worker-a', 60) is True
+
+    job = reload(database, job)
+    assert (job.status, job.lease_owner, job.attempts) == ('processing', 'worker-a', 2)
+
+
+def test_expired_lease_can_be_claimed_by_another_worker(database, models, job):
+    VerificationJob = models.VerificationJob
+
+    assert VerificationJob.claim(job.id, 'worker-a', -1) is True
+    assert VerificationJob.claim(job.id, 'worker-b', 60) is True
+    assert reload(database, job).lease_owner == 'worker-b'
+
+
+def test_finished_job_is_neither_claimed_nor_finished_twice(database, models, job):
+    VerificationJob = models.VerificationJob
+    VerificationJob.claim(job.id, 'worker-a', 60)
+
+    assert job.complete_success({'is_valid': True}, owner='worker-a') is True
+    assert job.complete_failure('erreur tardive', owner='worker-a') is False
+    assert VerificationJob.claim(job.id, 'worker-b', 60) is False
+
+    job = reload(database, job)
+    assert (job.status, job.is_valid, job.lease_owner) == ('completed', True, None)
+    assert (job.batch.completed_jobs, job.batch.successful_jobs) == (1, 1)
+
+
+def test_result_of_a_lost_lease_is_not_recorded(database, models, job):
+    VerificationJob = models.VerificationJob
+    VerificationJob.claim(job.id, 'worker-a', -1)
+    VerificationJob.claim(job.id, 'worker-b', 60)
+
+    assert job.complete_failure('délai dépassé', owner='worker-a') is False
+
+    job = reload(database, job)
+    assert (job.status, job.lease_owner, job.batch.completed_jobs) == ('processing', 'worker-b', 0)
+
+
+def test_release_returns_job_to_pending(database, models, job):
+    VerificationJob = models.VerificationJob
+    VerificationJob.claim(job.id, 'worker-a', 60)
+
+    VerificationJob.release(job.id, 'worker-b')
+    assert reload(database, job).status == 'processing'
+
+    VerificationJob.release(job.id, 'worker-a')
+    job = reload(database, job)
+    assert (job.status, job.lease_owner) == ('pending', None)
+    assert job.dispatched_at is not None
+
+
+def test_orphan_reclaimed_once(database, models, job):
+    VerificationJob = models.VerificationJob
+    VerificationJob.claim(job.id, 'worker-a', -1)
+    now = datetime.utcnow()
+
+    assert [orphan.id for orphan in VerificationJob.find_orphans(now)] == [job.id]
+    assert VerificationJob.reclaim_orphan(job.id, now, via_scheduler=True) is True
+    assert VerificationJob.reclaim_orphan(job.id, now) is False
+    database.session.commit()
+
+    job = reload(database, job)
+    assert (job.status, job.lease_owner, job.dispatched_at) == ('pending', None, None)
+
+
+def test_live_lease_is_not_an_orphan(database, models, job):
+    VerificationJob = models.VerificationJob
+    VerificationJob.claim(job.id, 'worker-a', 60)
+
+    assert VerificationJob.find_orphans(datetime.utcnow()) == []
+    assert VerificationJob.reclaim_orphan(job.id, datetime.utcnow()) is False
+
+
+def test_stale_dispatch_reclaimed_only_after_timeout(database, models, job):
+    VerificationJob = models.VerificationJob
+    now = datetime.utcnow()
+    VerificationJob.mark_dispatched([job.id], now=now - timedelta(minutes=20))
+    cutoff = now - timedelta(minutes=10)
+
+    assert reload(database, job).was_recently_dispatched(600, now) is False
+    assert [stale.id for stale in VerificationJob.find_stale_dispatches(cutoff)] == [job.id]
+    assert VerificationJob.reclaim_stale_dispatch(job.id, cutoff, now) is True
+    assert VerificationJob.reclaim_stale_dispatch(job.id, cutoff, now) is False
+    database.session.commit()
+
+    assert reload(database, job).was_recently_dispatched(600, now) is True
+
+
+def test_parked_job_leaves_reaper_scope(database, models, job):
+    VerificationJob = models.VerificationJob
+    VerificationJob.mark_dispatched([job.id], now=datetime.utcnow() - timedelta(hours=1))
+
+    VerificationJob.park(job.id)
+
+    assert reload(database, job).dispatched_at is None
+    assert VerificationJob.find_stale_dispatches(datetime.utcnow()) == []
+
+
+def test_heartbeat_renews_lease_until_it_is_lost(database, models, job):
+    VerificationJob = models.VerificationJob
+    job_id = job.id
+    VerificationJob.claim(job_id, 'worker-a', 1)
+
+    def renewal(owner):
+        return lambda: VerificationJob.renew_lease_statement(job_id, owner, 60)
+
+    with LeaseHeartbeat(database.engine, renewal('worker-a'), 0.05) as heartbeat:
+        time.sleep(0.2)
+    assert heartbeat.lost is False
+    assert reload(database, job).lease_expires_at > datetime.utcnow() + timedelta(seconds=30)
+
+    with LeaseHeartbeat(database.engine, renewal('worker-b'), 0.05) as heartbeat:
+        time.sleep(0.2)
+    assert heartbeat.lost is True
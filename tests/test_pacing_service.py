@@ -0,0 +1,61 @@
+"""
+Tests du cadencement adaptatif par pays
+"""
+import pytest
+import redis
+
+from app.services.pacing_service import AdaptivePacer, LocalPacer
+
+
+def test_unknown_country_starts_at_initial_factor(redis_server):
+    assert AdaptivePacer(initial_factor=1.5).get_factor('FR') == 1.5
+
+
+def test_success_decreases_geometrically_down_to_zero(redis_server):
+    pacer = AdaptivePacer()
+
+    assert pacer.record('FR', AdaptivePacer.OUTCOME_SUCCESS) == pytest.approx(0.8)
+    for _ in range(30):
+        pacer.record('FR', AdaptivePacer.OUTCOME_SUCCESS)
+
+    assert pacer.get_factor('FR') == 0
+    assert pacer.get_metrics()['FR']['successes'] == 31
+
+
+def test_errors_increase_and_are_capped(redis_server):
+    pacer = AdaptivePacer(max_factor=4.0)
+
+    assert pacer.record('DE', AdaptivePacer.OUTCOME_THROTTLE) == pytest.approx(2.25)
+    assert pacer.record('DE', AdaptivePacer.OUTCOME_ERROR) == 4.0
+
+    stats = pacer.get_metrics()['DE']
+    assert (stats['throttles'], stats['errors']) == (1, 1)
+
+
+def test_factor_is_shared_between_workers(redis_server):
+    AdaptivePacer().record('IT', AdaptivePacer.OUTCOME_THROTTLE)
+
+    assert AdaptivePacer().get_factor('IT') == pytest.approx(2.25)
+
+
+def test_falls_back_to_local_factor_without_redis(redis_server, monkeypatch):
+    pacer = AdaptivePacer()
+
+    def unavailable(*args, **kwargs):
+        raise redis.ConnectionError('down')
+
+    monkeypatch.setattr(pacer, '_update_factor', unavailable)
+    monkeypatch.setattr(pacer.redis_client, 'hget', unavailable)
+
+    assert pacer.record('ES', AdaptivePacer.OUTCOME_THROTTLE) == pytest.approx(2.25)
+    assert pacer.get_factor('ES') == pytest.approx(2.25)
+
+
+def test_local_pacer_applies_same_rules():
+    pacer = LocalPacer()
+
+    pacer.record('FR', LocalPacer.OUTCOME_THROTTLE)
+    pacer.record('FR', LocalPacer.OUTCOME_SUCCESS)
+
+    assert pacer.get_factor('FR') == pytest.approx(1.8)
+    assert pacer.get_factor('BE') == 1.0
@@ -0,0 +1,96 @@
+"""
+Tests du reaper : jobs orphelins et messages Celery perdus
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from config import Config
+from app.services.fair_scheduler import FairShareScheduler
+from app.tasks import vies_verification
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Messages Celery envoyés par le reaper (task_id -> kwargs)"""
+    messages = {}
+    monkeypatch.setattr(vies_verification.verify_single_vat, 'apply_async',
+                        lambda kwargs, task_id: messages.__setitem__(task_id, kwargs))
+    monkeypatch.setattr(vies_verification, 'get_fair_scheduler', lambda: None)
+    return messages
+
+
+@pytest.fixture
+def make_job(database, models):
+    user = models.User('client@example.com', 'secret')
+    database.session.add(user)
+    database.session.commit()
+
+    def make(vat_number, **columns):
+        job = models.VerificationJob(user_id=user.id, country_code='DE', vat_number=vat_number, **columns)
+        database.session.add(job)
+        database.session.commit()
+        return job
+
+    return make
+
+
+def dispatched(minutes_ago):
+    return datetime.utcnow() - timedelta(minutes=minutes_ago)
+
+
+def test_only_jobs_missing_from_broker_are_resent(database, make_job, sent, monkeypatch):
+    queued = make_job('111111111', status='processing', celery_task_id='encore-en-file',
+                      dispatched_at=dispatched(60))
+    lost = make_job('222222222', status='processing', celery_task_id='perdu', dispatched_at=dispatched(60))
+    recent = make_job('333333333', status='processing', celery_task_id='recent', dispatched_at=dispatched(1))
+    monkeypatch.setattr(vies_verification, '_broker_task_ids', lambda: {'encore-en-file'})
+
+    assert vies_verification.reap_orphaned_jobs() == {'requeued': 1, 'abandoned': 0}
+
+    database.session.expire_all()
+    assert lost.celery_task_id in sent and lost.celery_task_id != 'perdu'
+    assert sent[lost.celery_task_id]['vat_number'] == '222222222'
+    assert (queued.celery_task_id, recent.celery_task_id) == ('encore-en-file', 'recent')
+
+
+def test_unreadable_broker_reclaims_nothing(database, make_job, sent, monkeypatch):
+    make_job('222222222', status='processing', celery_task_id='perdu', dispatched_at=dispatched(60))
+
+    def unreadable():
+        raise ConnectionError('broker indisponible')
+
+    monkeypatch.setattr(vies_verification, '_broker_task_ids', unreadable)
+
+    assert vies_verification.reap_orphaned_jobs() == {'requeued': 0, 'abandoned': 0}
+    assert sent == {}
+
+
+def test_orphan_requeued_then_abandoned_after_max_attempts(database, make_job, sent):
+    expired = datetime.utcnow() - timedelta(seconds=1)
+    orphan = make_job('111111111', status='processing', lease_owner='perdu', lease_expires_at=expired,
+                      attempts=1)
+    exhausted = make_job('222222222', status='processing', lease_owner='perdu', lease_expires_at=expired,
+                         attempts=Config.JOB_MAX_ATTEMPTS)
+
+    assert vies_verification.reap_orphaned_jobs() == {'requeued': 1, 'abandoned': 1}
+
+    database.session.expire_all()
+    assert orphan.status == 'pending' and orphan.celery_task_id in sent
+    assert exhausted.status == 'failed'
+
+
+def test_reclaimed_jobs_go_back_through_fair_scheduler(database, make_job, sent, redis_server, monkeypatch):
+    scheduler = FairShareScheduler()
+    refills = []
+    monkeypatch.setattr(vies_verification, 'get_fair_scheduler', lambda: scheduler)
+    monkeypatch.setattr(vies_verification.dispatch_fair_share, 'delay', lambda: refills.append(1))
+    monkeypatch.setattr(vies_verification, '_broker_task_ids', set)
+    lost = make_job('222222222', status='processing', celery_task_id='perdu', dispatched_at=dispatched(60))
+
+    assert vies_verification.reap_orphaned_jobs() == {'requeued': 1, 'abandoned': 0}
+
+    database.session.expire_all()
+    assert sent == {} and refills == [1]
+    assert lost.dispatched_at is None
+    assert [item['task_id'] for item in scheduler.dispatch(10)] == [lost.celery_task_id]
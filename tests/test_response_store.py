@@ -0,0 +1,32 @@
+"""
+Tests du magasin compressé des réponses VIES
+"""
+from app.services.response_store import ResponseStore
+
+
+def test_save_then_load_roundtrip(tmp_path):
+    store = ResponseStore(str(tmp_path))
+
+    ref = store.save('FR40303265045_task', '<html>Oui, numéro TVA valide</html>')
+
+    assert store.load(ref) == '<html>Oui, numéro TVA valide</html>'
+
+
+def test_load_refuses_paths_outside_store(tmp_path):
+    store = ResponseStore(str(tmp_path / 'store'))
+    (tmp_path / 'secret.html.gz').write_bytes(b'')
+
+    assert store.load('../secret.html.gz') is None
+
+
+def test_purge_removes_only_expired_day_folders(tmp_path):
+    store = ResponseStore(str(tmp_path))
+    recent = store.save('FR40303265045_recent', '<html></html>')
+    (tmp_path / '20000101').mkdir()
+    (tmp_path / '20000101' / 'old.html.gz').write_bytes(b'')
+    (tmp_path / 'notes').mkdir()
+
+    assert store.purge(older_than_days=30) == 1
+    assert not (tmp_path / '20000101').exists()
+    assert (tmp_path / 'notes').exists()
+    assert store.load(recent) == '<html></html>'
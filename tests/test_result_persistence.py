@@ -0,0 +1,82 @@
+"""
+Tests de l'enregistrement des résultats par les tâches de vérification
+"""
+import uuid
+
+import pytest
+
+from app.tasks import vies_verification
+
+
+class StatusRecorder:
+    """Suivi Redis des jobs réduit aux mises à jour de statut"""
+
+    def __init__(self):
+        self.updates = []
+
+    def update_job_status(self, job_id, status, **fields):
+        self.updates.append((job_id, status))
+
+
+@pytest.fixture
+def job_storage(monkeypatch):
+    recorder = StatusRecorder()
+    monkeypatch.setattr(vies_verification, 'get_job_storage', lambda: recorder)
+    return recorder
+
+
+@pytest.fixture
+def job(database, models):
+    user = models.User('client@example.com', 'secret')
+    database.session.add(user)
+    database.session.flush()
+
+    job = models.VerificationJob(user_id=user.id, country_code='DE', vat_number='136695976')
+    database.session.add(job)
+    database.session.commit()
+    models.VerificationJob.claim(job.id, 'worker-a', 60)
+    return job
+
+
+def test_verdict_recorded_in_database_then_tracking(database, job, job_storage):
+    result = {'success': True, 'is_valid': True, 'company_name': 'BEISPIEL GMBH'}
+
+    assert vies_verification._persist_result(result, {'job_id': job.id}, 'task-1', 'worker-a') is True
+
+    database.session.refresh(job)
+    assert (job.status, job.is_valid, job.vies_company_name) == ('completed', True, 'BEISPIEL GMBH')
+    assert job_storage.updates == [(job.id, 'completed')]
+
+
+def test_database_error_reports_no_verdict(database, models, job, job_storage, monkeypatch):
+    def unavailable(self, *args, **kwargs):
+        raise RuntimeError('base indisponible')
+
+    monkeypatch.setattr(models.VerificationJob, 'complete_success', unavailable)
+    result = {'success': True, 'is_valid': True}
+
+    assert vies_verification._persist_result(result, {'job_id': job.id}, 'task-1', 'worker-a') is False
+    assert job_storage.updates == []
+
+    unrecorded = vies_verification._unrecorded(result)
+    assert (unrecorded['success'], unrecorded['is_valid']) == (False, False)
+    assert unrecorded['error']
+
+
+def test_unknown_job_reports_no_verdict(database, models, job_storage):
+    assert vies_verification._persist_result({'success': True}, {'job_id': uuid.uuid4()}, 'task-1') is False
+    assert job_storage.updates == []
+
+
+def test_result_of_a_lost_lease_is_ignored(database, models, job, job_storage):
+    result = {'success': False, 'error': 'Délai dépassé'}
+
+    assert vies_verification._persist_result(result, {'job_id': job.id}, 'task-1', 'worker-b') is True
+
+    database.session.refresh(job)
+    assert (job.status, job.lease_owner) == ('processing', 'worker-a')
+    assert job_storage.updates == []
+
+
+def test_job_without_database_row_has_nothing_to_record(job_storage):
+    assert vies_verification._persist_result({'success': True}, None, 'task-1') is True
@@ -0,0 +1,75 @@
+"""
+Tests des clés de contrôle et des corrections suggérées
+"""
+import pytest
+
+from app.services.vat_checksum import verify_checksum
+from app.services.vat_correction import find_corrections, add_suggestions
+
+
+class VerdictCache:
+    """Cache local des verdicts VIES réduit à get_many"""
+
+    def __init__(self, verdicts):
+        self.verdicts = verdicts
+
+    def get_many(self, vats):
+        return {vat: self.verdicts[vat] for vat in vats if vat in self.verdicts}
+
+
+@pytest.mark.parametrize('vat', [
+    'ATU13585627', 'BE0403170701', 'DE136695976', 'DK13585628', 'ESA28017895',
+    'FR40303265045', 'IT00743110157', 'NL004495445B01', 'PL5260250995',
+])
+def test_checksum_accepts_valid_numbers(vat):
+    assert verify_checksum(vat[:2], vat[2:]) is True
+
+
+@pytest.mark.parametrize('vat', ['FR40303265046', 'DE136695977', 'BE0403170702', 'IT00743110158'])
+def test_checksum_rejects_altered_numbers(vat):
+    assert verify_checksum(vat[:2], vat[2:]) is False
+
+
+def test_checksum_without_rule():
+    assert verify_checksum('XX', '123') is None
+
+
+@pytest.mark.parametrize('typed, expected, kind', [
+    ('DE136695967', 'DE136695976', 'transposition'),
+    ('FR4O303265045', 'FR40303265045', 'confusion'),
+    ('40303265045', 'FR40303265045', 'missing_prefix'),
+    ('DE1366959766', 'DE136695976', 'extra_digit'),
+    ('BE403170701', 'BE0403170701', 'missing_digit'),
+])
+def test_typing_mistakes_are_corrected(typed, expected, kind):
+    corrections = {c['vat']: c for c in find_corrections(typed)}
+
+    assert corrections[expected]['kind'] == kind
+    assert corrections[expected]['checksum'] is True
+
+
+def test_suggestions_respect_checksum_and_limit():
+    corrections = find_corrections('DE13669597', limit=2)
+
+    assert len(corrections) == 2
+    assert all(verify_checksum(c['vat'][:2], c['vat'][2:]) for c in corrections)
+
+
+def test_cache_confirms_and_excludes_candidates():
+    cache = VerdictCache({
+        'DE136695976': {'is_valid': True},
+        'DE166959766': {'is_valid': False},
+    })
+
+    corrections = find_corrections('DE1366959766', cache=cache)
+
+    assert [c['vat'] for c in corrections] == ['DE136695976']
+    assert corrections[0]['confirmed'] is True
+
+
+def test_add_suggestions_to_invalid_rows():
+    rows = [{'cleaned': 'DE136695967'}, {'cleaned': 'ZZ'}, {'cleaned': ''}]
+
+    assert add_suggestions(rows) == 1
+    assert rows[0]['suggestions'] == ['DE136695976']
+    assert rows[1]['suggestions'] == rows[2]['suggestions'] == []
@@ -0,0 +1,39 @@
+"""
+Tests de l'extraction des numéros de TVA en texte libre
+"""
+import pytest
+
+from app.services.vat_service import VATService
+
+
+@pytest.mark.parametrize('content, expected', [
+    ('Facture SODIMAS, TVA FR40303265045, payable à 30 jours', ['FR40303265045']),
+    ('N° TVA : FR 40 303 265 045.', ['FR40303265045']),
+    ('Clients BE0403.170.701 et DE136695976', ['BE0403170701', 'DE136695976']),
+    ('Réf. XFR40303265045 et FR40303265045X', []),
+    ('de 123456789 dans une phrase', []),
+])
+def test_extract_from_mixed_content(content, expected):
+    assert VATService.extract_vat_from_mixed_content(content) == expected
+
+
+def test_unicode_digits_are_not_extracted():
+    assert VATService.extract_vat_from_mixed_content('TVA DE١٢٣٤٥٦٧٨٩ fin') == []
+
+
+@pytest.mark.parametrize('content', [
+    'DE 123 456 789 00',
+    'DE123456789 00',
+    'DE123456789-00',
+])
+def test_number_followed_by_digit_group_is_not_truncated(content):
+    assert VATService.extract_vat_from_mixed_content(content) == []
+
+
+def test_stream_matches_full_text_extraction():
+    content = ' '.join(f'ligne {i} TVA FR40303265045 / DE 136 695 976 00 / BE0403170701'
+                       for i in range(200))
+    chunks = [content[i:i + 37] for i in range(0, len(content), 37)]
+
+    assert list(VATService.iter_vat_in_stream(chunks)) == VATService.extract_vat_from_mixed_content(content)
+    assert VATService.extract_vat_from_mixed_content(content).count('FR40303265045') == 200
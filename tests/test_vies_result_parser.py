@@ -0,0 +1,170 @@
+"""
+Tests de l'analyse des résultats VIES
+Les fixtures reproduisent l'objet renvoyé par VIESResultParser.EXTRACTION_SCRIPT
+"""
+import pytest
+
+from app.services.vies_result_parser import VIESResultParser
+
+
+def extraction(status='unknown', fields=None, status_text=None, error_text=None, body_excerpt=''):
+    """Objet de la forme renvoyée par EXTRACTION_SCRIPT"""
+    return {
+        'status': status,
+        'status_text': status_text,
+        'fields': fields or [],
+        'error_text': error_text,
+        'body_excerpt': body_excerpt
+    }
+
+
+VALID_FR = extraction(
+    status='valid',
+    status_text='Yes, valid VAT number',
+    fields=[
+        ['Member State', 'FR'],
+        ['VAT Number', 'FR 40303265045'],
+        ['Date when request received', '2026/10/19 09:12:45'],
+        ['Name', 'SA SODIMAS'],
+        ['Address', '11 RUE AMPERE 26600 PONT DE L ISERE'],
+        ['Consultation Number', 'WAPIAAAAZ1abc'],
+    ],
+    body_excerpt='Yes, valid VAT number Member State FR'
+)
+
+
+def test_valid_result():
+    result = VIESResultParser.parse(VALID_FR)
+
+    assert result == {
+        'is_valid': True,
+        'status': 'valid',
+        'company_name': 'SA SODIMAS',
+        'company_address': '11 RUE AMPERE 26600 PONT DE L ISERE',
+        'request_identifier': 'WAPIAAAAZ1abc',
+        'request_date': '2026/10/19 09:12:45',
+        'vies_error_code': None,
+        'error': None
+    }
+
+
+def test_invalid_result():
+    raw = extraction(
+        status='invalid',
+        status_text='No, invalid VAT number for cross border transactions within the EU',
+        fields=[['Member State', 'IT'], ['VAT Number', 'IT 00743110158'],
+                ['Date when request received', '2026/10/19 09:13:02']],
+        body_excerpt='No, invalid VAT number for cross border transactions within the EU'
+    )
+
+    result = VIESResultParser.parse(raw)
+
+    assert result['is_valid'] is False
+    assert result['status'] == 'invalid'
+    assert result['request_date'] == '2026/10/19 09:13:02'
+    assert result['company_name'] is None
+    assert result['company_address'] is None
+    assert result['vies_error_code'] is None
+    assert result['error'] is None
+
+
+@pytest.mark.parametrize('name, address', [
+    ('---', '---'),
+    ('--', '-'),
+    ('Name not available', 'Address not available'),
+])
+def test_placeholder_name_and_address(name, address):
+    # DE et ES ne publient ni le nom ni l'adresse
+    raw = extraction(status='valid', fields=[['Name', name], ['Address', address],
+                                             ['Consultation Number', 'WAPIAAAAZ2def']])
+
+    result = VIESResultParser.parse(raw)
+
+    assert result['is_valid'] is True
+    assert result['company_name'] is None
+    assert result['company_address'] is None
+    assert result['request_identifier'] == 'WAPIAAAAZ2def'
+
+
+def test_missing_name_and_address():
+    raw = extraction(status='valid', fields=[['Member State', 'DE'], ['VAT Number', 'DE 136695976']])
+
+    result = VIESResultParser.parse(raw)
+
+    assert result['is_valid'] is True
+    assert result['company_name'] is None
+    assert result['company_address'] is None
+    assert result['request_identifier'] is None
+
+
+@pytest.mark.parametrize('fields, name, address, identifier, date', [
+    ([['Nom :', 'SA SODIMAS'], ['Adresse :', '11 RUE AMPERE'], ['Numéro de consultation :', 'WAPI1'],
+      ['Date de la demande :', '19/10/2026']],
+     'SA SODIMAS', '11 RUE AMPERE', 'WAPI1', '19/10/2026'),
+    ([['Name des Unternehmens', 'Beispiel GmbH'], ['Anschrift', 'Hauptstr. 1, Berlin'],
+      ['Abfragenummer', 'WAPI2'], ['Datum der Anfrage', '19.10.2026']],
+     'Beispiel GmbH', 'Hauptstr. 1, Berlin', 'WAPI2', '19.10.2026'),
+    ([['Denominazione', 'ESEMPIO SRL'], ['Indirizzo', 'VIA ROMA 1'], ['Numero di consultazione', 'WAPI3']],
+     'ESEMPIO SRL', 'VIA ROMA 1', 'WAPI3', None),
+    ([['  Trader   name ', 'EJEMPLO SL'], ['Dirección', 'CALLE MAYOR 1']],
+     'EJEMPLO SL', 'CALLE MAYOR 1', None, None),
+])
+def test_localized_labels(fields, name, address, identifier, date):
+    result = VIESResultParser.parse(extraction(status='valid', fields=fields))
+
+    assert result['company_name'] == name
+    assert result['company_address'] == address
+    assert result['request_identifier'] == identifier
+    assert result['request_date'] == date
+
+
+def test_first_filled_label_wins():
+    # Le tableau et le bloc "libellé : valeur" reprennent le même champ
+    raw = extraction(status='valid', fields=[['Name', '---'], ['Trader name', 'SA SODIMAS'],
+                                             ['Name', 'Doublon ignoré']])
+
+    assert VIESResultParser.parse(raw)['company_name'] == 'SA SODIMAS'
+
+
+@pytest.mark.parametrize('error_text, body_excerpt, code', [
+    ('MS_MAX_CONCURRENT_REQ', '', 'MS_MAX_CONCURRENT_REQ'),
+    (None, 'Error: global_max_concurrent_req, please retry later', 'GLOBAL_MAX_CONCURRENT_REQ'),
+    ('Member State service unavailable (MS_UNAVAILABLE)', '', 'MS_UNAVAILABLE'),
+    ('Unexpected error', 'Please try again', None),
+])
+def test_vies_error_codes(error_text, body_excerpt, code):
+    raw = extraction(error_text=error_text, body_excerpt=body_excerpt)
+
+    result = VIESResultParser.parse(raw)
+
+    assert result['is_valid'] is False
+    assert result['status'] == 'unknown'
+    assert result['vies_error_code'] == code
+    assert result['error'] == 'Résultat VIES ambigu ou service indisponible'
+
+
+def test_error_code_ignored_when_status_known():
+    raw = extraction(status='invalid', error_text='MS_MAX_CONCURRENT_REQ')
+
+    result = VIESResultParser.parse(raw)
+
+    assert result['vies_error_code'] is None
+    assert result['error'] is None
+
+
+@pytest.mark.parametrize('raw', [None, {}])
+def test_empty_result(raw):
+    result = VIESResultParser.parse(raw)
+
+    assert result['is_valid'] is False
+    assert result['status'] == 'unknown'
+    assert result['error'] == 'Résultat VIES vide'
+
+
+def test_malformed_field_pairs_are_skipped():
+    raw = extraction(status='valid', fields=[[], ['Name'], None, ['Name', None], ['Address', 'VIA ROMA 1']])
+
+    result = VIESResultParser.parse(raw)
+
+    assert result['company_name'] is None
+    assert result['company_address'] == 'VIA ROMA 1'
@@ -0,0 +1,32 @@
+"""
+Outil en ligne de commande VATProof
+Traitement hors ligne d'un fichier de numéros de TVA (voir app/cli.py)
+"""
+import os
+import sys
+import types
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Ajout du dossier racine au PATH Python
+sys.path.insert(0, ROOT_DIR)
+
+
+def load_services_package():
+    """
+    Rend app.services et app.tasks importables sans exécuter app/__init__.py
+    (module des routes Flask : base de données, blueprint, tâches Celery).
+    Utilisé par l'outil en ligne de commande, les benchmarks et les tests.
+    """
+    if 'app' not in sys.modules:
+        package = types.ModuleType('app')
+        package.__path__ = [os.path.join(ROOT_DIR, 'app')]
+        sys.modules['app'] = package
+
+
+if __name__ == '__main__':
+    load_services_package()
+    from app.cli import main
+
+    # Usage: python vatproof.py clients.csv -o resultats.csv --workers 4
+    sys.exit(main())
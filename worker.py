@@ -18,6 +18,7 @@ celery = make_celery(flask_app)
 
 # Import des tâches pour les enregistrer
 from app.tasks.vies_verification import verify_single_vat, process_vat_batch
+from app.tasks.upload_processing import parse_uploaded_file, purge_stale_uploads
 
 if __name__ == '__main__':
     # Lancement du worker